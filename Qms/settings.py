@@ -41,6 +41,12 @@ DATABASES = {
     }
 }
 
+# ========== Cache ==========
+# الافتراضي LocMemCache: كاش لكل process (gunicorn workers / ProcessPool لا تتشاركه)
+# → إبطال كاش لوحة التحكم ونتائج المقاييس الخارجية يبقى محليًا والتقادم حتى الـTTL.
+# للإبطال الفوري عبر العمليات: CACHE_URL=redis://... أو pymemcache://...
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # ========== Email ==========
 
 SITE_URL = env("SITE_URL", default="http://127.0.0.1:8000")
@@ -98,7 +104,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "base.middleware.QueryProfilingMiddleware",
     "base.middleware.MultiCompanyMiddleware",
+    "base.middleware.AccessContextMiddleware",
+    "base.middleware.RequestProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -185,6 +194,49 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# -------------------------------------------------
+# Performance: external metric cache (performance.services.generic_model_adapter)
+# -------------------------------------------------
+# نتائج التجميع تُخزّن TTL ثانية؛ الحفظ في الموديل الخارجي يرفع نسخته بعد commit.
+# بدون CACHE_URL مشترك: أقصى تقادم = الـTTL. 0 = تعطيل الكاش.
+PERFORMANCE_EXTERNAL_METRIC_CACHE_TTL = env.int("PERFORMANCE_EXTERNAL_METRIC_CACHE_TTL", default=300)
+# الموديلات التي تُخزَّن نتائجها (ويُبطل حفظها الكاش)؛ external_model خارج القائمة يُحسب دائمًا بدون كاش
+PERFORMANCE_EXTERNAL_METRIC_MODELS = env.list(
+    "PERFORMANCE_EXTERNAL_METRIC_MODELS",
+    default=[
+        "attendance.AttendanceLog",
+        "attendance.AttendanceDay",
+        "performance.DailyRating",
+        "performance.QualityIncident",
+    ],
+)
+
+# -------------------------------------------------
+# Query profiling (base.middleware.QueryProfilingMiddleware)
+# -------------------------------------------------
+# عدد الاستعلامات / التكرار / زمن DB وزمن الطلب لكل view → تقرير في لوحة الإدارة
+QUERY_PROFILING_ENABLED = env.bool("QUERY_PROFILING_ENABLED", default=False)
+QUERY_PROFILING_SAMPLE_RATE = env.float("QUERY_PROFILING_SAMPLE_RATE", default=1.0)
+QUERY_PROFILING_MAX_ROWS = env.int("QUERY_PROFILING_MAX_ROWS", default=10000)
+
+# -------------------------------------------------
+# Signal profiling (base.signal_profiling)
+# -------------------------------------------------
+# عدد الاستدعاءات / الزمن / الاستعلامات لكل (signal, receiver, sender) → أمر signal_profile + لوحة الإدارة
+SIGNAL_PROFILING_ENABLED = env.bool("SIGNAL_PROFILING_ENABLED", default=False)
+SIGNAL_PROFILING_FLUSH_INTERVAL = env.int("SIGNAL_PROFILING_FLUSH_INTERVAL", default=10)
+
+# -------------------------------------------------
+# Request CPU profiling (base.middleware.RequestProfilingMiddleware)
+# -------------------------------------------------
+# cProfile لعيّنة من الطلبات أو بترويسة من superuser → ملفات .prof + صفحة في لوحة الإدارة
+REQUEST_PROFILING_ENABLED = env.bool("REQUEST_PROFILING_ENABLED", default=False)
+REQUEST_PROFILING_SAMPLE_RATE = env.float("REQUEST_PROFILING_SAMPLE_RATE", default=0.01)
+REQUEST_PROFILING_THRESHOLD_MS = env.int("REQUEST_PROFILING_THRESHOLD_MS", default=500)
+REQUEST_PROFILING_HEADER = env.str("REQUEST_PROFILING_HEADER", default="X-Profile-Request")
+REQUEST_PROFILING_DIR = env.str("REQUEST_PROFILING_DIR", default=str(BASE_DIR / "var" / "profiles"))
+REQUEST_PROFILING_MAX_ROWS = env.int("REQUEST_PROFILING_MAX_ROWS", default=500)
+
 # -------------------------------------------------
 # Tailwind
 # -------------------------------------------------
@@ -20,6 +20,7 @@ from django.views.generic import (
 from django.apps import apps
 
 from base.company_context import get_allowed_company_ids, get_company_id
+from base.search import matching_ids
 from . import models as m
 from .forms import (
     AssetCategoryForm,
@@ -444,11 +445,7 @@ class AssetListView(LoginRequiredMixin, ListView):
 
         # Search: code/name/serial (ERP search)
         if q:
-            qs = qs.filter(
-                Q(code__icontains=q)
-                | Q(name__icontains=q)
-                | Q(serial__icontains=q)
-            )
+            qs = qs.filter(pk__in=matching_ids("asset", q))
 
         # Status (show all, including assigned, even if form can't set it)
         valid_statuses = {v for (v, _) in m.Asset.Status.choices}
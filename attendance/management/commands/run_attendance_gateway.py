@@ -0,0 +1,277 @@
+# attendance/management/commands/run_attendance_gateway.py
+
+import asyncio
+import json
+import signal
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.services import parse_punch, ingest_punches
+
+
+# ============================================================
+# Gateway internals
+# ============================================================
+
+@dataclass
+class _PendingRequest:
+    """
+    طلب جهاز واحد بانتظار أن تُكتب أحداثه.
+    الرد على الجهاز لا يُرسل إلا بعد flush ناجح → الجهاز يعيد الإرسال عند أي فشل،
+    والـunique (employee, ts, kind) يجعل إعادة الإرسال آمنة.
+    """
+    remaining: int
+    future: asyncio.Future
+    accepted: int = 0
+    duplicates: int = 0
+    rejected: list = field(default_factory=list)
+
+
+def _ingest_sync(punches, rebuild_days):
+    close_old_connections()
+    try:
+        return ingest_punches(punches, rebuild_days=rebuild_days)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the local attendance device gateway (asyncio HTTP). "
+        "Devices POST punches to /punches; they are buffered and flushed to AttendanceLog in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--flush-ms", type=int, default=500, help="Max time a punch waits in the buffer")
+        parser.add_argument("--batch-size", type=int, default=500, help="Flush as soon as this many punches are buffered")
+        parser.add_argument("--queue-size", type=int, default=10000, help="Buffer capacity; beyond it devices get 503")
+        parser.add_argument("--max-body", type=int, default=1024 * 1024, help="Max request body in bytes")
+        parser.add_argument("--no-rebuild", action="store_true", help="Do not rebuild AttendanceDay after flush")
+
+    def handle(self, *args, **options):
+        self.flush_s = max(1, options.get("flush_ms") or 500) / 1000.0
+        self.batch_size = max(1, options.get("batch_size") or 500)
+        self.queue_size = max(self.batch_size, options.get("queue_size") or 10000)
+        self.max_body = options.get("max_body") or 1024 * 1024
+        self.rebuild_days = not options.get("no_rebuild")
+
+        self.stats = {"requests": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "busy": 0, "flushes": 0, "errors": 0}
+
+        asyncio.run(self._serve(options.get("host"), options.get("port")))
+
+    # ---------------------------------------------------------
+    # Server lifecycle
+    # ---------------------------------------------------------
+    async def _serve(self, host, port):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        stop = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        flusher = asyncio.create_task(self._flusher())
+        server = await asyncio.start_server(self._handle_conn, host, port)
+
+        self.stdout.write(
+            f"Attendance gateway on http://{host}:{port} "
+            f"(batch={self.batch_size}, flush={int(self.flush_s * 1000)}ms, buffer={self.queue_size})"
+        )
+
+        async with server:
+            await stop.wait()
+            # توقف عن قبول اتصالات جديدة ثم أفرغ المخزن قبل الخروج
+            server.close()
+            self.stdout.write("Stopping: draining buffer ...")
+            await self.queue.join()
+
+        flusher.cancel()
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+
+        s = self.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Gateway stopped. requests={s['requests']} accepted={s['accepted']} duplicates={s['duplicates']} "
+            f"rejected={s['rejected']} busy={s['busy']} flushes={s['flushes']} errors={s['errors']}"
+        ))
+
+    # ---------------------------------------------------------
+    # Batching: N ms or M rows, whichever comes first
+    # ---------------------------------------------------------
+    async def _flusher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_s
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _flush(self, batch):
+        punches = [punch for punch, _pending, _idx in batch]
+        try:
+            result = await sync_to_async(_ingest_sync, thread_sensitive=True)(punches, self.rebuild_days)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            self.stderr.write(f"Flush failed ({len(batch)} punches): {exc}")
+            for _punch, pending, _idx in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(exc)
+            return
+
+        self.stats["flushes"] += 1
+        rejected = dict(result["rejected"])
+        duplicates = set(result.get("duplicates", ()))
+
+        for pos, (_punch, pending, idx) in enumerate(batch):
+            if pos in rejected:
+                pending.rejected.append({"index": idx, "error": rejected[pos]})
+            elif pos in duplicates:
+                # مكتوب مسبقًا (إعادة إرسال) → ليس خطأ، لكنه ليس إدخالًا جديدًا
+                pending.duplicates += 1
+            else:
+                pending.accepted += 1
+            pending.remaining -= 1
+            if pending.remaining == 0 and not pending.future.done():
+                pending.future.set_result(None)
+
+    # ---------------------------------------------------------
+    # Minimal HTTP/1.1 (keep-alive)
+    # ---------------------------------------------------------
+    async def _handle_conn(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, path, _version = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > self.max_body:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, extra = await self._dispatch(method.upper(), path.split("?", 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive=keep_alive, extra_headers=extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "buffered": self.queue.qsize(), "capacity": self.queue_size, **self.stats}, None
+
+        if method != "POST" or path != "/punches":
+            return 404, {"error": "not found"}, None
+
+        self.stats["requests"] += 1
+
+        try:
+            data = json.loads(body or b"null")
+        except ValueError:
+            return 400, {"error": "invalid JSON"}, None
+
+        if isinstance(data, dict) and "punches" in data:
+            data = data["punches"]
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not data:
+            return 400, {"error": "expected a punch or a list of punches"}, None
+
+        # تحقق شكلي قبل الدخول للمخزن (الموظف/الشركة يتحقق منها الـflush دفعة واحدة)
+        valid, rejected = [], []
+        for idx, raw in enumerate(data):
+            try:
+                valid.append((idx, parse_punch(raw)))
+            except ValueError as exc:
+                rejected.append({"index": idx, "error": str(exc)})
+
+        if not valid:
+            self.stats["rejected"] += len(rejected)
+            return 200, {"accepted": 0, "duplicates": 0, "rejected": rejected}, None
+
+        # Backpressure: الطلب يدخل كاملًا أو يُرفض كاملًا → الجهاز يعيد المحاولة لاحقًا
+        if self.queue.maxsize - self.queue.qsize() < len(valid):
+            self.stats["busy"] += 1
+            return 503, {"error": "gateway busy, retry later"}, {"Retry-After": "1"}
+
+        pending = _PendingRequest(remaining=len(valid), future=asyncio.get_running_loop().create_future())
+        pending.rejected.extend(rejected)
+        for idx, punch in valid:
+            self.queue.put_nowait((punch, pending, idx))
+
+        try:
+            await pending.future
+        except Exception:
+            return 500, {"error": "storage failure, retry later"}, {"Retry-After": "1"}
+
+        self.stats["accepted"] += pending.accepted
+        self.stats["duplicates"] += pending.duplicates
+        self.stats["rejected"] += len(pending.rejected)
+        pending.rejected.sort(key=lambda r: r["index"])
+        return 200, {
+            "accepted": pending.accepted,
+            "duplicates": pending.duplicates,
+            "rejected": pending.rejected,
+        }, None
+
+    async def _respond(self, writer, status, payload, *, keep_alive=True, extra_headers=None):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                   500: "Internal Server Error", 503: "Service Unavailable"}
+        body = json.dumps(payload).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status} {reasons.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
@@ -0,0 +1,156 @@
+# attendance/management/commands/simulate_attendance_devices.py
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from hr.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Simulate attendance devices pushing punches to run_attendance_gateway (load generator)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--devices", type=int, default=10, help="Concurrent simulated devices")
+        parser.add_argument("--punches", type=int, default=1000, help="Punches per device")
+        parser.add_argument("--batch", type=int, default=20, help="Punches per HTTP request")
+        parser.add_argument("--company-id", type=int, default=None, help="Use employees of one company")
+        parser.add_argument("--employees", type=int, default=200, help="Max employees to punch for")
+        parser.add_argument("--max-retries", type=int, default=20, help="Retries per request on 503/500")
+
+    def handle(self, *args, **options):
+        qs = Employee.all_objects.filter(active=True)
+        if options.get("company_id"):
+            qs = qs.filter(company_id=options["company_id"])
+        employee_ids = list(qs.order_by("id").values_list("id", flat=True)[: options.get("employees") or 200])
+        if not employee_ids:
+            raise CommandError("No active employees found to simulate punches for.")
+
+        self.host = options.get("host")
+        self.port = options.get("port")
+        self.batch = max(1, options.get("batch") or 20)
+        self.max_retries = options.get("max_retries") or 0
+
+        devices = max(1, options.get("devices") or 1)
+        per_device = max(0, options.get("punches") or 0)
+
+        # كل حدث بثانية فريدة عبر كل الأجهزة → لا تصادم مع unique (employee, ts, kind)
+        self.base_ts = timezone.now().replace(microsecond=0) - timedelta(seconds=devices * per_device)
+        self.devices = devices
+
+        self.totals = {"sent": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "retries": 0, "failed": 0}
+        self.latencies = []
+
+        started = time.perf_counter()
+        asyncio.run(self._run(devices, per_device, employee_ids))
+        elapsed = time.perf_counter() - started
+
+        t = self.totals
+        lat = sorted(self.latencies)
+        p50 = lat[len(lat) // 2] * 1000 if lat else 0
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000 if lat else 0
+        rate = t["accepted"] / elapsed if elapsed else 0
+
+        self.stdout.write(
+            f"devices={devices} sent={t['sent']} accepted={t['accepted']} duplicates={t['duplicates']} "
+            f"rejected={t['rejected']} "
+            f"retries={t['retries']} failed={t['failed']}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Elapsed {elapsed:.2f}s → {rate:.0f} punches/s (request p50={p50:.1f}ms p95={p95:.1f}ms)"
+        ))
+
+    async def _run(self, devices, per_device, employee_ids):
+        await asyncio.gather(*(
+            self._device(n, per_device, employee_ids) for n in range(devices)
+        ))
+
+    def _make_punches(self, device_no, per_device, employee_ids):
+        for seq in range(per_device):
+            employee_id = employee_ids[(device_no + seq * self.devices) % len(employee_ids)]
+            ts = self.base_ts + timedelta(seconds=seq * self.devices + device_no)
+            yield {
+                "employee_id": employee_id,
+                "kind": "in" if seq % 2 == 0 else "out",
+                "ts": ts.isoformat(),
+                "source": f"sim-{device_no}",
+            }
+
+    async def _device(self, device_no, per_device, employee_ids):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            chunk = []
+            for punch in self._make_punches(device_no, per_device, employee_ids):
+                chunk.append(punch)
+                if len(chunk) >= self.batch:
+                    reader, writer = await self._send(reader, writer, chunk)
+                    chunk = []
+            if chunk:
+                reader, writer = await self._send(reader, writer, chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _send(self, reader, writer, chunk):
+        body = json.dumps({"punches": chunk}).encode("utf-8")
+        head = (
+            f"POST /punches HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+
+        self.totals["sent"] += len(chunk)
+        delay = 0.05
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(head + body)
+                await writer.drain()
+                status, payload = await self._read_response(reader)
+            except (asyncio.IncompleteReadError, OSError):
+                # الخادم أُعيد تشغيله: اتصال جديد ونفس الدفعة (idempotent)
+                if writer is not None:
+                    writer.close()
+                reader, writer = None, None
+                status, payload = None, None
+
+            if status == 200:
+                self.latencies.append(time.perf_counter() - started)
+                self.totals["accepted"] += payload.get("accepted", 0)
+                self.totals["duplicates"] += payload.get("duplicates", 0)
+                self.totals["rejected"] += len(payload.get("rejected", []))
+                return reader, writer
+
+            if attempt < self.max_retries:
+                self.totals["retries"] += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+        self.totals["failed"] += len(chunk)
+        return reader, writer
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+
+        body = await reader.readexactly(length) if length else b""
+        return status, json.loads(body or b"{}")
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_initial'),
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+        ('hr', '0024_alter_department_managers'),
+    ]
+
+    operations = [
+        # إزالة الأحداث المكررة (إن وُجدت) قبل فرض القيد — نبقي أقدم سجل لكل (employee, ts, kind)
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM att_log AS dup
+                USING att_log AS keep
+                WHERE dup.employee_id = keep.employee_id
+                  AND dup.ts = keep.ts
+                  AND dup.kind = keep.kind
+                  AND dup.id > keep.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='attendancelog',
+            constraint=models.UniqueConstraint(fields=('employee', 'ts', 'kind'), name='attlog_e_ts_kind_uniq'),
+        ),
+    ]
@@ -30,6 +30,8 @@ class AttendanceLog(models.Model):
         ]
         constraints = [
             models.CheckConstraint(name="attlog_kind_chk", check=models.Q(kind__in=["in", "out"])),
+            # نفس الحدث لا يُسجَّل مرتين (إعادة الإرسال من الأجهزة بعد انقطاع/إعادة تشغيل البوابة)
+            models.UniqueConstraint(fields=["employee", "ts", "kind"], name="attlog_e_ts_kind_uniq"),
         ]
         ordering = ("employee_id", "ts")
 
@@ -124,3 +124,145 @@ def rebuild_attendance_day(employee_id: int, the_date: date):
         )
     )
     return obj
+
+
+# ============================================================
+# Batch ingest (بوابة الأجهزة)
+# ============================================================
+
+def parse_punch(raw: dict) -> dict:
+    """
+    تحقق شكلي لحدث واحد قادم من جهاز (بدون أي استعلام DB).
+    يعيد dict نظيف أو يرفع ValueError برسالة قصيرة.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("punch must be an object")
+
+    try:
+        employee_id = int(raw.get("employee_id"))
+    except (TypeError, ValueError):
+        raise ValueError("employee_id is required")
+
+    kind = (raw.get("kind") or "").strip().lower()
+    if kind not in ("in", "out"):
+        raise ValueError("kind must be 'in' or 'out'")
+
+    ts_raw = raw.get("ts")
+    try:
+        ts = datetime.fromisoformat(str(ts_raw))
+    except (TypeError, ValueError):
+        raise ValueError("ts must be an ISO-8601 datetime")
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+
+    company_id = raw.get("company_id")
+    if company_id not in (None, ""):
+        try:
+            company_id = int(company_id)
+        except (TypeError, ValueError):
+            raise ValueError("company_id must be an integer")
+    else:
+        company_id = None
+
+    return {
+        "employee_id": employee_id,
+        "company_id": company_id,
+        "kind": kind,
+        "ts": ts,
+        "source": str(raw.get("source") or "device")[:32],
+        "note": str(raw.get("note") or "")[:255],
+    }
+
+
+def rebuild_attendance_days(pairs) -> int:
+    """
+    إعادة بناء AttendanceDay لمجموعة (employee_id, date) فريدة.
+    - كل يوم مستقل: فشل يوم لا يوقف البقية (نفس سلوك الإشارات).
+    """
+    done = 0
+    for employee_id, the_date in sorted(set(pairs)):
+        try:
+            rebuild_attendance_day(employee_id, the_date)
+            done += 1
+        except Exception:
+            # لا نكسر الإدخال بسبب إعادة بناء التلخيص
+            pass
+    return done
+
+
+def ingest_punches(punches, *, rebuild_days: bool = True) -> dict:
+    """
+    يكتب دفعة أحداث (ناتجة عن parse_punch) إلى AttendanceLog:
+    - تحقق الموظف/الشركة باستعلام واحد للدفعة كلها
+    - الأحداث المكررة (موجودة مسبقًا في DB أو مكررة داخل الدفعة نفسها)
+      لا تُحسب ضمن accepted بل تُعاد في duplicates
+      → إعادة إرسال نفس الدفعة بعد إعادة تشغيل البوابة آمنة
+    - bulk_create مع ignore_conflicts يبقى كشبكة أمان لسباق إدخال متزامن
+    - إعادة بناء الأيام المتأثرة مرة واحدة لكل (employee, date) — للأحداث الجديدة فقط
+
+    يعيد: {"accepted": n, "duplicates": [index, ...], "rejected": [(index, reason), ...]}
+    """
+    punches = list(punches)
+    emp_ids = {p["employee_id"] for p in punches}
+
+    employees = {
+        row["id"]: row
+        for row in Employee.all_objects
+        .filter(id__in=emp_ids)
+        .values("id", "company_id", "active")
+    }
+
+    valid, rejected = [], []
+    for idx, p in enumerate(punches):
+        emp = employees.get(p["employee_id"])
+        if emp is None:
+            rejected.append((idx, "unknown employee"))
+            continue
+        if not emp["active"]:
+            rejected.append((idx, "inactive employee"))
+            continue
+        if p["company_id"] and p["company_id"] != emp["company_id"]:
+            rejected.append((idx, "company mismatch"))
+            continue
+        valid.append((idx, p, emp))
+
+    # مفاتيح موجودة مسبقًا — استعلام واحد مقيّد بموظفي الدفعة ونطاقها الزمني
+    existing = set()
+    if valid:
+        ts_values = [p["ts"] for _, p, _ in valid]
+        existing = set(
+            AttendanceLog.objects
+            .filter(
+                employee_id__in={p["employee_id"] for _, p, _ in valid},
+                ts__gte=min(ts_values),
+                ts__lte=max(ts_values),
+            )
+            .values_list("employee_id", "ts", "kind")
+        )
+
+    rows, duplicates, touched = [], [], set()
+    for idx, p, emp in valid:
+        key = (p["employee_id"], p["ts"], p["kind"])
+        if key in existing:
+            duplicates.append(idx)
+            continue
+        existing.add(key)
+
+        rows.append(AttendanceLog(
+            company_id=emp["company_id"],
+            employee_id=p["employee_id"],
+            kind=p["kind"],
+            ts=p["ts"],
+            source=p["source"],
+            note=p["note"],
+        ))
+        touched.add((p["employee_id"], timezone.localdate(p["ts"])))
+
+    if rows:
+        with transaction.atomic():
+            AttendanceLog.objects.bulk_create(rows, ignore_conflicts=True)
+
+    if rebuild_days and touched:
+        rebuild_attendance_days(touched)
+
+    return {"accepted": len(rows), "duplicates": duplicates, "rejected": rejected}
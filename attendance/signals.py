@@ -2,16 +2,22 @@ from datetime import date
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from base.side_effects import on_commit_once
 from .models import AttendanceLog
 from .services import rebuild_attendance_day
 from hr.models import EmployeeSchedule, EmployeeDayOff, WorkShiftRule
 
-def _rebuild_for_instance(employee_id, dt):
+def _rebuild_now(employee_id, dt):
     try:
         rebuild_attendance_day(employee_id, dt)
     except Exception:
         pass  # لا نكسر الطلب الإداري
 
+def _rebuild_for_instance(employee_id, dt):
+    # مرة واحدة لكل (موظف، يوم) بعد commit: بصمات اليوم كلها → rebuild واحد
+    if employee_id and dt:
+        on_commit_once(("attendance.day", employee_id, dt), lambda: _rebuild_now(employee_id, dt))
+
 @receiver(post_save, sender=AttendanceLog)
 @receiver(post_delete, sender=AttendanceLog)
 def _rebuild_on_log(sender, instance, **kwargs):
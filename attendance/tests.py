@@ -1,3 +1,97 @@
+from datetime import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+
+from attendance.models import AttendanceLog
+from attendance.services import ingest_punches, parse_punch
+from base.models import Company
+from hr.models import Department, Employee
+
+
+class ParsePunchTests(TestCase):
+    """
+    parse_punch: تحقق شكلي فقط — لا يلمس DB.
+    """
+
+    def test_valid_punch_is_normalized(self):
+        p = parse_punch({"employee_id": "7", "kind": " IN ", "ts": "2026-03-01T08:00:00", "company_id": "3"})
+
+        self.assertEqual(p["employee_id"], 7)
+        self.assertEqual(p["company_id"], 3)
+        self.assertEqual(p["kind"], "in")
+        self.assertTrue(timezone.is_aware(p["ts"]))
+        self.assertEqual(p["source"], "device")
+        self.assertEqual(p["note"], "")
+
+    def test_invalid_punches_raise_value_error(self):
+        bad = [
+            "not a dict",
+            {"kind": "in", "ts": "2026-03-01T08:00:00"},
+            {"employee_id": 1, "kind": "break", "ts": "2026-03-01T08:00:00"},
+            {"employee_id": 1, "kind": "in", "ts": "yesterday"},
+            {"employee_id": 1, "kind": "in", "ts": "2026-03-01T08:00:00", "company_id": "x"},
+        ]
+        for raw in bad:
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValueError):
+                    parse_punch(raw)
+
+
+class IngestPunchesTests(TestCase):
+    """
+    ingest_punches: accepted = ما كُتب فعلًا، المكرر يُعاد في duplicates،
+    والمرفوض مع سببه في rejected.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Att Co")
+        other = Company.objects.create(name="Other Att Co")
+        dept = Department.objects.create(name="Floor", company=cls.company)
+        cls.employee = Employee.objects.create(name="Att Emp", company=cls.company, department=dept)
+        cls.inactive = Employee.objects.create(name="Att Gone", company=cls.company, department=dept)
+        # active تُضبط من حالة الموظف داخل pre_save → نتجاوزها مباشرة
+        Employee.all_objects.filter(pk=cls.inactive.pk).update(active=False)
+        cls.other_company_id = other.pk
+
+    def _punch(self, employee_id, hour, kind="in", **extra):
+        ts = timezone.make_aware(datetime(2026, 3, 1, hour, 0))
+        return parse_punch({"employee_id": employee_id, "kind": kind, "ts": ts.isoformat(), **extra})
+
+    def test_accepts_new_punches_and_reports_rejections(self):
+        punches = [
+            self._punch(self.employee.pk, 8),
+            self._punch(self.employee.pk, 17, kind="out"),
+            self._punch(999999, 8),
+            self._punch(self.inactive.pk, 8),
+            self._punch(self.employee.pk, 9, company_id=self.other_company_id),
+        ]
+
+        result = ingest_punches(punches, rebuild_days=False)
+
+        self.assertEqual(result["accepted"], 2)
+        self.assertEqual(result["duplicates"], [])
+        self.assertEqual(
+            result["rejected"],
+            [(2, "unknown employee"), (3, "inactive employee"), (4, "company mismatch")],
+        )
+        self.assertEqual(AttendanceLog.objects.filter(employee=self.employee).count(), 2)
+
+    def test_duplicates_are_not_counted_as_accepted(self):
+        ingest_punches([self._punch(self.employee.pk, 8)], rebuild_days=False)
+
+        # إعادة إرسال نفس الحدث + تكرار داخل الدفعة نفسها
+        result = ingest_punches(
+            [
+                self._punch(self.employee.pk, 8),
+                self._punch(self.employee.pk, 12, kind="out"),
+                self._punch(self.employee.pk, 12, kind="out"),
+            ],
+            rebuild_days=False,
+        )
 
-# Create your tests here.
+        self.assertEqual(result["accepted"], 1)
+        self.assertEqual(result["duplicates"], [0, 2])
+        self.assertEqual(result["rejected"], [])
+        self.assertEqual(AttendanceLog.objects.filter(employee=self.employee).count(), 2)
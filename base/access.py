@@ -3,6 +3,8 @@
 from django.contrib.auth import get_user_model
 from django.apps import apps
 
+from base.access_context import get_access_context
+
 Employee = apps.get_model("hr", "Employee")
 Department = apps.get_model("hr", "Department")
 
@@ -19,6 +21,9 @@ def get_employee(user: User):
     """
     if not user or not user.is_authenticated:
         return None
+    ctx = get_access_context(user)
+    if ctx is not None:
+        return ctx.employee
     try:
         return Employee.objects.get(user=user)
     except Employee.DoesNotExist:
@@ -29,6 +34,9 @@ def user_is_hr_manager(user: User) -> bool:
     """
     HR Managers have full access on HR objects.
     """
+    ctx = get_access_context(user)
+    if ctx is not None:
+        return ctx.in_group("HR Managers")
     return user.groups.filter(name="HR Managers").exists()
 
 
@@ -41,6 +49,9 @@ def is_in_same_company(user: User, company_id):
         return False
     if not company_id:
         return False
+    ctx = get_access_context(user)
+    if ctx is not None:
+        return company_id in ctx.company_ids
     return company_id in list(user.company_ids)
 
 
@@ -66,10 +77,5 @@ def user_is_in_manager_chain(user: User, employee: Employee) -> bool:
     if not emp:
         return False
 
-    current = employee.manager
-    while current:
-        if current.id == emp.id:
-            return True
-        current = current.manager
-
-    return False
+    # فحص على manager_path المخزّن بدل المشي مديرًا مديرًا
+    return emp.id in employee.manager_chain_ids()
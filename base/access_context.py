@@ -0,0 +1,91 @@
+# base/access_context.py
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional
+
+# ===============================================================
+# AccessContext — بيانات الصلاحيات للمستخدم الحالي (مرة واحدة لكل طلب)
+#
+# دوال base.access / hr.access / performance.access ... تُستدعى مئات المرات
+# داخل حلقات القوالب؛ كل استدعاء كان يعيد:
+#   - Employee.objects.get(user=user)
+#   - user.groups.filter(...).exists()
+#   - user.company_ids (استعلام M2M)
+# هنا تُحمَّل هذه القيم عند أول حاجة لها وتبقى حتى نهاية الطلب.
+# ===============================================================
+
+
+@dataclass(frozen=True)
+class AccessContext:
+    user_id: int
+    employee: Optional[object] = None          # hr.Employee أو None
+    group_names: FrozenSet[str] = field(default_factory=frozenset)
+    company_ids: FrozenSet[int] = field(default_factory=frozenset)
+
+    @property
+    def employee_id(self) -> Optional[int]:
+        return getattr(self.employee, "id", None)
+
+    def in_group(self, name: str) -> bool:
+        return name in self.group_names
+
+
+class _Slot:
+    """حاوية الطلب الحالي: المستخدم المربوط + السياق بعد بنائه (lazy)."""
+
+    __slots__ = ("user", "context")
+
+    def __init__(self, user):
+        self.user = user
+        self.context: Optional[AccessContext] = None
+
+
+_access_slot: ContextVar[Optional[_Slot]] = ContextVar("access_context_slot", default=None)
+
+
+# ===============================================================
+# Build / bind
+# ===============================================================
+
+def build_access_context(user) -> AccessContext:
+    """تحميل الموظف والمجموعات والشركات (3 استعلامات كحد أقصى)."""
+    from django.apps import apps  # LAZY IMPORT
+
+    Employee = apps.get_model("hr", "Employee")
+    employee = Employee.objects.filter(user=user).first()
+
+    return AccessContext(
+        user_id=user.pk,
+        employee=employee,
+        group_names=frozenset(user.groups.values_list("name", flat=True)),
+        company_ids=frozenset(user.company_ids),
+    )
+
+
+def bind_access_context(user) -> None:
+    """يربط المستخدم بالطلب الحالي؛ البناء الفعلي يتم عند أول قراءة."""
+    if user is not None and getattr(user, "is_authenticated", False):
+        _access_slot.set(_Slot(user))
+    else:
+        _access_slot.set(None)
+
+
+def clear_access_context() -> None:
+    _access_slot.set(None)
+
+
+def get_access_context(user) -> Optional[AccessContext]:
+    """
+    السياق المخزّن إن كان user هو مستخدم الطلب الحالي، وإلا None
+    (خارج الطلبات أو عند فحص مستخدم آخر → الدوال تعود للاستعلام المباشر).
+    """
+    slot = _access_slot.get()
+    if slot is None or user is None or not getattr(user, "is_authenticated", False):
+        return None
+    if slot.user.pk != user.pk:
+        return None
+    if slot.context is None:
+        slot.context = build_access_context(slot.user)
+    return slot.context
@@ -320,6 +320,216 @@ class UserAdmin(UnscopedAdminMixin, HideAuditFieldsMixin, DjangoUserAdmin):
         return result
 
 
+# ============================================================
+# Request query profiles (QueryProfilingMiddleware)
+# ============================================================
+
+@admin.register(models.RequestQueryProfile)
+class RequestQueryProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "view_name",
+        "status_code",
+        "query_count",
+        "duplicate_count",
+        "db_time_ms",
+        "wall_time_ms",
+    )
+    list_filter = ("method", "status_code")
+    search_fields = ("view_name", "path")
+    date_hierarchy = "created_at"
+    ordering = ("-id",)
+    change_list_template = "admin/base/requestqueryprofile/change_list.html"
+
+    REPORT_ORDERS = {
+        "avg_queries": "Avg queries",
+        "avg_duplicates": "Avg repeated queries",
+        "avg_db_ms": "Avg DB time",
+        "avg_wall_ms": "Avg wall time",
+    }
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        from django.urls import path
+
+        custom = [
+            path(
+                "report/",
+                self.admin_site.admin_view(self.report_view),
+                name="base_requestqueryprofile_report",
+            ),
+        ]
+        return custom + super().get_urls()
+
+    def report_view(self, request):
+        from django.template.response import TemplateResponse
+
+        from base.query_profiling import endpoint_report, profiling_enabled
+
+        try:
+            hours = max(1, int(request.GET.get("hours", 24)))
+        except ValueError:
+            hours = 24
+        order = request.GET.get("order", "avg_queries")
+        if order not in self.REPORT_ORDERS:
+            order = "avg_queries"
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Worst endpoints",
+            "hours": hours,
+            "order": order,
+            "orders": self.REPORT_ORDERS,
+            "enabled": profiling_enabled(),
+            "endpoints": endpoint_report(hours=hours, order=order),
+        }
+        return TemplateResponse(request, "admin/base/requestqueryprofile/report.html", context)
+
+
+@admin.register(models.SignalReceiverProfile)
+class SignalReceiverProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "signal",
+        "receiver",
+        "sender",
+        "calls",
+        "total_ms_display",
+        "self_ms_display",
+        "avg_ms",
+        "max_ms_display",
+        "queries",
+        "self_queries",
+        "updated_at",
+    )
+    list_filter = ("signal",)
+    search_fields = ("receiver", "sender")
+    ordering = ("-self_ms",)
+    change_list_template = "admin/base/signalreceiverprofile/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Total ms", ordering="total_ms")
+    def total_ms_display(self, obj):
+        return round(obj.total_ms, 1)
+
+    @admin.display(description="Self ms", ordering="self_ms")
+    def self_ms_display(self, obj):
+        return round(obj.self_ms, 1)
+
+    @admin.display(description="Max ms", ordering="max_ms")
+    def max_ms_display(self, obj):
+        return round(obj.max_ms, 1)
+
+    def changelist_view(self, request, extra_context=None):
+        from base.signal_profiling import profiling_enabled, totals_by_signal
+
+        extra_context = {
+            **(extra_context or {}),
+            "profiling_enabled": profiling_enabled(),
+            "signal_totals": totals_by_signal(),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+@admin.register(models.RequestCpuProfile)
+class RequestCpuProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "view_name",
+        "company",
+        "status_code",
+        "wall_time_ms",
+        "trigger",
+        "hottest_function",
+    )
+    list_filter = ("trigger", "company", "status_code")
+    search_fields = ("view_name", "path")
+    date_hierarchy = "created_at"
+    ordering = ("-id",)
+    list_select_related = ("company",)
+    fields = (
+        "created_at", "method", "path", "view_name", "status_code", "company", "user",
+        "trigger", "wall_time_ms", "download_link", "top_functions_table",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Hottest function")
+    def hottest_function(self, obj):
+        # الأول غالبًا الـ view/middleware نفسه → أول دالة من كود المشروع خارج Django
+        for row in obj.top_functions or []:
+            function = row["function"]
+            if not function.startswith(("django", "{", "<", "cProfile")) and "/django/" not in function:
+                return f"{function} ({row['cumtime_ms']:.0f} ms)"
+        return "—"
+
+    @admin.display(description="Profile file")
+    def download_link(self, obj):
+        from base.request_profiling import file_path
+
+        if not obj.pk or file_path(obj) is None:
+            return "—"
+        url = reverse("admin:base_requestcpuprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}</a> (pstats / snakeviz)', url, obj.prof_file)
+
+    @admin.display(description="Top functions (cumulative)")
+    def top_functions_table(self, obj):
+        from django.utils.html import format_html_join
+
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            ((r["cumtime_ms"], r["tottime_ms"], r["ncalls"], r["function"]) for r in obj.top_functions or []),
+        )
+        return format_html(
+            "<table><thead><tr><th>cum ms</th><th>self ms</th><th>calls</th><th>function</th></tr></thead>"
+            "<tbody>{}</tbody></table>",
+            rows,
+        )
+
+    def get_urls(self):
+        from django.urls import path
+
+        custom = [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="base_requestcpuprofile_download",
+            ),
+        ]
+        return custom + super().get_urls()
+
+    def download_view(self, request, pk):
+        from django.http import FileResponse, Http404
+
+        from base.request_profiling import file_path
+
+        obj = self.get_object(request, str(pk))
+        if obj is None or not self.has_view_permission(request, obj):
+            raise Http404
+        path = file_path(obj)
+        if path is None:
+            raise Http404("Profile file is no longer available.")
+        return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
+
+
 # ============================================================
 # Global Admin Tweaks
 # ============================================================
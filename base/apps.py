@@ -21,3 +21,7 @@ class BaseConfig(AppConfig):
             import hr.signals  # noqa: F401
         except Exception:
             logger.debug("hr.signals could not be imported (optional).", exc_info=True)
+
+        # قياس كلفة مستقبلات الإشارات (SIGNAL_PROFILING_ENABLED) — لا شيء إن كان معطّلًا
+        from . import signal_profiling
+        signal_profiling.install()
@@ -0,0 +1,409 @@
+# base/benchmarks.py
+# ============================================================
+# Benchmarks — عدد الاستعلامات والزمن لسيناريوهات ثابتة
+#
+# - SCENARIOS: سجل السيناريوهات (صفحات + خدمات)
+# - run(): يشغّل السيناريوهات على شركة من generate_load_data
+#   داخل معاملة تُلغى في النهاية (لا أثر على البيانات)؛
+#   callbacks الـ on_commit تُنفَّذ داخل القياس كأن المعاملة ثُبّتت
+# - check_budgets() / compare_to_baseline(): قائمة الإخفاقات
+#   (تجاوز الميزانية أو تراجع عن الـ baseline المحفوظ)
+#
+# الإعدادات:
+#   BENCHMARK_BUDGETS        {scenario: {"queries": n, "ms": t}} يتجاوز DEFAULT_BUDGETS
+#   BENCHMARK_BASELINE_PATH  (BASE_DIR / "benchmarks" / "baseline.json")
+# ============================================================
+
+from __future__ import annotations
+
+import json
+import logging
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from base.query_profiling import QueryCollector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_SIZE = 50
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = 0.5  # +50% زمن مسموح قبل اعتباره تراجعًا
+
+# ميزانيات لبيانات generate_load_data الافتراضية (1000 موظف) و sample_size=50؛
+# الزمن بالميلي ثانية (median) — تُضبط لكل بيئة عبر BENCHMARK_BUDGETS.
+# employee_list / department_tree يكبران مع حجم الشركة (readiness لكل موظف، استعلامات لكل قسم)
+# → بلا ميزانية مطلقة افتراضيًا؛ الـ baseline يحميهما من التراجع
+DEFAULT_BUDGETS: Dict[str, dict] = {
+    "employee_detail": {"queries": 50, "ms": 1000},
+    "home_dashboard": {"queries": 30, "ms": 1000},
+    "evaluation_recompute": {"queries": 20, "ms": 2000},
+    "payroll_run": {"queries": 4000, "ms": 10000},
+    "attendance_rebuild": {"queries": 2500, "ms": 8000},
+    "objective_rescore": {"queries": 12000, "ms": 20000},
+}
+
+
+def budgets() -> Dict[str, dict]:
+    merged = {name: dict(b) for name, b in DEFAULT_BUDGETS.items()}
+    for name, b in (getattr(settings, "BENCHMARK_BUDGETS", None) or {}).items():
+        merged.setdefault(name, {}).update(b)
+    return merged
+
+
+def baseline_path() -> Path:
+    return Path(getattr(settings, "BENCHMARK_BASELINE_PATH", settings.BASE_DIR / "benchmarks" / "baseline.json"))
+
+
+# ============================================================
+# Environment
+# ============================================================
+
+@dataclass
+class BenchmarkEnv:
+    company: object
+    user: object
+    client: Client
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+
+    @property
+    def company_id(self) -> int:
+        return self.company.pk
+
+    def employee_ids(self) -> List[int]:
+        Employee = apps.get_model("hr", "Employee")
+        return list(
+            Employee._base_manager.filter(company_id=self.company_id, active=True)
+            .order_by("id").values_list("id", flat=True)[:self.sample_size]
+        )
+
+
+def resolve_company(company_id: Optional[int] = None, prefix: str = "Load"):
+    """الشركة المحددة أو أول شركة مولّدة بـ generate_load_data (--prefix)."""
+    Company = apps.get_model("base", "Company")
+    qs = Company.objects.filter(pk=company_id) if company_id else (
+        Company.objects.filter(name__startswith=f"{prefix} Company").order_by("id")
+    )
+    company = qs.first()
+    if company is None:
+        raise ValueError(
+            f"No benchmark company found (id={company_id}, prefix={prefix!r}); run generate_load_data first."
+        )
+    return company
+
+
+def build_env(company, sample_size: int = DEFAULT_SAMPLE_SIZE) -> BenchmarkEnv:
+    """superuser مؤقت محصور بالشركة (يُحذف مع إلغاء المعاملة)."""
+    User = apps.get_model("base", "User")
+    user = User.objects.create_superuser(f"bench-{uuid.uuid4().hex[:12]}@example.com", None, company=company)
+    user.companies.set([company.pk])
+
+    client = Client(HTTP_HOST="localhost")
+    client.force_login(user)
+    session = client.session
+    session["current_company_id"] = company.pk
+    session["active_company_ids"] = [company.pk]
+    session.save()
+    return BenchmarkEnv(company=company, user=user, client=client, sample_size=sample_size)
+
+
+# ============================================================
+# Scenarios
+# ============================================================
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    # env → callable يُقاس (التحضير نفسه غير محسوب)
+    prepare: Callable[[BenchmarkEnv], Callable[[], object]]
+    # يُستدعى قبل كل تكرار (خارج القياس)، مثل تفريغ الكاش
+    before_each: Optional[Callable[[BenchmarkEnv], None]] = None
+    description: str = ""
+
+
+def _get(env: BenchmarkEnv, url: str) -> Callable[[], object]:
+    def call():
+        response = env.client.get(url)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {url} returned {response.status_code}")
+        return response
+    return call
+
+
+def _employee_list(env):
+    return _get(env, reverse("hr:employee_list"))
+
+
+def _employee_detail(env):
+    Employee = apps.get_model("hr", "Employee")
+    # موظف لديه مرؤوسون (رئيس قسم) → أثقل صفحة تفاصيل
+    emp = (
+        Employee._base_manager.filter(company_id=env.company_id, active=True, department__manager_id=F("pk"))
+        .order_by("id").first()
+        or Employee._base_manager.filter(company_id=env.company_id).order_by("id").first()
+    )
+    return _get(env, reverse("hr:employee_detail", args=[emp.pk]))
+
+
+def _department_tree(env):
+    return _get(env, reverse("hr:department_list"))
+
+
+def _home_dashboard(env):
+    return _get(env, reverse("base:home"))
+
+
+def _clear_dashboard_cache(env):
+    from base.dashboard import _company_key  # LAZY IMPORT
+    cache.delete(_company_key(env.company_id))
+
+
+def _evaluation_recompute(env):
+    from performance.services import EvaluationCycleEngine  # LAZY IMPORT
+
+    Evaluation = apps.get_model("performance", "Evaluation")
+    ids = list(
+        Evaluation.all_objects.filter(company_id=env.company_id)
+        .order_by("id").values_list("id", flat=True)[:env.sample_size]
+    )
+    return lambda: EvaluationCycleEngine.recompute(ids)
+
+
+def _payroll_run(env):
+    from payroll.services import generate_payslips_for_period, seed_minimal_rules  # LAZY IMPORT
+
+    PayrollPeriod = apps.get_model("payroll", "PayrollPeriod")
+    PayrollStructure = apps.get_model("payroll", "PayrollStructure")
+    Employee = apps.get_model("hr", "Employee")
+
+    period = PayrollPeriod.objects.filter(company_id=env.company_id, state="open").order_by("-date_from").first()
+    if period is None:
+        first = timezone.localdate().replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        period = PayrollPeriod.objects.create(
+            company_id=env.company_id, month=first.month, year=first.year,
+            date_from=first, date_to=next_month - timedelta(days=1),
+        )
+    if not PayrollStructure.objects.filter(company_id=env.company_id).exists():
+        seed_minimal_rules(PayrollStructure.objects.create(company_id=env.company_id, name="Benchmark", code="BENCH"))
+
+    employees = Employee._base_manager.filter(pk__in=env.employee_ids())
+    return lambda: generate_payslips_for_period(period, employees, overwrite=True)
+
+
+def _attendance_rebuild(env):
+    from attendance.services import rebuild_attendance_days  # LAZY IMPORT
+
+    AttendanceLog = apps.get_model("attendance", "AttendanceLog")
+    tz = timezone.get_current_timezone()
+    pairs = {
+        (employee_id, timezone.localtime(ts, tz).date())
+        for employee_id, ts in AttendanceLog.objects.filter(employee_id__in=env.employee_ids())
+        .values_list("employee_id", "ts")
+    }
+    return lambda: rebuild_attendance_days(pairs)
+
+
+def _objective_rescore(env):
+    Objective = apps.get_model("performance", "Objective")
+    # الأحدث = أهداف الأقسام الطرفية (فرق صغيرة)؛ أهداف الجذر تشمل كل موظفي الشركة
+    objectives = list(
+        Objective.all_objects.filter(company_id=env.company_id, active=True).order_by("-id")[:env.sample_size]
+    )
+
+    def call():
+        for objective in objectives:
+            objective.recompute_progress_and_score()
+            Objective.all_objects.filter(pk=objective.pk).update(
+                progress_pct=objective.progress_pct, score_pct=objective.score_pct,
+            )
+            objective.compute_employee_scores()
+        return len(objectives)
+    return call
+
+
+SCENARIOS: Dict[str, Scenario] = {s.name: s for s in (
+    Scenario("employee_list", _employee_list, description="GET hr:employee_list"),
+    Scenario("employee_detail", _employee_detail, description="GET hr:employee_detail (department manager)"),
+    Scenario("department_tree", _department_tree, description="GET hr:department_list"),
+    Scenario("home_dashboard", _home_dashboard, before_each=_clear_dashboard_cache,
+             description="GET base:home with a cold company cache"),
+    Scenario("evaluation_recompute", _evaluation_recompute, description="EvaluationCycleEngine.recompute"),
+    Scenario("payroll_run", _payroll_run, description="generate_payslips_for_period(overwrite=True)"),
+    Scenario("attendance_rebuild", _attendance_rebuild, description="rebuild_attendance_days over logged days"),
+    Scenario("objective_rescore", _objective_rescore, description="Objective progress/score + employee scores"),
+)}
+
+
+# ============================================================
+# Runner
+# ============================================================
+
+@dataclass
+class ScenarioResult:
+    name: str
+    queries: int = 0
+    duplicates: int = 0
+    db_ms: float = 0.0
+    ms_runs: List[float] = field(default_factory=list)
+
+    @property
+    def ms_median(self) -> float:
+        return round(statistics.median(self.ms_runs), 2) if self.ms_runs else 0.0
+
+    @property
+    def ms_min(self) -> float:
+        return round(min(self.ms_runs), 2) if self.ms_runs else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.queries,
+            "duplicates": self.duplicates,
+            "db_ms": round(self.db_ms, 2),
+            "ms": self.ms_median,
+            "ms_min": self.ms_min,
+            "ms_runs": [round(ms, 2) for ms in self.ms_runs],
+        }
+
+
+def _run_on_commit_callbacks(start: int) -> int:
+    """
+    تنفيذ callbacks الـ on_commit المسجّلة بعد start (ومن تسجّله هي بدورها)
+    كما يفعل captureOnCommitCallbacks(execute=True): المعاملة لا تُثبَّت أبدًا،
+    وبدون ذلك تغيب كلفة الآثار المؤجلة (participants / attendance / search / follows / rollups).
+    """
+    executed = 0
+    while True:
+        pending = connection.run_on_commit[start:]
+        if not pending:
+            return executed
+        start = len(connection.run_on_commit)
+        for _sids, callback, robust in pending:
+            executed += 1
+            if not robust:
+                callback()
+                continue
+            try:
+                callback()
+            except Exception:
+                logger.exception("Robust on_commit callback %r failed during benchmark", callback)
+
+
+def _measure(env: BenchmarkEnv, scenario: Scenario, repeats: int) -> ScenarioResult:
+    func = scenario.prepare(env)
+    result = ScenarioResult(scenario.name)
+
+    # تكرار أول للإحماء (كاش القوالب/ContentType …) غير محسوب
+    for i in range(repeats + 1):
+        if scenario.before_each:
+            scenario.before_each(env)
+        # execute_wrapper بدل CaptureQueriesContext: الأخير محدود بـ 9000 استعلام
+        collector = QueryCollector()
+        sid = transaction.savepoint()
+        start = len(connection.run_on_commit)
+        try:
+            with connection.execute_wrapper(collector):
+                started = time.perf_counter()
+                func()
+                # الآثار المؤجلة لـ commit جزء من كلفة الكتابة → داخل نافذة القياس
+                _run_on_commit_callbacks(start)
+                elapsed = (time.perf_counter() - started) * 1000
+        finally:
+            # كل تكرار يبدأ من نفس البيانات (ويحذف callbacks المنفّذة من قائمة المعاملة)
+            transaction.savepoint_rollback(sid)
+        if i and collector.count >= result.queries:
+            result.queries = collector.count
+            result.duplicates = collector.duplicate_count
+            result.db_ms = collector.time * 1000
+        if i:
+            result.ms_runs.append(elapsed)
+    return result
+
+
+def run(names: Optional[Iterable[str]] = None, *, company_id: Optional[int] = None, prefix: str = "Load",
+        sample_size: int = DEFAULT_SAMPLE_SIZE, repeats: int = DEFAULT_REPEATS) -> dict:
+    """
+    تشغيل السيناريوهات → {"company_id", "sample_size", "repeats", "created_at", "scenarios": {name: {...}}}.
+    كل شيء داخل معاملة تُلغى في النهاية.
+    """
+    names = list(names or SCENARIOS.keys())
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    company = resolve_company(company_id, prefix)
+    results: Dict[str, dict] = {}
+    with transaction.atomic():
+        env = build_env(company, sample_size=sample_size)
+        for name in names:
+            results[name] = _measure(env, SCENARIOS[name], max(1, repeats)).as_dict()
+        transaction.set_rollback(True)
+
+    return {
+        "company_id": company.pk,
+        "sample_size": sample_size,
+        "repeats": repeats,
+        "created_at": timezone.now().isoformat(),
+        "scenarios": results,
+    }
+
+
+# ============================================================
+# Budgets / baseline
+# ============================================================
+
+def check_budgets(report: dict, limits: Optional[Dict[str, dict]] = None) -> List[str]:
+    limits = budgets() if limits is None else limits
+    failures = []
+    for name, data in report["scenarios"].items():
+        limit = limits.get(name) or {}
+        if "queries" in limit and data["queries"] > limit["queries"]:
+            failures.append(f"{name}: {data['queries']} queries > budget {limit['queries']}")
+        if "ms" in limit and data["ms"] > limit["ms"]:
+            failures.append(f"{name}: {data['ms']:.1f} ms > budget {limit['ms']} ms")
+    return failures
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    أي زيادة في عدد الاستعلامات = تراجع (حتمي)؛
+    الزمن يُقارن بهامش tolerance (الضجيج).
+    """
+    failures = []
+    for name, data in report["scenarios"].items():
+        base = (baseline.get("scenarios") or {}).get(name)
+        if not base:
+            continue
+        if data["queries"] > base["queries"]:
+            failures.append(f"{name}: {data['queries']} queries > baseline {base['queries']}")
+        allowed = base["ms"] * (1 + tolerance)
+        if data["ms"] > allowed:
+            failures.append(f"{name}: {data['ms']:.1f} ms > baseline {base['ms']:.1f} ms (+{tolerance:.0%})")
+    return failures
+
+
+def load_baseline(path: Optional[Path] = None) -> Optional[dict]:
+    path = Path(path or baseline_path())
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_report(report: dict, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    return path
@@ -0,0 +1,263 @@
+# base/dashboard.py
+# ============================================================
+# عدّادات لوحة HomeView — لكل شركة، مخزّنة في الكاش
+#
+# - كل موديل = استعلام واحد بتجميعات شرطية مجمّعة حسب company_id
+#   (بدل ~20 استدعاء count() منفصل في كل عرض للصفحة)
+# - النتيجة لكل شركة تُخزَّن بمفتاح مستقل → اختيار عدة شركات = جمع أرقام جاهزة
+# - المستخدمون ليسوا جمعيين (M2M companies) → تجميع واحد لمجموعة الشركات
+#   باستخدام EXISTS بدل join + distinct
+# - الإبطال: post_save/post_delete للموديلات المعنية (base.signals)
+# ============================================================
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from base.side_effects import on_commit_once
+
+DASHBOARD_METRICS_TTL = getattr(settings, "DASHBOARD_METRICS_TTL", 60)
+
+# مفاتيح KPI / health الجمعية (تُجمع عبر الشركات)
+ADDITIVE_KEYS = (
+    "companies",  # 1 إذا كانت الشركة نشطة (عدد الشركات النشطة ضمن الاختيار)
+    "partners",
+    "partners_missing_contact",
+    "employees",
+    "employees_without_department",
+    "employees_without_skills",
+    "assets",
+    "assets_unassigned",
+    "employee_skills",
+    "payslips",
+    "payslips_unpaid",
+)
+
+
+def _company_key(company_id: int) -> str:
+    return f"base:dash:company:{company_id}"
+
+
+def _users_version() -> int:
+    return cache.get_or_set("base:dash:users:version", 1, timeout=None)
+
+
+def _users_key(company_ids: Iterable[int]) -> str:
+    ids = ",".join(str(c) for c in sorted(set(company_ids)))
+    return f"base:dash:users:{_users_version()}:{ids}"
+
+
+# ============================================================
+# Computation (cache misses only)
+# ============================================================
+
+def _empty_company_metrics() -> dict:
+    data = {key: 0 for key in ADDITIVE_KEYS}
+    data["assets_by_status"] = {}
+    data["payslips_by_state"] = {}
+    return data
+
+
+def compute_company_metrics(company_ids: List[int]) -> Dict[int, dict]:
+    """العدّادات الجمعية لكل شركة (6 استعلامات مهما كان عدد الشركات)."""
+    Company = apps.get_model("base", "Company")
+    Partner = apps.get_model("base", "Partner")
+    Employee = apps.get_model("hr", "Employee")
+    Asset = apps.get_model("assets", "Asset")
+    EmployeeSkill = apps.get_model("skills", "EmployeeSkill")
+    Payslip = apps.get_model("payroll", "Payslip")
+
+    result = {cid: _empty_company_metrics() for cid in company_ids}
+    if not company_ids:
+        return result
+
+    for company_id in Company._base_manager.filter(id__in=company_ids, active=True).values_list("id", flat=True):
+        result[company_id]["companies"] = 1
+
+    # Partners: total + missing all of email/phone/mobile
+    partner_missing = (
+        (Q(email="") | Q(email__isnull=True))
+        & (Q(phone="") | Q(phone__isnull=True))
+        & (Q(mobile="") | Q(mobile__isnull=True))
+    )
+    for row in (
+        Partner._base_manager.filter(company_id__in=company_ids, active=True)
+        .values("company_id")
+        .annotate(total=Count("id"), missing=Count("id", filter=partner_missing))
+        .order_by()
+    ):
+        data = result[row["company_id"]]
+        data["partners"] = row["total"]
+        data["partners_missing_contact"] = row["missing"]
+
+    # Employees: total + without department + without any active skill
+    has_skill = Exists(
+        EmployeeSkill._base_manager.filter(
+            employee_id=OuterRef("pk"),
+            company_id=OuterRef("company_id"),
+            active=True,
+        )
+    )
+    for row in (
+        Employee._base_manager.filter(company_id__in=company_ids, active=True)
+        .annotate(has_skill=has_skill)
+        .values("company_id")
+        .annotate(
+            total=Count("id"),
+            no_dept=Count("id", filter=Q(department__isnull=True)),
+            no_skill=Count("id", filter=Q(has_skill=False)),
+        )
+        .order_by()
+    ):
+        data = result[row["company_id"]]
+        data["employees"] = row["total"]
+        data["employees_without_department"] = row["no_dept"]
+        data["employees_without_skills"] = row["no_skill"]
+
+    # Assets: per status + unassigned (الإجمالي = مجموع الحالات)
+    for row in (
+        Asset._base_manager.filter(company_id__in=company_ids, active=True)
+        .values("company_id", "status")
+        .annotate(cnt=Count("id"), unassigned=Count("id", filter=Q(holder__isnull=True)))
+        .order_by()
+    ):
+        data = result[row["company_id"]]
+        data["assets"] += row["cnt"]
+        data["assets_unassigned"] += row["unassigned"]
+        data["assets_by_status"][row["status"]] = row["cnt"]
+
+    for row in (
+        EmployeeSkill._base_manager.filter(company_id__in=company_ids, active=True)
+        .values("company_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        result[row["company_id"]]["employee_skills"] = row["total"]
+
+    # Payslips: per state (الإجمالي + غير المدفوع من نفس الصفوف)
+    for row in (
+        Payslip._base_manager.filter(company_id__in=company_ids)
+        .values("company_id", "state")
+        .annotate(cnt=Count("id"))
+        .order_by()
+    ):
+        data = result[row["company_id"]]
+        data["payslips"] += row["cnt"]
+        if row["state"] != "paid":
+            data["payslips_unpaid"] += row["cnt"]
+        data["payslips_by_state"][row["state"]] = row["cnt"]
+
+    return result
+
+
+def compute_user_metrics(company_ids: List[int]) -> dict:
+    """المستخدمون داخل النطاق (FK company أو M2M companies) — تجميع واحد."""
+    User = apps.get_model("base", "User")
+    in_m2m = Exists(
+        User.companies.through.objects.filter(user_id=OuterRef("pk"), company_id__in=company_ids)
+    )
+    return User._base_manager.filter(Q(company_id__in=company_ids) | in_m2m).aggregate(
+        users=Count("id"),
+        users_without_partner=Count("id", filter=Q(partner__isnull=True)),
+        users_inactive=Count("id", filter=Q(is_active=False)),
+        users_unverified_email=Count("id", filter=Q(email_verified=False)),
+    )
+
+
+# ============================================================
+# Public API
+# ============================================================
+
+def get_dashboard_metrics(company_ids: Iterable[int]) -> dict:
+    """
+    {"kpis": {...}, "health": {...}, "assets_by_status": {...}, "payslips_by_state": {...}}
+    لمجموعة الشركات المختارة؛ الحساب فقط للشركات غير الموجودة في الكاش.
+    """
+    company_ids = sorted(set(int(c) for c in company_ids))
+
+    cached = cache.get_many([_company_key(c) for c in company_ids])
+    per_company = {c: cached[_company_key(c)] for c in company_ids if _company_key(c) in cached}
+    missing = [c for c in company_ids if c not in per_company]
+    if missing:
+        fresh = compute_company_metrics(missing)
+        cache.set_many({_company_key(c): data for c, data in fresh.items()}, timeout=DASHBOARD_METRICS_TTL)
+        per_company.update(fresh)
+
+    totals = _empty_company_metrics()
+    for data in per_company.values():
+        for key in ADDITIVE_KEYS:
+            totals[key] += data[key]
+        for breakdown in ("assets_by_status", "payslips_by_state"):
+            for k, v in data[breakdown].items():
+                totals[breakdown][k] = totals[breakdown].get(k, 0) + v
+
+    users_key = _users_key(company_ids)
+    users = cache.get(users_key)
+    if users is None:
+        users = compute_user_metrics(company_ids) if company_ids else {
+            "users": 0, "users_without_partner": 0, "users_inactive": 0, "users_unverified_email": 0,
+        }
+        cache.set(users_key, users, timeout=DASHBOARD_METRICS_TTL)
+
+    skills = cache.get("base:dash:skills")
+    if skills is None:
+        Skill = apps.get_model("skills", "Skill")
+        skills = Skill._base_manager.filter(active=True).count()
+        cache.set("base:dash:skills", skills, timeout=DASHBOARD_METRICS_TTL)
+
+    def _sorted_desc(mapping):
+        return dict(sorted(mapping.items(), key=lambda kv: -kv[1]))
+
+    return {
+        "kpis": {
+            "companies": totals["companies"],
+            "partners": totals["partners"],
+            "users": users["users"],
+            "employees": totals["employees"],
+            "assets": totals["assets"],
+            "skills": skills,  # global by design
+            "employee_skills": totals["employee_skills"],
+            "payslips": totals["payslips"],
+        },
+        "health": {
+            "employees_without_department": totals["employees_without_department"],
+            "assets_unassigned": totals["assets_unassigned"],
+            "partners_missing_contact": totals["partners_missing_contact"],
+            "users_without_partner": users["users_without_partner"],
+            "users_inactive": users["users_inactive"],
+            "users_unverified_email": users["users_unverified_email"],
+            "payslips_unpaid": totals["payslips_unpaid"],
+            "employees_without_skills": totals["employees_without_skills"],
+        },
+        "assets_by_status": _sorted_desc(totals["assets_by_status"]),
+        "payslips_by_state": _sorted_desc(totals["payslips_by_state"]),
+    }
+
+
+# ============================================================
+# Invalidation
+# ============================================================
+
+def invalidate_company_metrics(*company_ids) -> None:
+    """حذف عدّادات الشركات بعد نجاح المعاملة (مرة لكل شركة مهما تكرر الحفظ)."""
+    for company_id in {c for c in company_ids if c}:
+        key = _company_key(company_id)
+        on_commit_once(("base.dashboard.company", company_id), lambda key=key: cache.delete(key))
+
+
+def invalidate_user_metrics() -> None:
+    def _bump():
+        try:
+            cache.incr("base:dash:users:version")
+        except ValueError:
+            cache.set("base:dash:users:version", 2, timeout=None)
+    on_commit_once(("base.dashboard.users",), _bump)
+
+
+def invalidate_skill_metrics() -> None:
+    on_commit_once(("base.dashboard.skills",), lambda: cache.delete("base:dash:skills"))
@@ -0,0 +1,37 @@
+# base/management/commands/rebuild_search_index.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the unified search index (SearchDocument) for partners, employees, assets, users and skills."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind", action="append", default=None,
+            help=f"Limit to a document kind (repeatable): {', '.join(search.SOURCES)}",
+        )
+        parser.add_argument("--company", type=int, default=None, help="Limit to one company id")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Records per upsert statement")
+
+    def handle(self, *args, **options):
+        kinds = options.get("kind")
+        unknown = [k for k in (kinds or []) if k not in search.SOURCES]
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(unknown)}")
+
+        started = time.perf_counter()
+        report = search.rebuild(
+            kinds,
+            company_id=options.get("company"),
+            chunk_size=max(1, options.get("chunk_size") or 2000),
+        )
+
+        for kind, (indexed, removed) in report.items():
+            self.stdout.write(f"- {kind}: {indexed} indexed, {removed} stale removed")
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,70 @@
+# base/management/commands/run_benchmarks.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the benchmark scenarios against a generate_load_data company, write query counts "
+        "and timings as JSON and fail when budgets or the stored baseline are exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios", choices=sorted(benchmarks.SCENARIOS),
+            help="Scenario to run (repeatable, default: all)",
+        )
+        parser.add_argument("--company", type=int, default=None, help="Company id (default: first generated company)")
+        parser.add_argument("--prefix", type=str, default="Load", help="generate_load_data --prefix")
+        parser.add_argument("--sample-size", type=int, default=benchmarks.DEFAULT_SAMPLE_SIZE)
+        parser.add_argument("--repeats", type=int, default=benchmarks.DEFAULT_REPEATS)
+        parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this path")
+        parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON (default: BENCHMARK_BASELINE_PATH)")
+        parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+        parser.add_argument("--tolerance", type=float, default=benchmarks.DEFAULT_TOLERANCE,
+                            help="Allowed time regression vs. baseline (0.5 = +50%%)")
+        parser.add_argument("--no-budgets", action="store_true", help="Skip the configured budget checks")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            report = benchmarks.run(
+                options.get("scenarios"),
+                company_id=options.get("company"),
+                prefix=options.get("prefix") or "Load",
+                sample_size=options.get("sample_size") or benchmarks.DEFAULT_SAMPLE_SIZE,
+                repeats=options.get("repeats") or benchmarks.DEFAULT_REPEATS,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for name, data in report["scenarios"].items():
+            self.stdout.write(
+                f"{name:<22} {data['queries']:>6} queries ({data['duplicates']} dup)  {data['ms']:>10.1f} ms"
+            )
+
+        failures = [] if options.get("no_budgets") else benchmarks.check_budgets(report)
+
+        baseline_path = options.get("baseline") or benchmarks.baseline_path()
+        if options.get("update_baseline"):
+            benchmarks.write_report(report, baseline_path)
+            self.stdout.write(f"Baseline written to {baseline_path}")
+        else:
+            baseline = benchmarks.load_baseline(baseline_path)
+            if baseline is not None:
+                failures += benchmarks.compare_to_baseline(report, baseline, tolerance=options["tolerance"])
+
+        report["failures"] = failures
+        if options.get("output"):
+            benchmarks.write_report(report, options["output"])
+
+        elapsed = time.perf_counter() - started
+        if failures:
+            raise CommandError("Benchmark failures:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report['scenarios'])} scenario(s) within budget. Done in {elapsed:.2f}s."
+        ))
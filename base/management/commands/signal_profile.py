@@ -0,0 +1,55 @@
+# base/management/commands/signal_profile.py
+
+from django.core.management.base import BaseCommand
+
+from base import signal_profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Show accumulated signal receiver costs (calls, time, queries per signal/receiver/sender). "
+        "Collected when SIGNAL_PROFILING_ENABLED=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--order", choices=signal_profiling.REPORT_ORDERS, default="self_ms")
+        parser.add_argument("--limit", type=int, default=30)
+        parser.add_argument("--signal", choices=sorted(signal_profiling.REPORT_SIGNALS), default=None)
+        parser.add_argument("--reset", action="store_true", help="Delete all collected totals")
+
+    def handle(self, *args, **options):
+        if options.get("reset"):
+            deleted = signal_profiling.reset()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} signal profile row(s)."))
+            return
+
+        if not signal_profiling.profiling_enabled():
+            self.stdout.write(self.style.WARNING("SIGNAL_PROFILING_ENABLED is off — totals are not being updated."))
+
+        totals = signal_profiling.totals_by_signal()
+        if not totals:
+            self.stdout.write("No signal profiles recorded yet.")
+            return
+
+        self.stdout.write(f"{'signal':<14} {'calls':>10} {'self ms':>12} {'self queries':>13}")
+        for row in totals:
+            self.stdout.write(
+                f"{row['signal']:<14} {row['calls']:>10} {row['self_ms']:>12.1f} {row['self_queries']:>13}"
+            )
+        self.stdout.write("")
+
+        rows = signal_profiling.top_receivers(
+            order=options.get("order") or "self_ms",
+            limit=options.get("limit") or 30,
+            signal=options.get("signal"),
+        )
+        self.stdout.write(
+            f"{'signal':<12} {'calls':>8} {'total ms':>10} {'self ms':>10} {'avg ms':>8} "
+            f"{'max ms':>8} {'queries':>8} {'self q':>7}  receiver [sender]"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['signal']:<12} {row['calls']:>8} {row['total_ms']:>10.1f} {row['self_ms']:>10.1f} "
+                f"{row['avg_ms'] or 0:>8.2f} {row['max_ms']:>8.1f} {row['queries']:>8} {row['self_queries']:>7}  "
+                f"{row['receiver']} [{row['sender']}]"
+            )
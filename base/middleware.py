@@ -1,5 +1,14 @@
 from __future__ import annotations
 
+import cProfile
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from base import query_profiling, request_profiling
+from base.access_context import bind_access_context, clear_access_context
 from base.security_context import set_current_user_id
 from base.company_context import (
     bootstrap_from_request,
@@ -76,3 +85,99 @@ class MultiCompanyMiddleware:
             set_current_user_id(None)
 
         return response
+
+
+class AccessContextMiddleware:
+    """
+    Bind a request-scoped AccessContext (employee, groups, companies,
+    manager chain) for base/hr/skills/xfields/performance access helpers.
+
+    The context is built lazily on the first helper call and reused for
+    the rest of the request, then cleared.
+
+    Must be placed AFTER MultiCompanyMiddleware (employee lookup is company-scoped).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        bind_access_context(getattr(request, "user", None))
+        try:
+            return self.get_response(request)
+        finally:
+            clear_access_context()
+
+
+class QueryProfilingMiddleware:
+    """
+    Per-request query / latency instrumentation (QUERY_PROFILING_ENABLED).
+
+    For each sampled request records: query count, repeated SQL fingerprints,
+    total DB time and wall time into RequestQueryProfile (bounded ring).
+    Report: Django admin → Request query profiles → "Worst endpoints".
+
+    Placed right before MultiCompanyMiddleware so company/context queries are counted too.
+    """
+
+    def __init__(self, get_response):
+        if not query_profiling.profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not query_profiling.should_sample():
+            return self.get_response(request)
+
+        collector = query_profiling.QueryCollector()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(collector))
+            response = self.get_response(request)
+        wall_time = time.perf_counter() - started
+
+        query_profiling.record(request, response, collector, wall_time)
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Sampling cProfile hook (REQUEST_PROFILING_ENABLED).
+
+    Profiles REQUEST_PROFILING_SAMPLE_RATE of requests, or any request carrying
+    REQUEST_PROFILING_HEADER from a superuser. Requests slower than
+    REQUEST_PROFILING_THRESHOLD_MS (header requests always) are saved as a .prof file
+    + RequestCpuProfile row tagged with view name and company.
+    Report: Django admin → Request CPU profiles.
+
+    Placed after AccessContextMiddleware: request.user / request.company_id are known.
+    """
+
+    def __init__(self, get_response):
+        if not request_profiling.profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = request_profiling.should_profile(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # profiler آخر نشط في نفس الـ thread
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        wall_time = time.perf_counter() - started
+
+        request_profiling.save(request, response, profiler, wall_time, trigger)
+        return response
+
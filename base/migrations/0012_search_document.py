@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# فهرس pg_trgm على body (LIKE '%q%' بدون مسح تسلسلي).
+# لا يدخل في حالة الموديل: الامتداد قد لا يكون متاحًا في كل بيئة (تبقى المطابقة صحيحة بدونه).
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS search_doc_body_trgm ON search_document USING gin (body gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS search_doc_body_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('partner', 'Partner'), ('employee', 'Employee'), ('asset', 'Asset'), ('user', 'User'), ('skill', 'Skill')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('active', models.BooleanField(default=True)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('body', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField())),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.company')),
+            ],
+            options={
+                'db_table': 'search_document',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='search_doc_vector_gin'), models.Index(fields=['kind', 'company'], name='search_doc_kind_company_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_doc_kind_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestQueryProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=8)),
+                ('path', models.CharField(max_length=255)),
+                ('view_name', models.CharField(db_index=True, max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField(default=200)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('duplicate_count', models.PositiveIntegerField(default=0)),
+                ('db_time_ms', models.FloatField(default=0)),
+                ('wall_time_ms', models.FloatField(default=0)),
+                ('top_queries', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'db_table': 'request_query_profile',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['view_name', 'created_at'], name='req_profile_view_created_idx')],
+            },
+        ),
+    ]
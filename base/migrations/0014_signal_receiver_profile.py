@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_request_query_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignalReceiverProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signal', models.CharField(max_length=32)),
+                ('receiver', models.CharField(max_length=255)),
+                ('sender', models.CharField(max_length=150)),
+                ('calls', models.PositiveBigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('self_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('queries', models.PositiveBigIntegerField(default=0)),
+                ('self_queries', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'signal_receiver_profile',
+                'ordering': ['-total_ms'],
+                'constraints': [models.UniqueConstraint(fields=('signal', 'receiver', 'sender'), name='uniq_signal_receiver_sender')],
+            },
+        ),
+    ]
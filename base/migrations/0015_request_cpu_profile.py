@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_signal_receiver_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestCpuProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=8)),
+                ('path', models.CharField(max_length=255)),
+                ('view_name', models.CharField(db_index=True, max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField(default=200)),
+                ('trigger', models.CharField(choices=[('sample', 'Sampled'), ('header', 'Requested (header)')], default='sample', max_length=8)),
+                ('wall_time_ms', models.FloatField(default=0)),
+                ('prof_file', models.CharField(blank=True, default='', max_length=255)),
+                ('top_functions', models.JSONField(blank=True, default=list)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='base.company')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'request_cpu_profile',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -4,6 +4,8 @@ from __future__ import annotations
 from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db.models.functions import Lower
 from django.utils import timezone
 from django.db.models import Q
@@ -988,3 +990,163 @@ class Partner(CompanyOwnedMixin, UserStampedMixin, TimeStampedMixin, ActivableMi
         while node and not node.is_company and node.parent:
             node = node.parent
         return node or self
+
+
+# ------------------------------------------------------------
+# SearchDocument — فهرس البحث الموحّد (صف لكل سجل قابل للبحث)
+# ------------------------------------------------------------
+class SearchDocument(models.Model):
+    """
+    Denormalized search row per partner / employee / asset / user / skill.
+
+    - body: نص البحث (أحرف صغيرة) → LIKE '%q%' عبر فهرس pg_trgm (يُنشأ في الترحيل إن توفّر)
+    - search_vector: tsvector محسوب في قاعدة البيانات (GENERATED) → ترتيب النتائج
+    - الصيانة: base.search + إشارات base.signals + أمر rebuild_search_index
+    """
+
+    class Kind(models.TextChoices):
+        PARTNER = "partner", "Partner"
+        EMPLOYEE = "employee", "Employee"
+        ASSET = "asset", "Asset"
+        USER = "user", "User"
+        SKILL = "skill", "Skill"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    # None = بيانات عامة (مثل Skill)
+    company = models.ForeignKey(
+        "base.Company", null=True, blank=True, on_delete=models.CASCADE, related_name="+"
+    )
+
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    active = models.BooleanField(default=True)
+
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config="simple")
+            + SearchVector("body", weight="B", config="simple")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "search_document"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_doc_kind_object_uniq"),
+        ]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="search_doc_vector_gin"),
+            models.Index(fields=["kind", "company"], name="search_doc_kind_company_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.title}"
+
+
+# ------------------------------------------------------------
+# RequestQueryProfile — عينات الاستعلامات/الزمن لكل طلب (QueryProfilingMiddleware)
+# ------------------------------------------------------------
+class RequestQueryProfile(models.Model):
+    """
+    One sampled request: query count, repeated SQL fingerprints, DB time and wall time.
+    Kept as a bounded ring (QUERY_PROFILING_MAX_ROWS) — see base.query_profiling.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    method = models.CharField(max_length=8)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=255, db_index=True)
+    status_code = models.PositiveSmallIntegerField(default=200)
+
+    query_count = models.PositiveIntegerField(default=0)
+    # استعلامات زائدة = المجموع − عدد البصمات المختلفة (مؤشر N+1)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+    wall_time_ms = models.FloatField(default=0)
+
+    # [{"fingerprint", "count", "time_ms", "sql"}] — أكثر البصمات تكرارًا
+    top_queries = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        db_table = "request_query_profile"
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["view_name", "created_at"], name="req_profile_view_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.view_name} ({self.query_count} queries)"
+
+
+class SignalReceiverProfile(models.Model):
+    """
+    Accumulated cost of one (signal, receiver, sender) — see base.signal_profiling.
+    total_* are inclusive (nested saves fired by the receiver); self_* exclude nested receivers.
+    """
+
+    signal = models.CharField(max_length=32)
+    receiver = models.CharField(max_length=255)
+    sender = models.CharField(max_length=150)
+
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    self_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    queries = models.PositiveBigIntegerField(default=0)
+    self_queries = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "signal_receiver_profile"
+        ordering = ["-total_ms"]
+        constraints = [
+            models.UniqueConstraint(fields=["signal", "receiver", "sender"], name="uniq_signal_receiver_sender"),
+        ]
+
+    def __str__(self):
+        return f"{self.signal}: {self.receiver} ({self.sender})"
+
+    @property
+    def avg_ms(self) -> float:
+        return round(self.total_ms / self.calls, 3) if self.calls else 0.0
+
+
+class RequestCpuProfile(models.Model):
+    """
+    cProfile capture of one slow (or explicitly requested) request — see base.request_profiling.
+    The full profile is a .prof file under REQUEST_PROFILING_DIR; top_functions keeps the summary.
+    """
+
+    class Trigger(models.TextChoices):
+        SAMPLE = "sample", "Sampled"
+        HEADER = "header", "Requested (header)"
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    method = models.CharField(max_length=8)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=255, db_index=True)
+    status_code = models.PositiveSmallIntegerField(default=200)
+    company = models.ForeignKey("base.Company", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    user = models.ForeignKey("base.User", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    trigger = models.CharField(max_length=8, choices=Trigger.choices, default=Trigger.SAMPLE)
+
+    wall_time_ms = models.FloatField(default=0)
+    # اسم الملف داخل REQUEST_PROFILING_DIR (pstats / snakeviz)
+    prof_file = models.CharField(max_length=255, blank=True, default="")
+    # [{"function", "ncalls", "tottime_ms", "cumtime_ms"}] مرتبة حسب cumulative
+    top_functions = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        db_table = "request_cpu_profile"
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"{self.method} {self.view_name} ({self.wall_time_ms:.0f} ms)"
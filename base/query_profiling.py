@@ -0,0 +1,212 @@
+# base/query_profiling.py
+# ============================================================
+# قياس الاستعلامات لكل طلب (QueryProfilingMiddleware)
+#
+# - QueryCollector: execute_wrapper يسجّل كل استعلام (بصمة + زمن)
+# - record(): يحفظ عينة في RequestQueryProfile ويقصّ الجدول كحلقة (ring)
+# - worst_endpoints() / top_repeated_queries(): تقرير صفحة الإدارة
+#
+# الإعدادات:
+#   QUERY_PROFILING_ENABLED      (False)  تشغيل الـ middleware
+#   QUERY_PROFILING_SAMPLE_RATE  (1.0)    نسبة الطلبات المحفوظة
+#   QUERY_PROFILING_MAX_ROWS     (10000)  حجم الحلقة
+# ============================================================
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TOP_QUERIES_PER_REQUEST = 5
+PRUNE_PROBABILITY = 0.01
+
+
+def profiling_enabled() -> bool:
+    return bool(getattr(settings, "QUERY_PROFILING_ENABLED", False))
+
+
+def sample_rate() -> float:
+    return float(getattr(settings, "QUERY_PROFILING_SAMPLE_RATE", 1.0))
+
+
+def max_rows() -> int:
+    return int(getattr(settings, "QUERY_PROFILING_MAX_ROWS", 10000))
+
+
+# ============================================================
+# Fingerprints
+# ============================================================
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*%s\s*,?)+\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """نفس الاستعلام بقيم مختلفة → نفس النص (IN (...) / ? بدل القيم الحرفية)."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.md5(normalize_sql(sql).encode("utf-8")).hexdigest()[:12]
+
+
+# ============================================================
+# Collector
+# ============================================================
+
+class QueryCollector:
+    """يُمرَّر إلى connection.execute_wrapper؛ يجمع العدد والزمن لكل بصمة."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.by_fingerprint: Dict[str, dict] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.time += elapsed
+            fp = fingerprint(sql)
+            entry = self.by_fingerprint.get(fp)
+            if entry is None:
+                self.by_fingerprint[fp] = {"count": 1, "time": elapsed, "sql": normalize_sql(sql)[:1000]}
+            else:
+                entry["count"] += 1
+                entry["time"] += elapsed
+
+    @property
+    def duplicate_count(self) -> int:
+        return self.count - len(self.by_fingerprint)
+
+    def top_queries(self, limit: int = TOP_QUERIES_PER_REQUEST) -> List[dict]:
+        repeated = sorted(
+            (item for item in self.by_fingerprint.items() if item[1]["count"] > 1),
+            key=lambda item: (-item[1]["count"], -item[1]["time"]),
+        )
+        return [
+            {"fingerprint": fp, "count": e["count"], "time_ms": round(e["time"] * 1000, 2), "sql": e["sql"]}
+            for fp, e in repeated[:limit]
+        ]
+
+
+# ============================================================
+# Storage
+# ============================================================
+
+def should_sample() -> bool:
+    rate = sample_rate()
+    return rate >= 1 or random.random() < rate
+
+
+def record(request, response, collector: QueryCollector, wall_time: float) -> None:
+    """حفظ عينة الطلب؛ أي خطأ هنا لا يجب أن يفسد الاستجابة."""
+    from base.models import RequestQueryProfile  # LAZY IMPORT
+
+    match = getattr(request, "resolver_match", None)
+    view_name = (match.view_name or match._func_path) if match else "<unresolved>"
+
+    try:
+        profile = RequestQueryProfile.objects.create(
+            method=request.method[:8],
+            path=request.path[:255],
+            view_name=view_name[:255],
+            status_code=getattr(response, "status_code", 0),
+            query_count=collector.count,
+            duplicate_count=collector.duplicate_count,
+            db_time_ms=round(collector.time * 1000, 2),
+            wall_time_ms=round(wall_time * 1000, 2),
+            top_queries=collector.top_queries(),
+        )
+        if random.random() < PRUNE_PROBABILITY:
+            RequestQueryProfile.objects.filter(id__lte=profile.id - max_rows()).delete()
+    except Exception:
+        logger.warning("Could not store request query profile for %s", request.path, exc_info=True)
+
+
+# ============================================================
+# Report (admin)
+# ============================================================
+
+def worst_endpoints(hours: int = 24, limit: int = 25, order: str = "avg_queries") -> List[dict]:
+    """أسوأ نقاط النهاية خلال آخر N ساعة (تجميع واحد حسب view_name)."""
+    from base.models import RequestQueryProfile  # LAZY IMPORT
+
+    since = timezone.now() - timedelta(hours=hours)
+    rows = (
+        RequestQueryProfile.objects.filter(created_at__gte=since)
+        .values("view_name")
+        .annotate(
+            samples=Count("id"),
+            avg_queries=Avg("query_count"),
+            max_queries=Max("query_count"),
+            avg_duplicates=Avg("duplicate_count"),
+            avg_db_ms=Avg("db_time_ms"),
+            avg_wall_ms=Avg("wall_time_ms"),
+            max_wall_ms=Max("wall_time_ms"),
+        )
+        .order_by(f"-{order}")[:limit]
+    )
+    return list(rows)
+
+
+def top_repeated_queries(view_name: str, hours: int = 24, limit: int = 5,
+                         sample_limit: int = 200) -> List[dict]:
+    """أكثر البصمات تكرارًا لنقطة نهاية (من آخر sample_limit عينة)."""
+    from base.models import RequestQueryProfile  # LAZY IMPORT
+
+    since = timezone.now() - timedelta(hours=hours)
+    totals: Dict[str, dict] = defaultdict(lambda: {"count": 0, "time_ms": 0.0, "requests": 0, "sql": ""})
+    samples = (
+        RequestQueryProfile.objects.filter(view_name=view_name, created_at__gte=since)
+        .order_by("-id")
+        .values_list("top_queries", flat=True)[:sample_limit]
+    )
+    for top in samples:
+        for q in top or []:
+            entry = totals[q["fingerprint"]]
+            entry["count"] += q["count"]
+            entry["time_ms"] += q["time_ms"]
+            entry["requests"] += 1
+            entry["sql"] = q["sql"]
+
+    ranked = sorted(totals.items(), key=lambda item: -item[1]["count"])[:limit]
+    return [
+        {
+            "fingerprint": fp,
+            "avg_count": round(e["count"] / e["requests"], 1),
+            "avg_time_ms": round(e["time_ms"] / e["requests"], 2),
+            "requests": e["requests"],
+            "sql": e["sql"],
+        }
+        for fp, e in ranked
+    ]
+
+
+def endpoint_report(hours: int = 24, limit: int = 25, order: str = "avg_queries",
+                    queries_per_endpoint: int = 5) -> List[dict]:
+    report = worst_endpoints(hours=hours, limit=limit, order=order)
+    for row in report:
+        row["top_queries"] = top_repeated_queries(row["view_name"], hours=hours, limit=queries_per_endpoint)
+    return report
+
@@ -0,0 +1,185 @@
+# base/request_profiling.py
+# ============================================================
+# cProfile للطلبات البطيئة (RequestProfilingMiddleware)
+#
+# - should_profile(): نسبة عيّنة، أو ترويسة REQUEST_PROFILING_HEADER من superuser
+# - save(): للطلبات التي تتجاوز العتبة (أو المطلوبة بالترويسة):
+#   ملف .prof في REQUEST_PROFILING_DIR + صف RequestCpuProfile (view, company, أعلى الدوال)
+# - الجدول والملفات حلقة (ring) بحجم REQUEST_PROFILING_MAX_ROWS
+#
+# الإعدادات:
+#   REQUEST_PROFILING_ENABLED       (False)
+#   REQUEST_PROFILING_SAMPLE_RATE   (0.01)
+#   REQUEST_PROFILING_THRESHOLD_MS  (500)
+#   REQUEST_PROFILING_HEADER        ("X-Profile-Request")
+#   REQUEST_PROFILING_DIR           (BASE_DIR / "var" / "profiles")
+#   REQUEST_PROFILING_MAX_ROWS      (500)
+# ============================================================
+
+from __future__ import annotations
+
+import logging
+import os
+import pstats
+import random
+import re
+import sysconfig
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 30
+PRUNE_PROBABILITY = 0.05
+
+
+def profiling_enabled() -> bool:
+    return bool(getattr(settings, "REQUEST_PROFILING_ENABLED", False))
+
+
+def sample_rate() -> float:
+    return float(getattr(settings, "REQUEST_PROFILING_SAMPLE_RATE", 0.01))
+
+
+def threshold_ms() -> float:
+    return float(getattr(settings, "REQUEST_PROFILING_THRESHOLD_MS", 500))
+
+
+def header_name() -> str:
+    return getattr(settings, "REQUEST_PROFILING_HEADER", "X-Profile-Request")
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "REQUEST_PROFILING_DIR", settings.BASE_DIR / "var" / "profiles"))
+
+
+def max_rows() -> int:
+    return int(getattr(settings, "REQUEST_PROFILING_MAX_ROWS", 500))
+
+
+# ============================================================
+# Sampling
+# ============================================================
+
+def should_profile(request) -> Optional[str]:
+    """"header" / "sample" / None."""
+    if request.headers.get(header_name()):
+        user = getattr(request, "user", None)
+        if user is not None and getattr(user, "is_superuser", False):
+            return "header"
+    rate = sample_rate()
+    if rate > 0 and (rate >= 1 or random.random() < rate):
+        return "sample"
+    return None
+
+
+# ============================================================
+# Summary
+# ============================================================
+
+_PATH_PREFIXES = sorted(
+    {str(settings.BASE_DIR), sysconfig.get_paths()["purelib"], sysconfig.get_paths()["stdlib"]},
+    key=len, reverse=True,
+)
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+def _label(func) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name  # built-in
+    return f"{_short_path(filename)}:{lineno}({name})"
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[dict]:
+    """أعلى الدوال حسب الزمن التراكمي (cumulative)."""
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, total_calls, tottime, cumtime, _callers = stats.stats[func]
+        rows.append({
+            "function": _label(func),
+            "ncalls": total_calls if total_calls == primitive_calls else f"{total_calls}/{primitive_calls}",
+            "tottime_ms": round(tottime * 1000, 2),
+            "cumtime_ms": round(cumtime * 1000, 2),
+        })
+    return rows
+
+
+# ============================================================
+# Storage
+# ============================================================
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def save(request, response, profiler, wall_time: float, trigger: str) -> None:
+    """حفظ الملف + الصف؛ الطلبات المعيّنة تحت العتبة تُهمل. أي خطأ هنا لا يفسد الاستجابة."""
+    wall_ms = wall_time * 1000
+    if trigger != "header" and wall_ms < threshold_ms():
+        return
+
+    from base.models import RequestCpuProfile  # LAZY IMPORT
+
+    match = getattr(request, "resolver_match", None)
+    view_name = (match.view_name or match._func_path) if match else "<unresolved>"
+    user = getattr(request, "user", None)
+
+    try:
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        filename = "{}-{}-{}.prof".format(
+            timezone.now().strftime("%Y%m%dT%H%M%S%f"),
+            _UNSAFE_RE.sub("_", view_name)[:80],
+            random.randrange(16 ** 6),
+        )
+        profiler.dump_stats(str(directory / filename))
+
+        profile = RequestCpuProfile.objects.create(
+            method=request.method[:8],
+            path=request.path[:255],
+            view_name=view_name[:255],
+            status_code=getattr(response, "status_code", 0),
+            company_id=getattr(request, "company_id", None),
+            user=user if getattr(user, "is_authenticated", False) else None,
+            trigger=trigger,
+            wall_time_ms=round(wall_ms, 2),
+            prof_file=filename,
+            top_functions=top_functions(pstats.Stats(profiler)),
+        )
+        if random.random() < PRUNE_PROBABILITY:
+            prune(before_id=profile.id - max_rows() + 1)
+    except Exception:
+        logger.warning("Could not store request CPU profile for %s", request.path, exc_info=True)
+
+
+def prune(before_id: int) -> int:
+    """حذف الصفوف الأقدم من before_id مع ملفاتها."""
+    from base.models import RequestCpuProfile  # LAZY IMPORT
+
+    old = RequestCpuProfile.objects.filter(id__lt=before_id)
+    directory = profile_dir()
+    for filename in old.exclude(prof_file="").values_list("prof_file", flat=True):
+        try:
+            (directory / filename).unlink(missing_ok=True)
+        except OSError:
+            logger.debug("Could not delete profile file %s", filename, exc_info=True)
+    deleted, _ = old.delete()
+    return deleted
+
+
+def file_path(profile) -> Optional[Path]:
+    """مسار ملف .prof إن كان موجودًا (الاسم فقط يُخزَّن → لا خروج من المجلد)."""
+    if not profile.prof_file:
+        return None
+    path = profile_dir() / Path(profile.prof_file).name
+    return path if path.is_file() else None
@@ -0,0 +1,324 @@
+# base/search.py
+# ============================================================
+# البحث الموحّد عبر SearchDocument
+#
+# - صف لكل سجل (partner / employee / asset / user / skill) مع company و active
+# - المطابقة: body LIKE '%q%' (فهرس pg_trgm) أو search_vector @@ prefix-tsquery (GIN)
+# - search(): نتائج مرتّبة ومقسّمة لكل نوع (Window/ROW_NUMBER) + عدّ مجمّع لكل نوع
+# - matching_ids(): subquery للقوائم (pk__in) بدل OR من icontains
+# - الصيانة: index_instance / index_dependents / remove_object (إشارات base.signals)
+#   و rebuild (أمر rebuild_search_index؛ التعبئة الأولى بعد migrate في base.signals)
+# ============================================================
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from django.apps import apps
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Q, Value, Window
+from django.db.models.functions import RowNumber
+
+from base.models import SearchDocument
+
+Kind = SearchDocument.Kind
+
+
+def _join(*parts) -> str:
+    return " ".join(str(p).strip() for p in parts if p).lower()
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    kind: str
+    model_label: str
+    select_related: Tuple[str, ...]
+    # obj → (company_id, title, subtitle, body, active)
+    build: Callable
+    # موديلات تظهر أسماؤها في الوثيقة: (label, lookup على موديل المصدر, الحقول المعروضة)
+    depends_on: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = ()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def queryset(self):
+        return self.model._base_manager.select_related(*self.select_related)
+
+
+def _partner_doc(p):
+    return (
+        p.company_id,
+        p.display_name or p.name or "—",
+        str(p.company) if p.company_id else "",
+        _join(p.name, p.display_name, p.email, p.phone, p.mobile),
+        p.active,
+    )
+
+
+def _employee_doc(e):
+    return (
+        e.company_id,
+        e.name or "—",
+        str(e.department) if e.department_id else "",
+        _join(
+            e.name, e.private_phone, e.private_email,
+            e.user.email if e.user_id else "",
+            e.job.name if e.job_id else "",
+            e.department.name if e.department_id else "",
+            e.manager.name if e.manager_id else "",
+            e.company.name if e.company_id else "",
+        ),
+        e.active,
+    )
+
+
+def _asset_doc(a):
+    return (
+        a.company_id,
+        f"{a.code or ''} — {a.name or ''}".strip(" —"),
+        str(a.company) if a.company_id else "",
+        _join(a.code, a.name, a.serial),
+        a.active,
+    )
+
+
+def _user_doc(u):
+    return (
+        u.company_id,
+        u.email or "—",
+        u.get_full_name() or (u.partner.name if u.partner_id else ""),
+        _join(u.email, u.first_name, u.last_name, u.partner.name if u.partner_id else ""),
+        True,  # KPI users يشمل غير النشطين
+    )
+
+
+def _skill_doc(s):
+    return (
+        None,
+        s.name,
+        s.skill_type.name if s.skill_type_id else "",
+        _join(s.name, s.skill_type.name if s.skill_type_id else ""),
+        s.active,
+    )
+
+
+SOURCES: Dict[str, SearchSource] = {
+    Kind.PARTNER: SearchSource(Kind.PARTNER, "base.Partner", ("company",), _partner_doc),
+    Kind.EMPLOYEE: SearchSource(
+        Kind.EMPLOYEE, "hr.Employee", ("company", "user", "job", "department", "manager"), _employee_doc,
+        depends_on=(
+            ("base.Company", "company_id", ("name",)),
+            ("hr.Department", "department_id", ("name", "complete_name")),
+            ("hr.Job", "job_id", ("name",)),
+            ("hr.Employee", "manager_id", ("name",)),
+            ("base.User", "user_id", ("email",)),
+        ),
+    ),
+    Kind.ASSET: SearchSource(Kind.ASSET, "assets.Asset", ("company",), _asset_doc),
+    Kind.USER: SearchSource(
+        Kind.USER, "base.User", ("partner",), _user_doc,
+        depends_on=(("base.Partner", "partner_id", ("name",)),),
+    ),
+    Kind.SKILL: SearchSource(
+        Kind.SKILL, "skills.Skill", ("skill_type",), _skill_doc,
+        depends_on=(("skills.SkillType", "skill_type_id", ("name",)),),
+    ),
+}
+
+
+def source_for_model(model) -> Optional[SearchSource]:
+    label = model._meta.label
+    for source in SOURCES.values():
+        if source.model_label == label:
+            return source
+    return None
+
+
+def displayed_fields(label: str) -> Tuple[str, ...]:
+    """حقول موديل label التي تظهر في وثائق موديلات أخرى (فارغ = ليس تابعًا لأحد)."""
+    fields = []
+    for source in SOURCES.values():
+        for dep_label, _lookup, dep_fields in source.depends_on:
+            if dep_label == label:
+                fields += [f for f in dep_fields if f not in fields]
+    return tuple(fields)
+
+
+# ============================================================
+# Indexing
+# ============================================================
+
+_UPDATE_FIELDS = ["company", "title", "subtitle", "body", "active", "updated_at"]
+
+
+def _document(source: SearchSource, obj) -> SearchDocument:
+    company_id, title, subtitle, body, active = source.build(obj)
+    return SearchDocument(
+        kind=source.kind,
+        object_id=obj.pk,
+        company_id=company_id,
+        title=(title or "")[:255],
+        subtitle=(subtitle or "")[:255],
+        body=body,
+        active=bool(active),
+    )
+
+
+def index_objects(source: SearchSource, objs: Iterable) -> int:
+    """Upsert (INSERT … ON CONFLICT) لمجموعة سجلات من نفس المصدر."""
+    docs = [_document(source, obj) for obj in objs]
+    if docs:
+        SearchDocument.objects.bulk_create(
+            docs,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=_UPDATE_FIELDS,
+        )
+    return len(docs)
+
+
+def index_queryset(source: SearchSource, queryset, chunk_size: int = 2000) -> int:
+    """فهرسة queryset على دفعات حسب pk (بدون تحميل كل الجدول في الذاكرة)."""
+    total = 0
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by("pk")[:chunk_size])
+        if not chunk:
+            return total
+        total += index_objects(source, chunk)
+        last_pk = chunk[-1].pk
+
+
+def index_instance(instance, cascade: bool = True) -> None:
+    """فهرسة سجل واحد؛ cascade → والسجلات التي تعرض اسمه (index_dependents)."""
+    source = source_for_model(type(instance))
+    if source is not None:
+        index_objects(source, source.queryset().filter(pk=instance.pk))
+    if cascade:
+        index_dependents(type(instance), instance.pk)
+
+
+def index_dependents(model, pk) -> int:
+    """إعادة فهرسة السجلات التي تعرض اسم (model, pk) — مثلًا موظفو قسم أُعيدت تسميته."""
+    label = model._meta.label
+    total = 0
+    for dependent in SOURCES.values():
+        for dep_label, lookup, _fields in dependent.depends_on:
+            if dep_label == label:
+                total += index_queryset(dependent, dependent.queryset().filter(**{lookup: pk}))
+    return total
+
+
+def remove_object(model, pk) -> None:
+    source = source_for_model(model)
+    if source is not None:
+        SearchDocument.objects.filter(kind=source.kind, object_id=pk).delete()
+
+
+def rebuild(kinds: Optional[Iterable[str]] = None, company_id: Optional[int] = None,
+            chunk_size: int = 2000) -> Dict[str, Tuple[int, int]]:
+    """
+    إعادة بناء الفهرس: {kind: (indexed, removed)}.
+    removed = وثائق لم يعد سجلها موجودًا.
+    """
+    report = {}
+    for kind in (kinds or SOURCES.keys()):
+        source = SOURCES[kind]
+        qs = source.queryset()
+        docs = SearchDocument.objects.filter(kind=kind)
+        if company_id and any(f.name == "company" for f in source.model._meta.get_fields()):
+            qs = qs.filter(company_id=company_id)
+            docs = docs.filter(company_id=company_id)
+
+        indexed = index_queryset(source, qs, chunk_size=chunk_size)
+        orphans = docs.exclude(
+            Exists(source.model._base_manager.filter(pk=OuterRef("object_id")))
+        )
+        removed, _ = orphans.delete()
+        report[kind] = (indexed, removed)
+    return report
+
+
+# ============================================================
+# Querying
+# ============================================================
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str
+    object_id: int
+    title: str
+    subtitle: str
+    rank: float
+
+
+def _tsquery(q: str) -> Optional[SearchQuery]:
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return None
+    return SearchQuery(" & ".join(f"{t}:*" for t in terms), search_type="raw", config="simple")
+
+
+def _match(q: str) -> Q:
+    cond = Q(body__contains=q.strip().lower())
+    tsq = _tsquery(q)
+    if tsq is not None:
+        cond |= Q(search_vector=tsq)
+    return cond
+
+
+def matching_ids(kind: str, q: str):
+    """object_id لكل وثيقة مطابقة (للاستخدام كـ pk__in في القوائم)."""
+    return SearchDocument.objects.filter(_match(q), kind=kind).values("object_id")
+
+
+def search(q: str, company_ids: Optional[Iterable[int]] = None, kinds: Optional[Iterable[str]] = None,
+           limit: int = 7, offset: int = 0, active_only: bool = True) -> Dict[str, dict]:
+    """
+    {kind: {"total": n, "hits": [SearchHit, ...]}} — استعلامان لكل الأنواع (الصفحة + العدّ).
+    limit/offset لكل نوع؛ total مستقل عن نافذة الصفحة (offset بعد آخر نتيجة → hits فارغة و total صحيح).
+    المستخدمون يُطابَقون بالشركة الأساسية أو M2M companies.
+    """
+    q = (q or "").strip()
+    kinds = list(kinds or SOURCES.keys())
+    result = {kind: {"total": 0, "hits": []} for kind in kinds}
+    if not q:
+        return result
+
+    qs = SearchDocument.objects.filter(_match(q), kind__in=kinds)
+    if active_only:
+        qs = qs.filter(active=True)
+
+    if company_ids is not None:
+        company_ids = list(company_ids)
+        User = apps.get_model("base", "User")
+        user_in_companies = Exists(
+            User.companies.through.objects.filter(user_id=OuterRef("object_id"), company_id__in=company_ids)
+        )
+        qs = qs.filter(
+            Q(company__isnull=True, kind=Kind.SKILL)
+            | Q(company_id__in=company_ids)
+            | (Q(kind=Kind.USER) & user_in_companies)
+        )
+
+    totals = qs.order_by().values("kind").annotate(total=Count("id")).values_list("kind", "total")
+    for kind, total in totals:
+        result[kind]["total"] = total
+
+    tsq = _tsquery(q)
+    rank = SearchRank(F("search_vector"), tsq) if tsq is not None else Value(0.0, output_field=FloatField())
+    rows = (
+        qs.annotate(rank=rank)
+        .annotate(
+            row=Window(RowNumber(), partition_by=[F("kind")], order_by=[F("rank").desc(), F("title").asc()]),
+        )
+        .filter(row__gt=offset, row__lte=offset + limit)
+        .order_by("kind", "row")
+        .values_list("kind", "object_id", "title", "subtitle", "rank")
+    )
+    for kind, object_id, title, subtitle, rank_value in rows:
+        result[kind]["hits"].append(SearchHit(kind, object_id, title, subtitle, rank_value))
+    return result
@@ -0,0 +1,113 @@
+# base/side_effects.py
+# ============================================================
+# تجميع الآثار الجانبية للإشارات (keyed on_commit)
+#
+# - on_commit_once(key, func): الإشارة تسجّل إجراءً بمفتاح مثل ("hr.job_counters", job_id)
+#   → كل مفتاح يُنفَّذ مرة واحدة بعد commit مهما تكرر الحفظ داخل المعاملة
+#   (آخر func ناجية للمفتاح هي التي تُنفَّذ؛ الإجراء يقرأ الحالة من قاعدة البيانات)
+# - coalesce_side_effects(): atomic للعمليات الجماعية خارج معاملة
+#   (في autocommit يُنفَّذ on_commit فورًا → لا تجميع)
+#
+# تراجع savepoint يحذف callbacks المسجّلة داخله فقط؛ المفتاح يُنفَّذ ما دام تسجيل واحد قد نجا:
+# - أول تسجيل ناجٍ ينفّذ آخر func مسجّلة ضمن نفس savepoints أو أعلى منها (ناجية بالضرورة)
+#   → func سُجّلت داخل savepoint متراجع لا تُنفَّذ أبدًا
+# - السجل مربوط بقائمة connection.run_on_commit الحالية (Django يستبدلها عند commit / rollback /
+#   تراجع savepoint) → يُعاد بناؤه من التسجيلات الناجية: بعد rollback كامل لا تبقى مدخلات عالقة
+# ============================================================
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Callable, FrozenSet, Hashable, Optional
+
+from django.db import transaction
+
+
+class _Pending:
+    """تسجيلات مفتاح واحد داخل المعاملة الحالية."""
+
+    __slots__ = ("registrations", "done")
+
+    def __init__(self):
+        self.registrations: list = []
+        self.done = False
+
+
+class _Registration:
+    """callback واحد في run_on_commit لكل استدعاء on_commit_once."""
+
+    __slots__ = ("key", "func", "sids", "entry", "registry")
+
+    def __init__(self, key: Hashable, func: Callable[[], object], sids: FrozenSet, entry: _Pending,
+                 registry: dict):
+        self.key = key
+        self.func = func
+        self.sids = sids
+        self.entry = entry
+        self.registry = registry
+
+    def __call__(self):
+        # أول callback ناجٍ ينفّذ ويزيل المدخل؛ البقية لا تفعل شيئًا
+        entry = self.entry
+        if entry.done:
+            return
+        entry.done = True
+        if self.registry.get(self.key) is entry:
+            del self.registry[self.key]
+        func = self.func
+        for reg in entry.registrations:
+            if reg.sids <= self.sids:
+                func = reg.func
+        _execute(self.key, func)
+
+
+def _registry(connection) -> dict:
+    # الاتصال خاص بكل thread → لا حاجة لقفل
+    state = getattr(connection, "_coalesced_side_effects", None)
+    if state is None:
+        state = connection._coalesced_side_effects = [None, {}]
+    callbacks, registry = state
+    if callbacks is not connection.run_on_commit:
+        registry.clear()
+        for _sids, func, _robust in connection.run_on_commit:
+            if isinstance(func, _Registration) and not func.entry.done:
+                if registry.get(func.key) is not func.entry:
+                    registry[func.key] = func.entry
+                    func.entry.registrations = []
+                func.entry.registrations.append(func)
+        state[0] = connection.run_on_commit
+    return registry
+
+
+def _execute(key: Hashable, func: Callable[[], object]) -> None:
+    # نقطة تغليف واحدة لتنفيذ المفاتيح (base.signal_profiling يستبدلها للقياس)
+    func()
+
+
+def on_commit_once(key: Hashable, func: Callable[[], object], *, using: Optional[str] = None,
+                   robust: bool = False) -> None:
+    """تسجيل func تحت key؛ تُنفَّذ مرة واحدة لكل مفتاح عند commit."""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        # autocommit: Django ينفّذ فورًا → لا شيء لتجميعه
+        transaction.on_commit(lambda: _execute(key, func), using=using, robust=robust)
+        return
+
+    registry = _registry(connection)
+    entry = registry.get(key)
+    if entry is None:
+        entry = registry[key] = _Pending()
+    registration = _Registration(key, func, frozenset(connection.savepoint_ids), entry, registry)
+    entry.registrations.append(registration)
+    transaction.on_commit(registration, using=using, robust=robust)
+
+
+@contextmanager
+def coalesce_side_effects(using: Optional[str] = None):
+    """
+    with coalesce_side_effects():
+        for emp in employees: emp.save()
+    → عدّادات الوظائف / المشاركون / ... تُحسب مرة لكل مفتاح بعد commit.
+    """
+    with transaction.atomic(using=using):
+        yield
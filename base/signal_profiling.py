@@ -0,0 +1,274 @@
+# base/signal_profiling.py
+# ============================================================
+# قياس كلفة مستقبلات الإشارات (SIGNAL_PROFILING_ENABLED)
+#
+# - install(): يغلّف _live_receivers لإشارات الموديلات → كل receiver يُقاس
+#   (عدد الاستدعاءات، الزمن التراكمي/الأقصى، الاستعلامات) لكل (signal, receiver, sender)
+# - المستقبلات الثقيلة تؤجّل عملها عبر base.side_effects.on_commit_once →
+#   تنفيذ كل مفتاح يُقاس أيضًا كـ signal="on_commit"، receiver=بادئة المفتاح،
+#   sender=الدالة المسجّلة (وإلا ظهر المستقبل شبه مجاني)
+# - total_* شامل: receiver يحفظ موديلًا آخر يتحمّل كلفة إشاراته أيضًا؛
+#   self_* = بعد طرح المستقبلات المتداخلة
+# - التجميع في الذاكرة لكل process؛ flush() إلى SignalReceiverProfile
+#   عند request_finished (كل FLUSH_INTERVAL ثانية) وعند خروج الـ process
+# - التقرير: أمر signal_profile + لوحة الإدارة (Signal receiver profiles)
+#
+# الإعدادات:
+#   SIGNAL_PROFILING_ENABLED         (False)
+#   SIGNAL_PROFILING_FLUSH_INTERVAL  (10) ثوانٍ
+# ============================================================
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast, Greatest, NullIf
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete, pre_init, pre_save,
+)
+
+from base import side_effects
+
+logger = logging.getLogger(__name__)
+
+PROFILED_SIGNALS = {
+    "pre_init": pre_init,
+    "post_init": post_init,
+    "pre_save": pre_save,
+    "post_save": post_save,
+    "pre_delete": pre_delete,
+    "post_delete": post_delete,
+    "m2m_changed": m2m_changed,
+}
+
+# callbacks on_commit_once المؤجلة من المستقبلات
+ON_COMMIT_SIGNAL = "on_commit"
+REPORT_SIGNALS = (*PROFILED_SIGNALS, ON_COMMIT_SIGNAL)
+
+# (signal, receiver, sender) → [calls, total_s, self_s, max_s, queries, self_queries]
+_Key = Tuple[str, str, str]
+_stats: Dict[_Key, list] = {}
+_lock = threading.Lock()
+_local = threading.local()
+_installed = False
+_last_flush = time.monotonic()
+
+
+def profiling_enabled() -> bool:
+    return bool(getattr(settings, "SIGNAL_PROFILING_ENABLED", False))
+
+
+def flush_interval() -> float:
+    return float(getattr(settings, "SIGNAL_PROFILING_FLUSH_INTERVAL", 10))
+
+
+def _receiver_label(receiver) -> str:
+    func = getattr(receiver, "__func__", receiver)
+    return f"{getattr(func, '__module__', '?')}.{getattr(func, '__qualname__', repr(func))}"[:255]
+
+
+def _sender_label(sender) -> str:
+    if sender is None:
+        return "*"
+    meta = getattr(sender, "_meta", None)
+    if meta is not None:
+        return meta.label
+    return getattr(sender, "__name__", str(sender))[:150]
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+class _Frame:
+    """استدعاء receiver جارٍ: ما استهلكه المستقبلون المتداخلون داخله."""
+
+    __slots__ = ("queries", "child_time", "child_queries")
+
+    def __init__(self):
+        self.queries = 0
+        self.child_time = 0.0
+        self.child_queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def _record(key: _Key, elapsed: float, self_time: float, queries: int, self_queries: int) -> None:
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            _stats[key] = [1, elapsed, self_time, elapsed, queries, self_queries]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += self_time
+            entry[3] = max(entry[3], elapsed)
+            entry[4] += queries
+            entry[5] += self_queries
+
+
+def _measure(key: _Key, func, *args, **kwargs):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    frame = _Frame()
+    stack.append(frame)
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(frame):
+            return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+            stack[-1].child_queries += frame.queries
+        _record(
+            key, elapsed, max(0.0, elapsed - frame.child_time),
+            frame.queries, max(0, frame.queries - frame.child_queries),
+        )
+
+
+def _profiled(name: str, receiver, sender):
+    key = (name, _receiver_label(receiver), _sender_label(sender))
+
+    def wrapper(signal, sender, **named):
+        return _measure(key, receiver, signal=signal, sender=sender, **named)
+
+    return wrapper
+
+
+def _key_prefix(key) -> str:
+    # ("hr.job_counters", job_id) → "hr.job_counters"
+    if isinstance(key, tuple) and key:
+        key = key[0]
+    return str(key)[:255]
+
+
+def _execute_profiled(key, func) -> None:
+    _measure((ON_COMMIT_SIGNAL, _key_prefix(key), _receiver_label(func)[:150]), func)
+
+
+def _patch(name: str, signal) -> None:
+    original = signal._live_receivers
+
+    def _live_receivers(sender):
+        sync_receivers, async_receivers = original(sender)
+        return [_profiled(name, r, sender) for r in sync_receivers], async_receivers
+
+    signal._live_receivers = _live_receivers
+
+
+def install() -> bool:
+    """تفعيل القياس (مرة واحدة لكل process)؛ يعيد False إن كان معطّلًا."""
+    global _installed
+    if _installed or not profiling_enabled():
+        return _installed
+    for name, signal in PROFILED_SIGNALS.items():
+        _patch(name, signal)
+    side_effects._execute = _execute_profiled
+
+    request_finished.connect(_maybe_flush, dispatch_uid="base.signal_profiling.flush")
+    atexit.register(flush)
+    _installed = True
+    return True
+
+
+# ============================================================
+# Storage
+# ============================================================
+
+def _maybe_flush(sender, **kwargs):
+    global _last_flush
+    now = time.monotonic()
+    if now - _last_flush >= flush_interval():
+        _last_flush = now
+        flush()
+
+
+def flush() -> int:
+    """نقل الإحصاءات المتراكمة إلى SignalReceiverProfile (زيادة بـ F())."""
+    global _stats
+    with _lock:
+        pending, _stats = _stats, {}
+    if not pending:
+        return 0
+
+    from django.utils import timezone  # LAZY IMPORT
+    from base.models import SignalReceiverProfile  # LAZY IMPORT
+
+    try:
+        with transaction.atomic():
+            SignalReceiverProfile.objects.bulk_create(
+                [SignalReceiverProfile(signal=s, receiver=r, sender=snd) for s, r, snd in pending],
+                ignore_conflicts=True,
+            )
+            now = timezone.now()
+            for (s, r, snd), (calls, total, self_time, max_time, queries, self_queries) in pending.items():
+                SignalReceiverProfile.objects.filter(signal=s, receiver=r, sender=snd).update(
+                    calls=F("calls") + calls,
+                    total_ms=F("total_ms") + total * 1000,
+                    self_ms=F("self_ms") + self_time * 1000,
+                    max_ms=Greatest(F("max_ms"), max_time * 1000),
+                    queries=F("queries") + queries,
+                    self_queries=F("self_queries") + self_queries,
+                    updated_at=now,
+                )
+    except Exception:
+        logger.warning("Could not store signal receiver profiles", exc_info=True)
+        return 0
+    return len(pending)
+
+
+def reset() -> int:
+    from base.models import SignalReceiverProfile  # LAZY IMPORT
+
+    with _lock:
+        _stats.clear()
+    deleted, _ = SignalReceiverProfile.objects.all().delete()
+    return deleted
+
+
+# ============================================================
+# Report
+# ============================================================
+
+REPORT_ORDERS = ("total_ms", "self_ms", "calls", "queries", "self_queries", "max_ms", "avg_ms")
+
+
+def top_receivers(order: str = "self_ms", limit: int = 30, signal: Optional[str] = None) -> List[dict]:
+    from base.models import SignalReceiverProfile  # LAZY IMPORT
+
+    qs = SignalReceiverProfile.objects.annotate(
+        avg_ms=F("total_ms") / Cast(NullIf(F("calls"), 0), FloatField()),
+    )
+    if signal:
+        qs = qs.filter(signal=signal)
+    return list(
+        qs.order_by(F(order).desc(nulls_last=True)).values(
+            "signal", "receiver", "sender", "calls", "total_ms", "self_ms",
+            "avg_ms", "max_ms", "queries", "self_queries",
+        )[:limit]
+    )
+
+
+def totals_by_signal() -> List[dict]:
+    from base.models import SignalReceiverProfile  # LAZY IMPORT
+
+    return list(
+        SignalReceiverProfile.objects.values("signal")
+        .annotate(
+            calls=Sum("calls"), self_ms=Sum("self_ms"), self_queries=Sum("self_queries"),
+        )
+        .order_by("-self_ms")
+    )
@@ -9,10 +9,9 @@
 
 from __future__ import annotations
 
-from django.db import transaction
 from django.db.models.signals import post_save, m2m_changed, post_migrate
 from django.dispatch import receiver
-from django.db.utils import OperationalError
+from django.db.utils import OperationalError, ProgrammingError
 
 # نُبقي هذه الاستيرادات لأغراض sender في الديكوريترز (لا مشكلة بها)
 from base.models import Company, Partner, User, UserSettings
@@ -24,6 +23,7 @@ from base.services import (
     sync_partner_to_company,
     sync_company_to_partner,
 )
+from base.side_effects import on_commit_once
 
 # ============================================================
 # Company.post_save — توليد/مواءمة Partner للشركة بعد commit
@@ -119,7 +119,7 @@ def company_post_save(sender, instance: Company, created: bool, **kwargs):
         if comp.partner_id and comp.partner:
             sync_company_to_partner(comp, comp.partner)
 
-    transaction.on_commit(lambda: _sync_after_commit(instance.pk))
+    on_commit_once(("base.company.partner_sync", instance.pk), lambda: _sync_after_commit(instance.pk))
 
 
 @receiver(m2m_changed, sender=User.companies.through)
@@ -215,6 +215,168 @@ def bootstrap_main_company(sender, **kwargs):
         pass
 
 
+# ==========================================================
+# Dashboard counters (base.dashboard) — إبطال الكاش عند التغيير
+# ==========================================================
+from django.db.models.signals import post_delete
+
+from base.dashboard import (
+    invalidate_company_metrics,
+    invalidate_skill_metrics,
+    invalidate_user_metrics,
+)
+
+# موديلات تدخل في عدّادات كل شركة (نقل سجل بين شركتين يُصحَّح بانتهاء TTL)
+DASHBOARD_COMPANY_MODELS = (
+    "base.Partner",
+    "hr.Employee",
+    "assets.Asset",
+    "skills.EmployeeSkill",
+    "payroll.Payslip",
+)
+
+
+def _dashboard_company_changed(sender, instance, **kwargs):
+    invalidate_company_metrics(getattr(instance, "company_id", None))
+
+
+def _dashboard_company_row_changed(sender, instance, **kwargs):
+    # الشركة نفسها (active) جزء من عدّاداتها → KPI "companies"
+    invalidate_company_metrics(instance.pk)
+
+
+def _dashboard_users_changed(sender, instance=None, **kwargs):
+    invalidate_user_metrics()
+
+
+def _dashboard_skills_changed(sender, instance=None, **kwargs):
+    invalidate_skill_metrics()
+
+
+for _label in DASHBOARD_COMPANY_MODELS:
+    for _signal in (post_save, post_delete):
+        _signal.connect(
+            _dashboard_company_changed,
+            sender=_label,
+            dispatch_uid=f"base.dashboard.{_label.lower()}.{'save' if _signal is post_save else 'delete'}",
+        )
+
+for _signal in (post_save, post_delete):
+    _signal.connect(
+        _dashboard_company_row_changed,
+        sender=Company,
+        dispatch_uid=f"base.dashboard.company.{'save' if _signal is post_save else 'delete'}",
+    )
+    _signal.connect(
+        _dashboard_users_changed,
+        sender=User,
+        dispatch_uid=f"base.dashboard.users.{'save' if _signal is post_save else 'delete'}",
+    )
+    _signal.connect(
+        _dashboard_skills_changed,
+        sender="skills.Skill",
+        dispatch_uid=f"base.dashboard.skills.{'save' if _signal is post_save else 'delete'}",
+    )
+
+m2m_changed.connect(
+    _dashboard_users_changed,
+    sender=User.companies.through,
+    dispatch_uid="base.dashboard.users.companies",
+)
+
+
+# ==========================================================
+# Search index (base.search) — صيانة SearchDocument بعد commit
+# ==========================================================
+from django.db.models.signals import pre_save
+
+from base import search as search_index
+
+
+def _search_capture_display_change(sender, instance, **kwargs):
+    """
+    pre_save: هل تغيّر حقل معروض في وثائق أخرى (displayed_fields)؟
+    لا → لا داعي لإعادة فهرسة التابعين (مثل مرؤوسي الموظف) عند كل حفظ.
+    """
+    instance._search_display_changed = False
+    if kwargs.get("raw") or instance.pk is None or instance._state.adding:
+        return  # سجل جديد: لا أحد يعرض اسمه بعد
+    fields = search_index.displayed_fields(sender._meta.label)
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None:
+        fields = tuple(f for f in fields if f in update_fields)
+    if not fields:
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+    instance._search_display_changed = old is not None and old != tuple(getattr(instance, f) for f in fields)
+
+
+def _search_reindex(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    model, pk = type(instance), instance.pk
+    # حفظ نفس السجل عدة مرات في المعاملة → فهرسة واحدة
+    if search_index.source_for_model(model) is not None:
+        on_commit_once(
+            ("base.search.index", sender._meta.label, pk),
+            lambda: search_index.index_instance(instance, cascade=False),
+        )
+    # مفتاح منفصل: حفظ لاحق بلا تغيير في الاسم لا يلغي cascade سابقًا
+    if getattr(instance, "_search_display_changed", False):
+        on_commit_once(
+            ("base.search.dependents", sender._meta.label, pk),
+            lambda: search_index.index_dependents(model, pk),
+        )
+
+
+def _search_remove(sender, instance, **kwargs):
+    # Collector يضع pk = None بعد الحذف → نلتقطه الآن
+    pk = instance.pk
+    on_commit_once(("base.search.remove", sender._meta.label, pk), lambda: search_index.remove_object(sender, pk))
+
+
+_SEARCH_DEPENDENCY_LABELS = {
+    label for s in search_index.SOURCES.values() for label, _lookup, _fields in s.depends_on
+}
+_SEARCH_SAVE_LABELS = {s.model_label for s in search_index.SOURCES.values()} | _SEARCH_DEPENDENCY_LABELS
+
+for _label in sorted(_SEARCH_DEPENDENCY_LABELS):
+    pre_save.connect(
+        _search_capture_display_change, sender=_label, dispatch_uid=f"base.search.{_label.lower()}.capture"
+    )
+
+for _label in sorted(_SEARCH_SAVE_LABELS):
+    post_save.connect(_search_reindex, sender=_label, dispatch_uid=f"base.search.{_label.lower()}.save")
+
+for _source in search_index.SOURCES.values():
+    post_delete.connect(
+        _search_remove, sender=_source.model_label, dispatch_uid=f"base.search.{_source.model_label.lower()}.delete"
+    )
+
+
+@receiver(post_migrate, dispatch_uid="base.search.bootstrap_index")
+def bootstrap_search_index(sender, **kwargs):
+    """
+    التعبئة الأولى للفهرس: قاعدة بها سجلات وفهرس فارغ (قاعدة قديمة قبل SearchDocument).
+    بعد migrate (الجداول مطابقة للموديلات الحالية) بدل ترحيل بيانات يستورد base.search الحي؛
+    إعادة البناء لاحقًا: أمر rebuild_search_index.
+    """
+    if sender.label != "base":
+        return
+    from base.models import SearchDocument  # LAZY IMPORT
+
+    try:
+        if SearchDocument.objects.exists():
+            return
+        if not any(s.model._base_manager.exists() for s in search_index.SOURCES.values()):
+            return
+        report = search_index.rebuild()
+    except (OperationalError, ProgrammingError):
+        # migrate جزئي (جداول غير مكتملة) → يُترك لأمر rebuild_search_index
+        return
+    print(f"✅ Built search index ({sum(indexed for indexed, _removed in report.values())} documents).")
+
+
 # ===== UserStamped: تعبئة created_by / updated_by تلقائيًا =====
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
@@ -0,0 +1,439 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import TestCase
+
+from base import benchmarks, search, side_effects, signal_profiling
+from base.models import Company
+from base.side_effects import on_commit_once
+
+
+class BenchmarkSuiteTests(TestCase):
+    """
+    run_benchmarks على بيانات generate_load_data صغيرة:
+    كل السيناريوهات تعمل، الاستعلامات تُعدّ، والميزانيات/الـ baseline تُفشل التشغيل.
+    """
+
+    PREFIX = "BenchTest"
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_load_data",
+            companies=1, employees=40, depth=2, branching=2, jobs=4,
+            objectives_per_department=1, tasks_per_objective=2, kpis_per_objective=1,
+            months=1, rating_days=2, attendance_days=2,
+            prefix=cls.PREFIX, no_search_index=True, stdout=StringIO(),
+        )
+
+    def _run(self, names=None, sample_size=5):
+        return benchmarks.run(names, prefix=self.PREFIX, sample_size=sample_size, repeats=1)
+
+    def test_all_scenarios_report_queries_and_timings(self):
+        report = self._run()
+        self.assertEqual(set(report["scenarios"]), set(benchmarks.SCENARIOS))
+        for name, data in report["scenarios"].items():
+            self.assertGreater(data["queries"], 0, name)
+            self.assertEqual(len(data["ms_runs"]), 1, name)
+
+    def test_generated_data_has_derived_fields(self):
+        # bulk_create لا يمر بـ save(): المسارات والمشاركون والتجميعات تُبنى بعده
+        from django.db.models import Sum
+
+        from hr.models import Department, Employee
+        from performance.models import DailyRating, DailyRatingMonthly, Objective
+
+        company = Company.objects.get(name__startswith=self.PREFIX)
+        employees = list(Employee.all_objects.filter(company=company))
+        self.assertEqual(len(employees), 40)
+        self.assertTrue(all(e.manager_path_is_current() for e in employees))
+
+        departments = Department.all_objects.filter(company=company)
+        self.assertEqual(departments.count(), 1 + 2 + 4)
+        for dept in departments.select_related("parent"):
+            expected = f"{dept.parent.parent_path if dept.parent else ''}{dept.pk}/"
+            self.assertEqual(dept.parent_path, expected)
+
+        objective = Objective.all_objects.filter(company=company, target_kind="department").first()
+        participants = set(objective.participants.values_list("employee_id", flat=True))
+        self.assertTrue(participants)
+        self.assertEqual(participants, objective._collect_employee_ids())
+        self.assertEqual(
+            DailyRatingMonthly.all_objects.filter(company=company).aggregate(s=Sum("rating_sum"))["s"],
+            DailyRating.all_objects.filter(company=company).aggregate(s=Sum("overall_score_pct"))["s"],
+        )
+
+    def test_run_leaves_no_trace(self):
+        from payroll.models import Payslip
+
+        before = Payslip.objects.count()
+        self._run(["payroll_run"])
+        self.assertEqual(Payslip.objects.count(), before)
+
+    def test_evaluation_recompute_queries_do_not_grow_with_sample(self):
+        small = self._run(["evaluation_recompute"], sample_size=5)["scenarios"]["evaluation_recompute"]
+        large = self._run(["evaluation_recompute"], sample_size=30)["scenarios"]["evaluation_recompute"]
+        self.assertEqual(small["queries"], large["queries"])
+
+    def test_on_commit_side_effects_are_measured(self):
+        calls = []
+
+        def prepare(env):
+            def write():
+                # العمل الفعلي مؤجل لـ commit (مثل on_commit_once في الإشارات)
+                on_commit_once(("bench.test",), lambda: calls.append(Company.objects.count()))
+            return write
+
+        scenario = benchmarks.Scenario("deferred_write", prepare)
+        with mock.patch.dict(benchmarks.SCENARIOS, {"deferred_write": scenario}):
+            data = self._run(["deferred_write"])["scenarios"]["deferred_write"]
+        self.assertEqual(len(calls), 2)  # إحماء + تكرار واحد
+        self.assertEqual(data["queries"], 1)
+
+    def test_budgets_and_baseline_report_failures(self):
+        report = {"scenarios": {"home_dashboard": {"queries": 20, "ms": 100.0}}}
+        self.assertEqual(benchmarks.check_budgets(report, {"home_dashboard": {"queries": 20, "ms": 100}}), [])
+        self.assertEqual(len(benchmarks.check_budgets(report, {"home_dashboard": {"queries": 19, "ms": 50}})), 2)
+
+        baseline = {"scenarios": {"home_dashboard": {"queries": 19, "ms": 60.0}}}
+        failures = benchmarks.compare_to_baseline(report, baseline, tolerance=0.5)
+        self.assertEqual(len(failures), 2)
+        self.assertEqual(benchmarks.compare_to_baseline(report, baseline, tolerance=1.0)[1:], [])
+
+    def test_command_writes_json_and_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "report.json"
+            baseline = Path(tmp) / "baseline.json"
+
+            call_command(
+                "run_benchmarks", scenario=["home_dashboard"], prefix=self.PREFIX, repeats=1,
+                baseline=str(baseline), update_baseline=True, output=str(output), stdout=StringIO(),
+            )
+            report = json.loads(output.read_text())
+            self.assertEqual(report["failures"], [])
+            self.assertIn("home_dashboard", json.loads(baseline.read_text())["scenarios"])
+
+            stored = json.loads(baseline.read_text())
+            stored["scenarios"]["home_dashboard"]["queries"] = 0
+            baseline.write_text(json.dumps(stored))
+            with self.assertRaises(CommandError):
+                call_command(
+                    "run_benchmarks", scenario=["home_dashboard"], prefix=self.PREFIX, repeats=1,
+                    baseline=str(baseline), stdout=StringIO(),
+                )
+
+
+class SideEffectCoalescingTests(TestCase):
+    """on_commit_once: مفتاح واحد = تنفيذ واحد بعد commit (آخر func مسجّلة)."""
+
+    def test_same_key_runs_once_with_latest_action(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once(("test", 1), lambda: calls.append("first"))
+            on_commit_once(("test", 2), lambda: calls.append("other"))
+            on_commit_once(("test", 1), lambda: calls.append("latest"))
+        self.assertEqual(calls, ["latest", "other"])
+
+    def test_registration_survives_savepoint_rollback(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    on_commit_once(("test", 1), lambda: calls.append("rolled back"))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            on_commit_once(("test", 1), lambda: calls.append("kept"))
+        self.assertEqual(calls, ["kept"])
+
+    def test_func_from_rolled_back_savepoint_does_not_win(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once(("test", 1), lambda: calls.append("outer"))
+            try:
+                with transaction.atomic():
+                    on_commit_once(("test", 1), lambda: calls.append("rolled back"))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(calls, ["outer"])
+
+    def test_rollback_leaves_no_registry_entries(self):
+        from django.db import connection
+
+        try:
+            with transaction.atomic():
+                on_commit_once(("test", 1), lambda: None)
+                on_commit_once(("test", 2), lambda: None)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(side_effects._registry(connection), {})
+
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once(("test", 1), lambda: calls.append("fresh"))
+        self.assertEqual(calls, ["fresh"])
+
+    def test_profiler_attributes_deferred_work_to_key_prefix(self):
+        with mock.patch.object(side_effects, "_execute", signal_profiling._execute_profiled), \
+                mock.patch.object(signal_profiling, "_stats", {}):
+            with self.captureOnCommitCallbacks(execute=True):
+                on_commit_once(("test.deferred", 1), lambda: Company.objects.count())
+                on_commit_once(("test.deferred", 2), lambda: Company.objects.count())
+            stats = {k: v for k, v in signal_profiling._stats.items() if k[0] == "on_commit"}
+
+        self.assertEqual(len(stats), 1)
+        (_signal, receiver, _sender), entry = next(iter(stats.items()))
+        self.assertEqual(receiver, "test.deferred")
+        self.assertEqual(entry[0], 2)  # calls
+        self.assertEqual(entry[5], 2)  # self_queries
+
+    def test_profiler_separates_self_cost_of_nested_receivers(self):
+        from django.dispatch import Signal
+
+        from base.models import SignalReceiverProfile
+
+        outer_signal, inner_signal = Signal(), Signal()
+
+        def inner(sender, **kwargs):
+            Company.objects.count()
+            Company.objects.exists()
+
+        def outer(sender, **kwargs):
+            Company.objects.count()
+            inner_signal.send(sender=Company)
+
+        outer_signal.connect(outer, weak=False)
+        inner_signal.connect(inner, weak=False)
+        signal_profiling._patch("outer", outer_signal)
+        signal_profiling._patch("inner", inner_signal)
+
+        with mock.patch.object(signal_profiling, "_stats", {}):
+            outer_signal.send(sender=Company)
+            self.assertEqual(signal_profiling.flush(), 2)
+            outer_signal.send(sender=Company)
+            signal_profiling.flush()
+
+        rows = {r.signal: r for r in SignalReceiverProfile.objects.filter(sender="base.Company")}
+        self.assertEqual((rows["outer"].calls, rows["outer"].queries, rows["outer"].self_queries), (2, 6, 2))
+        self.assertEqual((rows["inner"].calls, rows["inner"].queries, rows["inner"].self_queries), (2, 4, 4))
+        self.assertTrue(rows["outer"].receiver.endswith("outer"))
+        self.assertLessEqual(rows["outer"].self_ms, rows["outer"].total_ms)
+
+    def test_job_counters_recomputed_once_per_job(self):
+        from hr import signals as hr_signals
+        from hr.models import Department, Employee, Job
+
+        company = Company.objects.create(name="Coalesce Co")
+        dept = Department.objects.create(name="Ops", company=company)
+        job = Job.objects.create(name="Operator", company=company)
+
+        with mock.patch.object(hr_signals, "recompute_job_counters", wraps=hr_signals.recompute_job_counters) as spy:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(5):
+                    Employee.objects.create(name=f"Operator {i}", company=company, department=dept, job=job)
+
+        self.assertEqual(spy.call_count, 1)
+        job.refresh_from_db()
+        self.assertEqual(job.no_of_employee, 5)
+
+    def test_job_save_updates_expected_without_recount(self):
+        from hr import signals as hr_signals
+        from hr.models import Job
+
+        company = Company.objects.create(name="Job Expected Co")
+        job = Job.objects.create(name="Planner", company=company)
+        job.no_of_recruitment = 4
+
+        with mock.patch.object(hr_signals, "recompute_job_counters") as recount:
+            with self.captureOnCommitCallbacks(execute=True):
+                job.save()
+                job.save()
+
+        recount.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.expected_employees, job.no_of_employee + 4)
+
+
+class SearchIndexTests(TestCase):
+    """SearchDocument: التابعون يُعاد فهرستهم فقط عند تغيّر الاسم المعروض."""
+
+    def setUp(self):
+        from hr.models import Department, Employee
+
+        self.company = Company.objects.create(name="Search Co")
+        dept = Department.objects.create(name="Ops", company=self.company)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager = Employee.objects.create(name="Mona Manager", company=self.company, department=dept)
+            self.report = Employee.objects.create(
+                name="Rami Report", company=self.company, department=dept, manager=self.manager,
+            )
+
+    def test_manager_save_without_rename_does_not_reindex_reports(self):
+        with mock.patch.object(search, "index_dependents", wraps=search.index_dependents) as spy:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.manager.save()
+        self.assertEqual(spy.call_count, 0)
+
+    def test_manager_rename_reindexes_reports(self):
+        self.manager.name = "Nadia Manager"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.save()
+            self.manager.save()  # حفظ لاحق بلا تغيير لا يلغي الـ cascade
+        report_ids = search.matching_ids("employee", "nadia").values_list("object_id", flat=True)
+        self.assertIn(self.report.pk, list(report_ids))
+
+    def test_employees_match_company_name_after_rename(self):
+        self.company.name = "Zephyr Holdings"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.save()
+        ids = set(search.matching_ids("employee", "zephyr").values_list("object_id", flat=True))
+        self.assertEqual(ids, {self.manager.pk, self.report.pk})
+
+    def test_total_is_reported_when_offset_is_past_last_hit(self):
+        result = search.search("manager", kinds=["employee"], limit=1, offset=5)
+        self.assertEqual(result["employee"]["hits"], [])
+        self.assertEqual(result["employee"]["total"], 2)
+
+
+class DashboardMetricsTests(TestCase):
+    """عدّادات HomeView المخزّنة لكل شركة."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.active = Company.objects.create(name="Dash Active")
+        self.inactive = Company.objects.create(name="Dash Inactive")
+        Company.objects.filter(pk=self.inactive.pk).update(active=False)
+
+    def test_companies_kpi_counts_only_active_companies(self):
+        from base.dashboard import get_dashboard_metrics
+
+        ids = [self.active.pk, self.inactive.pk]
+        self.assertEqual(get_dashboard_metrics(ids)["kpis"]["companies"], 1)
+
+        # التعطيل يُبطل الكاش الخاص بالشركة نفسها
+        self.active.active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.active.save()
+        self.assertEqual(get_dashboard_metrics(ids)["kpis"]["companies"], 0)
+
+
+class RequestProfilingMiddlewareTests(TestCase):
+    """عيّنة بنسبة، عتبة للحفظ، والترويسة من superuser فقط (تتجاوز العيّنة والعتبة)."""
+
+    def setUp(self):
+        from django.contrib.auth.models import AnonymousUser
+        from django.http import HttpResponse
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.anonymous = AnonymousUser()
+        self.calls = 0
+
+        def view(request):
+            self.calls += 1
+            return HttpResponse("ok")
+
+        self.view = view
+
+    def _run(self, *, rate=0.0, threshold_ms=60_000, header=False, user=None):
+        from django.test import RequestFactory, override_settings
+
+        from base.middleware import RequestProfilingMiddleware
+        from base.models import RequestCpuProfile
+
+        extra = {"HTTP_X_PROFILE_REQUEST": "1"} if header else {}
+        request = RequestFactory().get("/profiled/", **extra)
+        request.user = user or self.anonymous
+        with override_settings(
+            REQUEST_PROFILING_ENABLED=True,
+            REQUEST_PROFILING_SAMPLE_RATE=rate,
+            REQUEST_PROFILING_THRESHOLD_MS=threshold_ms,
+            REQUEST_PROFILING_DIR=self.tmp.name,
+        ):
+            response = RequestProfilingMiddleware(self.view)(request)
+        self.assertEqual(response.status_code, 200)
+        return RequestCpuProfile.objects.order_by("-id").first()
+
+    def test_disabled_middleware_is_not_used(self):
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.test import override_settings
+
+        from base.middleware import RequestProfilingMiddleware
+
+        with override_settings(REQUEST_PROFILING_ENABLED=False), self.assertRaises(MiddlewareNotUsed):
+            RequestProfilingMiddleware(self.view)
+
+    def test_sampling_rate(self):
+        with mock.patch("base.request_profiling.random.random", return_value=0.4):
+            self.assertIsNone(self._run(rate=0.3, threshold_ms=0))
+            profile = self._run(rate=0.5, threshold_ms=0)
+
+        self.assertEqual(profile.trigger, "sample")
+        self.assertTrue((Path(self.tmp.name) / profile.prof_file).is_file())
+        self.assertTrue(profile.top_functions)
+        self.assertEqual(self.calls, 2)
+
+    def test_sampled_requests_under_threshold_are_dropped(self):
+        self.assertIsNone(self._run(rate=1.0, threshold_ms=60_000))
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+        self.assertEqual(self.calls, 1)
+
+    def test_header_profiles_superusers_only(self):
+        from base.models import User
+
+        staff = User.objects.create_user("staff@profile.test", "x", username="staff-profile")
+        root = User.objects.create_superuser("root@profile.test", "x", username="root-profile")
+
+        self.assertIsNone(self._run(header=True, user=staff))
+
+        profile = self._run(header=True, user=root)
+        self.assertEqual(profile.trigger, "header")  # بلا عيّنة ورغم العتبة
+        self.assertEqual(profile.user_id, root.pk)
+        self.assertEqual(profile.path, "/profiled/")
+
+
+class QueryProfilingTests(TestCase):
+    """QueryProfilingMiddleware: بصمات موحّدة، عدّ المكرر، وتقرير أسوأ نقاط النهاية."""
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        from base import query_profiling
+
+        a = 'SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) AND name = \'x\' LIMIT 21'
+        b = 'SELECT *  FROM "t" WHERE "id" IN (%s) AND name = \'yy\' LIMIT 5'
+        self.assertEqual(query_profiling.fingerprint(a), query_profiling.fingerprint(b))
+
+    def test_middleware_records_repeated_queries(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory, override_settings
+
+        from base import query_profiling
+        from base.middleware import QueryProfilingMiddleware
+        from base.models import RequestQueryProfile
+
+        def view(request):
+            for _ in range(3):
+                list(Company.objects.filter(pk=1))
+            Company.objects.count()
+            return HttpResponse("ok")
+
+        with override_settings(QUERY_PROFILING_ENABLED=True, QUERY_PROFILING_SAMPLE_RATE=1.0):
+            QueryProfilingMiddleware(view)(RequestFactory().get("/companies/"))
+
+        profile = RequestQueryProfile.objects.get()
+        self.assertEqual(profile.query_count, 4)
+        self.assertEqual(profile.duplicate_count, 2)
+        self.assertEqual([q["count"] for q in profile.top_queries], [3])
+
+        report = query_profiling.endpoint_report(hours=1)
+        self.assertEqual(report[0]["view_name"], "<unresolved>")
+        self.assertEqual(report[0]["top_queries"][0]["avg_count"], 3)
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Count
+from django.db.models import Q
 from django.views import View
 from django.views.generic import TemplateView, FormView, CreateView, DetailView, UpdateView, DeleteView
 from django.apps import apps
@@ -26,6 +26,8 @@ from django.core.exceptions import PermissionDenied
 from django.http import Http404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from base.company_context import get_allowed_company_ids, get_company_id
+from base.dashboard import get_dashboard_metrics
+from base.search import matching_ids, search as global_search
 from django.utils.timezone import now
 from datetime import timedelta
 
@@ -278,7 +280,8 @@ class HomeView(LoginRequiredMixin, TemplateView):
       Practical data quality checks requiring action.
 
     - Performance:
-      Expected < 10k records -> OK on-demand with efficient queries.
+      KPI / health / breakdown counters come from base.dashboard
+      (grouped conditional aggregates, cached per company, summed for the selection).
     """
 
     template_name = "home.html"
@@ -392,8 +395,6 @@ class HomeView(LoginRequiredMixin, TemplateView):
         User = apps.get_model("base", "User")
         Employee = apps.get_model("hr", "Employee")
         Asset = apps.get_model("assets", "Asset")
-        Skill = apps.get_model("skills", "Skill")
-        EmployeeSkill = apps.get_model("skills", "EmployeeSkill")
         Payslip = apps.get_model("payroll", "Payslip")
 
         # -----------------------------------------------------
@@ -435,112 +436,17 @@ class HomeView(LoginRequiredMixin, TemplateView):
         assets_qs = Asset.objects.filter(company_id__in=selected_company_ids)
         assets_qs = self._filter_active_if_supported(assets_qs)
 
-        # Skills are global reference data (لا ترتبط بالشركات)
-        skills_qs = Skill.objects.all()
-        skills_qs = self._filter_active_if_supported(skills_qs)
-
-        employee_skills_qs = EmployeeSkill.objects.filter(company_id__in=selected_company_ids)
-        employee_skills_qs = self._filter_active_if_supported(employee_skills_qs)
-
         payslips_qs = Payslip.objects.filter(company_id__in=selected_company_ids)
         # Payslip غالباً لا يحتوي active
 
         # -----------------------------------------------------
-        # Core KPIs (now fully scoped)
-        # -----------------------------------------------------
-        kpis = {
-            "companies": selected_companies_qs.count(),
-            "partners": partners_qs.count(),
-            "users": users_qs.count(),
-            "employees": employees_qs.count(),
-            "assets": assets_qs.count(),
-            "skills": skills_qs.count(),  # global by design
-            "employee_skills": employee_skills_qs.count(),
-            "payslips": payslips_qs.count(),
-        }
-
-        # -----------------------------------------------------
-        # Breakdowns (scoped)
-        # -----------------------------------------------------
-        assets_by_status_map = {
-            row["status"]: row["cnt"]
-            for row in (
-                assets_qs.values("status")
-                .annotate(cnt=Count("id"))
-                .order_by("-cnt")
-            )
-        }
-
-        payslips_by_state_map = {
-            row["state"]: row["cnt"]
-            for row in (
-                payslips_qs.values("state")
-                .annotate(cnt=Count("id"))
-                .order_by("-cnt")
-            )
-        }
-
-        # -----------------------------------------------------
-        # Health Indicators (scoped)
+        # KPIs + Breakdowns + Health (cached per company, summed for the selection)
         # -----------------------------------------------------
-        health = {}
-
-        # Employees without department
-        if self._has_field(Employee, "department"):
-            health["employees_without_department"] = employees_qs.filter(department__isnull=True).count()
-        else:
-            health["employees_without_department"] = 0
-
-        # Assets without holder
-        if self._has_field(Asset, "holder"):
-            health["assets_unassigned"] = assets_qs.filter(holder__isnull=True).count()
-        else:
-            health["assets_unassigned"] = 0
-
-        # Partners missing contact info (email+phone+mobile)
-        # (نقيس "missing all" بشكل صحيح)
-        missing_parts = [Q(email="") | Q(email__isnull=True)]
-        if self._has_field(Partner, "phone"):
-            missing_parts.append(Q(phone="") | Q(phone__isnull=True))
-        if self._has_field(Partner, "mobile"):
-            missing_parts.append(Q(mobile="") | Q(mobile__isnull=True))
-
-        partner_missing_q = missing_parts[0]
-        for extra in missing_parts[1:]:
-            partner_missing_q &= extra
-
-        health["partners_missing_contact"] = partners_qs.filter(partner_missing_q).count()
-
-        # Users without partner
-        if self._has_field(User, "partner"):
-            health["users_without_partner"] = users_qs.filter(partner__isnull=True).count()
-        else:
-            health["users_without_partner"] = 0
-
-        # Users inactive
-        if self._has_field(User, "is_active"):
-            health["users_inactive"] = users_qs.filter(is_active=False).count()
-        else:
-            health["users_inactive"] = 0
-
-        # Users email not verified
-        if self._has_field(User, "email_verified"):
-            health["users_unverified_email"] = users_qs.filter(email_verified=False).count()
-        else:
-            health["users_unverified_email"] = 0
-
-        # Payslips unpaid
-        if self._has_field(Payslip, "state"):
-            health["payslips_unpaid"] = payslips_qs.exclude(state="paid").count()
-        else:
-            health["payslips_unpaid"] = 0
-
-        # Employees without skills
-        if self._has_field(EmployeeSkill, "employee"):
-            employee_ids_with_skills = employee_skills_qs.values_list("employee_id", flat=True).distinct()
-            health["employees_without_skills"] = employees_qs.exclude(id__in=employee_ids_with_skills).count()
-        else:
-            health["employees_without_skills"] = 0
+        metrics = get_dashboard_metrics(selected_company_ids)
+        kpis = metrics["kpis"]
+        health = metrics["health"]
+        assets_by_status_map = metrics["assets_by_status"]
+        payslips_by_state_map = metrics["payslips_by_state"]
 
         # -----------------------------------------------------
         # Recent activity (scoped)
@@ -595,89 +501,29 @@ class HomeView(LoginRequiredMixin, TemplateView):
         search = {"q": q, "partners": [], "employees": [], "assets": [], "users": []}
 
         if q:
-            # Partners
-            partner_filter = Q(name__icontains=q)
-            if self._has_field(Partner, "display_name"):
-                partner_filter |= Q(display_name__icontains=q)
-            if self._has_field(Partner, "email"):
-                partner_filter |= Q(email__icontains=q)
-            if self._has_field(Partner, "phone"):
-                partner_filter |= Q(phone__icontains=q)
-            if self._has_field(Partner, "mobile"):
-                partner_filter |= Q(mobile__icontains=q)
-
-            partners_found = (
-                partners_qs.filter(partner_filter)
-                .select_related("company")
-                .order_by("name")[: self.SEARCH_LIMIT]
-            )
-            search["partners"] = [
-                DashboardSearchResult(
-                    title=(getattr(p, "display_name", "") or p.name or "—"),
-                    subtitle=(str(getattr(p, "company", "")) or ""),
-                    open_url=self._safe_reverse("base:partner_detail", kwargs={"pk": p.pk}),
-                )
-                for p in partners_found
-            ]
-
-            # Employees
-            emp_filter = Q(name__icontains=q)
-            if self._has_field(Employee, "private_phone"):
-                emp_filter |= Q(private_phone__icontains=q)
-            if self._has_field(Employee, "private_email"):
-                emp_filter |= Q(private_email__icontains=q)
-
-            employees_found = (
-                employees_qs.filter(emp_filter)
-                .select_related("company", "department")
-                .order_by("name")[: self.SEARCH_LIMIT]
-            )
-            search["employees"] = [
-                DashboardSearchResult(
-                    title=(getattr(e, "name", "") or "—"),
-                    subtitle=(str(getattr(e, "department", "")) or ""),
-                    open_url=self._safe_reverse("hr:employee_detail", kwargs={"pk": e.pk}),
-                )
-                for e in employees_found
-            ]
-
-            # Assets
-            asset_filter = Q(name__icontains=q) | Q(code__icontains=q)
-            if self._has_field(Asset, "serial"):
-                asset_filter |= Q(serial__icontains=q)
-
-            assets_found = (
-                assets_qs.filter(asset_filter)
-                .select_related("company")
-                .order_by("code")[: self.SEARCH_LIMIT]
+            # SearchDocument: كل الأنواع في استعلام واحد (مرتّبة، SEARCH_LIMIT لكل نوع)
+            sections = (
+                # (context key, document kind, detail url)
+                ("partners", "partner", "base:partner_detail"),
+                ("employees", "employee", "hr:employee_detail"),
+                ("assets", "asset", "assets:asset_detail"),
+                ("users", "user", "base:user_detail"),
             )
-            search["assets"] = [
-                DashboardSearchResult(
-                    title=f"{getattr(a, 'code', '')} — {getattr(a, 'name', '')}".strip(" —"),
-                    subtitle=(str(getattr(a, "company", "")) or ""),
-                    open_url=self._safe_reverse("assets:asset_detail", kwargs={"pk": a.pk}),
-                )
-                for a in assets_found
-            ]
-
-            # Users
-            user_filter = Q(email__icontains=q) | Q(first_name__icontains=q) | Q(last_name__icontains=q)
-            if self._has_field(User, "partner"):
-                user_filter |= Q(partner__name__icontains=q)
-
-            users_found = (
-                users_qs.filter(user_filter)
-                .select_related("company", "partner")
-                .order_by("email")[: self.SEARCH_LIMIT]
+            found = global_search(
+                q,
+                company_ids=selected_company_ids,
+                kinds=[kind for _key, kind, _url in sections],
+                limit=self.SEARCH_LIMIT,
             )
-            search["users"] = [
-                DashboardSearchResult(
-                    title=(getattr(u, "email", "") or "—"),
-                    subtitle=(u.get_full_name() or (getattr(u, "partner", None) and u.partner.name) or ""),
-                    open_url=self._safe_reverse("base:user_detail", kwargs={"pk": u.pk}),
-                )
-                for u in users_found
-            ]
+            for key, kind, url_name in sections:
+                search[key] = [
+                    DashboardSearchResult(
+                        title=hit.title or "—",
+                        subtitle=hit.subtitle or "",
+                        open_url=self._safe_reverse(url_name, kwargs={"pk": hit.object_id}),
+                    )
+                    for hit in found[kind]["hits"]
+                ]
 
         # -----------------------------------------------------
         # URLs + view-all search links
@@ -1113,13 +959,8 @@ class PartnerListView(LoginRequiredMixin, ListView):
             # Search
             q = data.get("q")
             if q:
-                qs = qs.filter(
-                    Q(name__icontains=q) |
-                    Q(display_name__icontains=q) |
-                    Q(email__icontains=q) |
-                    Q(phone__icontains=q) |
-                    Q(mobile__icontains=q)
-                )
+                # name / display_name / email / phone / mobile عبر فهرس البحث
+                qs = qs.filter(pk__in=matching_ids("partner", q))
 
             # Company
             if data.get("company"):
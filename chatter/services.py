@@ -1,10 +1,12 @@
 from __future__ import annotations
 from typing import Iterable, Sequence
 
+from django.apps import apps
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
 
-from .models import ChatterMessage, ChatterFollower, ChatterAttachment
+from .models import EMPLOYEE_MODEL, ChatterMessage, ChatterFollower, ChatterAttachment
 
 
 def _ct_and_id(target):
@@ -24,6 +26,44 @@ def follow(target, *, user=None, employee=None):
     return follower
 
 
+@transaction.atomic
+def follow_many(targets: Sequence, *fields: str) -> int:
+    """
+    نسخة جماعية من المتابعة التلقائية (chatter.signals) للسجلات المنشأة بـ bulk_create
+    (لا تطلق post_save): قيم الحقول (User/Employee) تصبح متابعين لكل سجل.
+    نفس قواعد clean(): شركة المتابع = شركة الهدف، والموظف من شركة أخرى يُتجاهل.
+    """
+    targets = [t for t in targets if t.pk]
+    if not targets:
+        return 0
+    model = targets[0].__class__
+    ct = ContentType.objects.get_for_model(model)
+    user_model = get_user_model()
+
+    pairs = []  # (target, "user_id"/"employee_id", actor_id)
+    for field in fields:
+        actor_attr = "user_id" if issubclass(model._meta.get_field(field).related_model, user_model) else "employee_id"
+        for target in targets:
+            actor_id = getattr(target, f"{field}_id", None)
+            if actor_id:
+                pairs.append((target, actor_attr, actor_id))
+
+    employee_ids = {actor_id for _t, attr, actor_id in pairs if attr == "employee_id"}
+    employee_companies = dict(
+        apps.get_model(EMPLOYEE_MODEL)._base_manager.filter(pk__in=employee_ids).values_list("id", "company_id")
+    ) if employee_ids else {}
+
+    rows = []
+    for target, attr, actor_id in pairs:
+        company_id = getattr(target, "company_id", None)
+        if attr == "employee_id" and company_id and employee_companies.get(actor_id) not in (None, company_id):
+            continue
+        rows.append(ChatterFollower(content_type=ct, object_id=target.pk, company_id=company_id, **{attr: actor_id}))
+    # ON CONFLICT DO NOTHING: المتابع الموجود مسبقًا (القيود الفريدة الجزئية) يُتخطّى
+    ChatterFollower.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
 @transaction.atomic
 def unfollow(target, *, user=None, employee=None):
     ct, oid = _ct_and_id(target)
@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
+from base.side_effects import on_commit_once
 from .services import follow
 from django.contrib.auth import get_user_model
 USER_MODEL = get_user_model()
@@ -13,22 +14,32 @@ def _safe_getattr(obj, name, default=None):
     except Exception:
         return default
 
-def _auto_follow_for_target(target, *actors):
+def _follow_safely(target, actor):
+    if not actor:
+        return
+    try:
+        if isinstance(actor, USER_MODEL):
+            follow(target, user=actor)
+        else:
+            follow(target, employee=actor)
+    except Exception:
+        # نتجاهل أي فشل فردي كي لا نكسر التدفق
+        pass
+
+
+def _auto_follow_for_target(target, *fields):
     """
-    يحاول إضافة هؤلاء كمتابعين للسجل الهدف (User/Employee),
+    يحاول إضافة قيم هذه الحقول (User/Employee) كمتابعين للسجل الهدف,
     يتجاهل أي قيمة None بأمان ويستخدم isinstance مع USER_MODEL.
+    المتابعة تتم مرة واحدة لكل (سجل، متابع) بعد commit مهما تكرر الحفظ،
+    والمتابع لا يُحمَّل من قاعدة البيانات إلا عندها.
     """
-    for actor in actors:
-        if not actor:
+    for field in fields:
+        actor_id = _safe_getattr(target, f"{field}_id")
+        if not actor_id:
             continue
-        try:
-            if isinstance(actor, USER_MODEL):
-                follow(target, user=actor)
-            else:
-                follow(target, employee=actor)
-        except Exception:
-            # نتجاهل أي فشل فردي كي لا نكسر التدفق
-            pass
+        key = ("chatter.follow", target._meta.label_lower, target.pk, field, actor_id)
+        on_commit_once(key, lambda field=field: _follow_safely(target, _safe_getattr(target, field)))
 
 
 # -------- Performance: Task / Objective / Evaluation --------
@@ -41,20 +52,19 @@ if Task:
     @receiver(post_save, sender=Task)
     def task_auto_follow(sender, instance, created, **kwargs):
         # اجعل assignee متابعًا للـ Task
-        _auto_follow_for_target(instance, _safe_getattr(instance, "assignee", None))
+        _auto_follow_for_target(instance, "assignee")
 
 if Objective:
     @receiver(post_save, sender=Objective)
     def objective_auto_follow(sender, instance, created, **kwargs):
         # اجعل reviewer متابعًا للـ Objective
-        _auto_follow_for_target(instance, _safe_getattr(instance, "reviewer", None))
+        _auto_follow_for_target(instance, "reviewer")
 
 if Evaluation:
     @receiver(post_save, sender=Evaluation)
     def evaluation_auto_follow(sender, instance, created, **kwargs):
         # اجعل employee/evaluator متابعين للتقييم
-        _auto_follow_for_target(instance, _safe_getattr(instance, "employee", None))
-        _auto_follow_for_target(instance, _safe_getattr(instance, "evaluator", None))
+        _auto_follow_for_target(instance, "employee", "evaluator")
 
 
 # -------- Assets: Asset holder --------
@@ -67,7 +77,7 @@ if Asset:
     @receiver(post_save, sender=Asset)
     def asset_auto_follow(sender, instance, created, **kwargs):
         # اجعل الحائز متابعًا للأصل
-        _auto_follow_for_target(instance, _safe_getattr(instance, "holder", None))
+        _auto_follow_for_target(instance, "holder")
 
 
 # -------- Payroll: Payslip employee --------
@@ -80,4 +90,4 @@ if Payslip:
     @receiver(post_save, sender=Payslip)
     def payslip_auto_follow(sender, instance, created, **kwargs):
         # اجعل الموظف متابعًا لقسيمته
-        _auto_follow_for_target(instance, _safe_getattr(instance, "employee", None))
+        _auto_follow_for_target(instance, "employee")
@@ -0,0 +1,515 @@
+# hr/management/commands/generate_load_data.py
+# -*- coding: utf-8 -*-
+# ============================================================
+# بيانات تحميل اصطناعية (Benchmark dataset)
+#
+# - N شركات، شجرة أقسام عميقة، عشرات الآلاف من الموظفين
+# - مهارات، أهداف/مهام/KPIs، تقييمات، تقييمات يومية، رواتب، سجلات حضور
+# - bulk_create فقط (بدون إشارات لكل صف) ثم تمريرات set-based للحقول المشتقة:
+#     parent_path/complete_name للأقسام، manager_path للموظفين، عدّادات الوظائف،
+#     مشاركو الأهداف، progress_pct للأهداف، DailyRatingMonthly، فهرس البحث
+# - نفس --seed → نفس البيانات
+# ============================================================
+
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def M(app_label, model_name):
+    return apps.get_model(app_label, model_name)
+
+
+FIRST_NAMES = [
+    "Ahmed", "Ali", "Hussein", "Mohammed", "Omar", "Yousif", "Mustafa", "Karrar", "Haider", "Zaid",
+    "Fatima", "Zainab", "Maryam", "Noor", "Sara", "Huda", "Rusul", "Aya", "Dalia", "Shahad",
+]
+LAST_NAMES = [
+    "Al-Abbasi", "Al-Jubouri", "Al-Tamimi", "Al-Saadi", "Al-Khafaji", "Al-Obaidi", "Al-Rubaie",
+    "Al-Hashimi", "Al-Dulaimi", "Al-Shammari", "Kareem", "Hassan", "Jawad", "Salman", "Mahdi",
+]
+JOB_TITLES = [
+    "Engineer", "Senior Engineer", "Technician", "Accountant", "Analyst", "Coordinator",
+    "Supervisor", "Specialist", "Officer", "Inspector", "Planner", "Administrator",
+]
+SKILL_TYPES = {
+    "Languages": ["Arabic", "English", "Kurdish", "French", "Turkish"],
+    "Technical": ["Python", "SQL", "Excel", "AutoCAD", "SAP", "Networking", "Welding", "Electrical"],
+    "Soft Skills": ["Leadership", "Communication", "Negotiation", "Time Management", "Teamwork"],
+}
+LEVELS = [("Beginner", 25), ("Intermediate", 50), ("Advanced", 75), ("Expert", 100)]
+TASK_STATUSES = [
+    # code, name, is_closed
+    ("todo", "To Do", False),
+    ("in_progress", "In Progress", False),
+    ("done", "Done", True),
+    ("cancelled", "Cancelled", True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible large-tenant dataset (bulk_create, no per-row signals) "
+        "and fix derived fields with set-based passes. Scores/evaluation results are not "
+        "computed: run recompute_evaluations afterwards if needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1)
+        parser.add_argument("--employees", type=int, default=1000, help="Employees per company")
+        parser.add_argument("--depth", type=int, default=3, help="Department tree depth below the root")
+        parser.add_argument("--branching", type=int, default=4, help="Child departments per department")
+        parser.add_argument("--jobs", type=int, default=12, help="Jobs per company")
+        parser.add_argument("--skills-per-employee", type=int, default=3)
+        parser.add_argument("--objectives-per-department", type=int, default=2)
+        parser.add_argument("--tasks-per-objective", type=int, default=8)
+        parser.add_argument("--kpis-per-objective", type=int, default=2)
+        parser.add_argument("--months", type=int, default=3, help="Months of payslips / evaluations window")
+        parser.add_argument("--rating-days", type=int, default=20, help="Daily ratings per employee")
+        parser.add_argument("--attendance-days", type=int, default=10, help="Working days of in/out logs")
+        parser.add_argument("--start", type=str, default=None, help="First day of the data window (YYYY-MM-DD)")
+        parser.add_argument("--prefix", type=str, default="Load", help="Name prefix for generated companies")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--no-search-index", action="store_true", help="Skip the search index rebuild")
+
+    # ------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch = max(1, options["batch_size"])
+        self.opts = options
+
+        try:
+            self.start = (
+                date.fromisoformat(options["start"]) if options.get("start")
+                else timezone.localdate().replace(day=1) - timedelta(days=31 * options["months"])
+            ).replace(day=1)
+        except ValueError as exc:
+            raise CommandError(f"Invalid --start: {exc}")
+
+        Company = M("base", "Company")
+        names = [f"{options['prefix']} Company {i + 1}" for i in range(options["companies"])]
+        existing = list(Company.objects.filter(name__in=names).values_list("name", flat=True))
+        if existing:
+            raise CommandError(f"Companies already exist: {', '.join(existing)} (use another --prefix)")
+
+        started = time.perf_counter()
+        self._reference_data()
+
+        for name in names:
+            t0 = time.perf_counter()
+            # الشركة نفسها عبر save() (Partner + الإعدادات من الإشارات)
+            company = Company.objects.create(name=name)
+            self.stdout.write(f"{name} (id={company.pk})")
+            self._company(company)
+            self.stdout.write(f"  done in {time.perf_counter() - t0:.1f}s")
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(names)} company(ies) in {time.perf_counter() - started:.1f}s."))
+
+    def _step(self, label, func, *args):
+        t0 = time.perf_counter()
+        with transaction.atomic():
+            result = func(*args)
+        self.stdout.write(f"  - {label}: {result} in {time.perf_counter() - t0:.1f}s")
+        return result
+
+    def _bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch)
+
+    # ------------------------------------------------------------
+    # Global reference data (idempotent)
+    # ------------------------------------------------------------
+    def _reference_data(self):
+        EmployeeStatus = M("hr", "EmployeeStatus")
+        SkillType = M("skills", "SkillType")
+        Skill = M("skills", "Skill")
+        SkillLevel = M("skills", "SkillLevel")
+        TaskStatus = M("performance", "TaskStatus")
+
+        self.active_status, _ = EmployeeStatus.objects.get_or_create(
+            code="active", defaults={"name": "Active"},
+        )
+
+        self.skills = []  # (skill_type_id, skill_id, [level_ids])
+        for type_name, skill_names in SKILL_TYPES.items():
+            skill_type, _ = SkillType.objects.get_or_create(name=type_name)
+            levels = []
+            for i, (level_name, progress) in enumerate(LEVELS):
+                level, _ = SkillLevel.objects.get_or_create(
+                    skill_type=skill_type, name=level_name,
+                    defaults={"level_progress": progress, "default_level": i == 0},
+                )
+                levels.append(level.pk)
+            for skill_name in skill_names:
+                skill, _ = Skill.objects.get_or_create(skill_type=skill_type, name=skill_name)
+                self.skills.append((skill_type.pk, skill.pk, levels))
+
+        self.task_statuses = {}
+        for seq, (code, name, is_closed) in enumerate(TASK_STATUSES):
+            status, _ = TaskStatus.objects.get_or_create(
+                code=code, defaults={"name": name, "is_closed": is_closed, "sequence": (seq + 1) * 10},
+            )
+            self.task_statuses[code] = status.pk
+
+    # ------------------------------------------------------------
+    # One company
+    # ------------------------------------------------------------
+    def _company(self, company):
+        cid = company.pk
+        self._step("departments", self._departments, cid)
+        self._step("jobs", self._jobs, cid)
+        self._step("employees", self._employees, cid)
+        self._step("managers", self._managers, cid)
+        self._step("skills", self._employee_skills, cid)
+        self._step("objectives/tasks/kpis", self._objectives, cid)
+        self._step("evaluations", self._evaluations, cid)
+        self._step("daily ratings", self._daily_ratings, cid)
+        self._step("payslips", self._payslips, cid)
+        self._step("attendance logs", self._attendance, cid)
+        self._step("derived fields", self._derived, cid)
+
+    # ---------- Departments ----------
+    def _departments(self, cid):
+        Department = M("hr", "Department")
+        root = self._bulk(Department, [Department(company_id=cid, name="Head Office")])[0]
+        self.departments = [root]
+
+        level = [(root, "")]
+        for _depth in range(self.opts["depth"]):
+            objs, labels = [], []
+            for parent, label in level:
+                for i in range(self.opts["branching"]):
+                    child_label = f"{label}.{i + 1}" if label else str(i + 1)
+                    objs.append(Department(company_id=cid, parent_id=parent.pk, name=f"Dept {child_label}"))
+                    labels.append(child_label)
+            created = self._bulk(Department, objs)
+            self.departments.extend(created)
+            level = list(zip(created, labels))
+        self.leaves = [d for d, _label in level] or [root]
+        return len(self.departments)
+
+    # ---------- Jobs ----------
+    def _jobs(self, cid):
+        Job = M("hr", "Job")
+        self.jobs = self._bulk(Job, [
+            Job(company_id=cid, name=f"{JOB_TITLES[i % len(JOB_TITLES)]} {i // len(JOB_TITLES) + 1}")
+            for i in range(self.opts["jobs"])
+        ])
+        return len(self.jobs)
+
+    # ---------- Employees ----------
+    def _employees(self, cid):
+        Employee = M("hr", "Employee")
+        rng = self.rng
+        n = self.opts["employees"]
+
+        # مدير لكل قسم أولًا، والبقية موزعون على الأقسام (الأوراق أكثر)
+        leaf_ids = {d.pk for d in self.leaves}
+        pool = [d for d in self.departments if d.pk not in leaf_ids] + self.leaves
+        weights = [1] * (len(pool) - len(self.leaves)) + [4] * len(self.leaves)
+
+        def make(i, dept):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            return Employee(
+                company_id=cid,
+                name=f"{first} {last} {i + 1}",
+                department_id=dept.pk,
+                job_id=rng.choice(self.jobs).pk if self.jobs else None,
+                current_status_id=self.active_status.pk,
+                private_email=f"{first}.{last}.{cid}.{i + 1}@example.com".lower(),
+                private_phone=f"07{rng.randint(700000000, 899999999)}",
+                gender="female" if first in FIRST_NAMES[10:] else "male",
+                birthday=date(1965, 1, 1) + timedelta(days=rng.randint(0, 365 * 38)),
+                barcode=f"L{cid}-{i + 1:07d}",
+            )
+
+        heads = [make(i, d) for i, d in enumerate(self.departments[:n])]
+        rest = [
+            make(i, rng.choices(pool, weights=weights)[0])
+            for i in range(len(heads), n)
+        ]
+        self.employees = self._bulk(Employee, heads + rest)
+        self.dept_heads = {d.pk: e.pk for d, e in zip(self.departments, self.employees[:len(heads)])}
+        return len(self.employees)
+
+    # ---------- Managers (department.manager + employee.manager) ----------
+    def _managers(self, cid):
+        Department = M("hr", "Department")
+        Employee = M("hr", "Employee")
+
+        parent_of = {d.pk: d.parent_id for d in self.departments}
+        for d in self.departments:
+            d.manager_id = self.dept_heads.get(d.pk)
+        Department.objects.bulk_update(self.departments, ["manager"], batch_size=self.batch)
+
+        def manager_for(employee):
+            dept_id = employee.department_id
+            head = self.dept_heads.get(dept_id)
+            if head and head != employee.pk:
+                return head
+            # رئيس القسم يتبع رئيس القسم الأب
+            parent = parent_of.get(dept_id)
+            while parent and self.dept_heads.get(parent) is None:
+                parent = parent_of.get(parent)
+            return self.dept_heads.get(parent) if parent else None
+
+        for e in self.employees:
+            e.manager_id = manager_for(e)
+        Employee._base_manager.bulk_update(self.employees, ["manager"], batch_size=self.batch)
+        return sum(1 for e in self.employees if e.manager_id)
+
+    # ---------- Employee skills ----------
+    def _employee_skills(self, cid):
+        EmployeeSkill = M("skills", "EmployeeSkill")
+        rng = self.rng
+        k = min(self.opts["skills_per_employee"], len(self.skills))
+        objs = []
+        for e in self.employees:
+            for skill_type_id, skill_id, level_ids in rng.sample(self.skills, k):
+                objs.append(EmployeeSkill(
+                    company_id=cid, employee_id=e.pk, skill_type_id=skill_type_id,
+                    skill_id=skill_id, skill_level_id=rng.choice(level_ids),
+                ))
+        self._bulk(EmployeeSkill, objs)
+        return len(objs)
+
+    # ---------- Objectives / tasks / KPIs ----------
+    def _objectives(self, cid):
+        Objective = M("performance", "Objective")
+        Task = M("performance", "Task")
+        KPI = M("performance", "KPI")
+        rng = self.rng
+
+        members = {}
+        for e in self.employees:
+            members.setdefault(e.department_id, []).append(e.pk)
+
+        date_start = self.start
+        date_end = self._add_months(self.start, self.opts["months"]) - timedelta(days=1)
+
+        objectives = []
+        for d in self.departments:
+            for i in range(self.opts["objectives_per_department"]):
+                objectives.append(Objective(
+                    company_id=cid, title=f"{d.name} objective {i + 1}",
+                    date_start=date_start, date_end=date_end,
+                    target_kind="department", target_department_id=d.pk,
+                    reviewer_id=self.dept_heads.get(d.pk),
+                    weight_pct=rng.choice([50, 75, 100]),
+                ))
+        objectives = self._bulk(Objective, objectives)
+        self.objective_ids = [o.pk for o in objectives]
+
+        kpis, tasks = [], []
+        span = (date_end - date_start).days
+        done, todo = self.task_statuses["done"], self.task_statuses["todo"]
+        in_progress = self.task_statuses["in_progress"]
+        for o in objectives:
+            team = members.get(o.target_department_id) or [self.dept_heads.get(o.target_department_id)]
+            for i in range(self.opts["kpis_per_objective"]):
+                target = Decimal(rng.randint(50, 500))
+                current = (target * Decimal(rng.randint(20, 130)) / 100).quantize(Decimal("0.01"))
+                attainment = min(200, int(current * 100 / target))
+                kpis.append(KPI(
+                    company_id=cid, objective_id=o.pk, name=f"KPI {i + 1}",
+                    target_value=target, current_value=current,
+                    attainment_pct=attainment, score_pct=min(100, attainment),
+                ))
+            for i in range(self.opts["tasks_per_objective"]):
+                pct = rng.choice([0, 0, 25, 50, 75, 100, 100])
+                due = date_start + timedelta(days=rng.randint(0, max(0, span)))
+                tasks.append(Task(
+                    company_id=cid, objective_id=o.pk, title=f"Task {i + 1}",
+                    assignee_id=rng.choice(team), owner_id=o.reviewer_id,
+                    status_id=done if pct == 100 else (in_progress if pct else todo),
+                    percent_complete=pct, due_date=due,
+                    completed_at=(
+                        timezone.make_aware(datetime.combine(due, dtime(12))) if pct == 100 else None
+                    ),
+                    estimated_minutes=rng.choice([60, 120, 240, 480]),
+                ))
+        self._bulk(KPI, kpis)
+        self._bulk(Task, tasks)
+        return f"{len(objectives)} objectives, {len(tasks)} tasks, {len(kpis)} kpis"
+
+    # ---------- Evaluations ----------
+    def _evaluations(self, cid):
+        Evaluation = M("performance", "Evaluation")
+        date_end = self._add_months(self.start, self.opts["months"]) - timedelta(days=1)
+        objs = [
+            Evaluation(
+                company_id=cid, employee_id=e.pk, evaluator_id=e.manager_id,
+                date_start=self.start, date_end=date_end,
+            )
+            for e in self.employees
+        ]
+        self._bulk(Evaluation, objs)
+        return len(objs)
+
+    # ---------- Daily ratings ----------
+    def _daily_ratings(self, cid):
+        DailyRating = M("performance", "DailyRating")
+        rng = self.rng
+        days = self._working_days(self.opts["rating_days"])
+        objs = [
+            DailyRating(
+                company_id=cid, employee_id=e.pk, rated_by_id=e.manager_id,
+                date=day, overall_score_pct=rng.randint(40, 100),
+            )
+            for e in self.employees
+            for day in days
+        ]
+        self._bulk(DailyRating, objs)
+        return len(objs)
+
+    # ---------- Payroll ----------
+    def _payslips(self, cid):
+        PayrollPeriod = M("payroll", "PayrollPeriod")
+        Payslip = M("payroll", "Payslip")
+        rng = self.rng
+
+        periods = []
+        for i in range(self.opts["months"]):
+            first = self._add_months(self.start, i)
+            periods.append(PayrollPeriod(
+                company_id=cid, month=first.month, year=first.year,
+                date_from=first, date_to=self._add_months(first, 1) - timedelta(days=1),
+                state="closed" if i < self.opts["months"] - 1 else "open",
+            ))
+        periods = self._bulk(PayrollPeriod, periods)
+
+        basic_by_emp = {e.pk: Decimal(rng.randrange(600_000, 3_000_000, 25_000)) for e in self.employees}
+        objs = []
+        for idx, period in enumerate(periods):
+            last = idx == len(periods) - 1
+            for e in self.employees:
+                basic = basic_by_emp[e.pk]
+                allowances = (basic * Decimal("0.15")).quantize(Decimal("1"))
+                deductions = (basic * Decimal("0.05")).quantize(Decimal("1"))
+                objs.append(Payslip(
+                    company_id=cid, employee_id=e.pk, period_id=period.pk,
+                    department_id=e.department_id, job_id=e.job_id,
+                    basic=basic, allowances=allowances, deductions=deductions,
+                    net=basic + allowances - deductions,
+                    gross_wage=basic + allowances, net_wage=basic + allowances - deductions,
+                    state="draft" if last else "paid",
+                ))
+        self._bulk(Payslip, objs)
+        return len(objs)
+
+    # ---------- Attendance ----------
+    def _attendance(self, cid):
+        AttendanceLog = M("attendance", "AttendanceLog")
+        rng = self.rng
+        tz = timezone.get_current_timezone()
+        objs, total = [], 0
+        for day in self._working_days(self.opts["attendance_days"]):
+            for e in self.employees:
+                check_in = datetime.combine(day, dtime(8)) + timedelta(minutes=rng.randint(-20, 40))
+                check_out = datetime.combine(day, dtime(16)) + timedelta(minutes=rng.randint(-30, 60))
+                objs.append(AttendanceLog(company_id=cid, employee_id=e.pk, kind="in",
+                                          ts=timezone.make_aware(check_in, tz), source="load"))
+                objs.append(AttendanceLog(company_id=cid, employee_id=e.pk, kind="out",
+                                          ts=timezone.make_aware(check_out, tz), source="load"))
+            # flush على دفعات حتى لا تتضخم الذاكرة مع آلاف الموظفين × الأيام
+            if len(objs) >= self.batch * 4:
+                self._bulk(AttendanceLog, objs)
+                total, objs = total + len(objs), []
+        self._bulk(AttendanceLog, objs)
+        return total + len(objs)
+
+    # ------------------------------------------------------------
+    # Derived fields (set-based)
+    # ------------------------------------------------------------
+    def _derived(self, cid):
+        from base import search
+        from base.dashboard import invalidate_company_metrics
+        from performance.services import DailyRatingRollupService, ObjectiveParticipantService
+
+        Employee = M("hr", "Employee")
+        Job = M("hr", "Job")
+        Objective = M("performance", "Objective")
+        Task = M("performance", "Task")
+
+        # 1) Department.parent_path / complete_name — CTE تكراري واحد
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH RECURSIVE tree(id, path, full_name) AS (
+                    SELECT id, id::text || '/', name::text
+                    FROM hr_department WHERE company_id = %s AND parent_id IS NULL
+                    UNION ALL
+                    SELECT d.id, t.path || d.id::text || '/', t.full_name || ' / ' || d.name
+                    FROM hr_department d JOIN tree t ON d.parent_id = t.id
+                )
+                UPDATE hr_department h
+                SET parent_path = tree.path, complete_name = tree.full_name
+                FROM tree WHERE h.id = tree.id
+                """,
+                [cid],
+            )
+
+        # 2) Employee.manager_path
+        Employee.rebuild_manager_paths(company_id=cid)
+
+        # 3) Job counters (no_of_employee / expected_employees)
+        active_count = Coalesce(
+            Subquery(
+                Employee._base_manager.filter(job_id=OuterRef("pk"), active=True)
+                .order_by().values("job_id").annotate(n=Count("id")).values("n")[:1],
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+        jobs = Job.objects.filter(company_id=cid)
+        jobs.update(no_of_employee=active_count)
+        jobs.update(expected_employees=F("no_of_employee") + Coalesce(F("no_of_recruitment"), Value(0)))
+
+        # 4) Objective participants (نفس مسار rebuild_objective_participants)
+        for i in range(0, len(self.objective_ids), 500):
+            ObjectiveParticipantService.rebuild(self.objective_ids[i:i + 500])
+
+        # 5) Objective.progress_pct = متوسط تقدم المهام غير الملغاة
+        avg_progress = Subquery(
+            Task.objects.filter(objective_id=OuterRef("pk"))
+            .exclude(status__code="cancelled")
+            .order_by().values("objective_id").annotate(a=Avg("percent_complete")).values("a")[:1]
+        )
+        Objective.all_objects.filter(company_id=cid).update(
+            progress_pct=Coalesce(avg_progress, Value(0.0))
+        )
+
+        # 6) DailyRatingMonthly
+        DailyRatingRollupService.refresh(company_id=cid)
+
+        # 7) Search index + dashboard counters
+        if not self.opts.get("no_search_index"):
+            search.rebuild(["employee", "partner"], company_id=cid, chunk_size=self.batch)
+        invalidate_company_metrics(cid)
+        return "ok"
+
+    # ------------------------------------------------------------
+    # Date helpers
+    # ------------------------------------------------------------
+    @staticmethod
+    def _add_months(d, months):
+        month = d.month - 1 + months
+        return date(d.year + month // 12, month % 12 + 1, 1)
+
+    def _working_days(self, count):
+        days, day = [], self.start
+        while len(days) < count:
+            if day.weekday() not in (4, 5):  # الجمعة والسبت
+                days.append(day)
+            day += timedelta(days=1)
+        return days
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# تعبئة manager_path للسجلات الموجودة (CTE تكراري من الجذور)
+BACKFILL_SQL = """
+WITH RECURSIVE tree(id, path) AS (
+    SELECT id, id::text || '/' FROM hr_employee WHERE manager_id IS NULL
+    UNION ALL
+    SELECT e.id, t.path || e.id::text || '/'
+    FROM hr_employee e JOIN tree t ON e.manager_id = t.id
+)
+UPDATE hr_employee h SET manager_path = tree.path
+FROM tree
+WHERE h.id = tree.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+        ('hr', '0024_alter_department_managers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='manager_path',
+            field=models.CharField(blank=True, editable=False, max_length=2048),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['manager_path'], name='hr_employee_manager_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
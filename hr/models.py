@@ -929,6 +929,9 @@ class Employee(
         related_name="managed_employees",
     )
 
+    # مسار المدراء المخزّن: "id_الجذر/.../id_المدير/id_الموظف/" (مثل Department.parent_path)
+    manager_path = models.CharField(max_length=2048, blank=True, editable=False)
+
     coach = models.ForeignKey(
         "self",
         null=True,
@@ -1013,6 +1016,12 @@ class Employee(
             models.Index(fields=["company", "active"]),
             models.Index(fields=["name"]),
             models.Index(fields=["department"]),
+            # varchar_pattern_ops → LIKE 'prefix%' يستخدم الفهرس
+            models.Index(
+                fields=["manager_path"],
+                name="hr_employee_manager_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
         ]
 
     # ------------------------------------------------------------
@@ -1024,19 +1033,185 @@ class Employee(
         if self.manager_id and self.manager_id == self.pk:
             raise ValidationError({"manager": "Employee cannot be their own manager."})
 
-        node = self.manager
-        while node:
-            if node.pk == self.pk:
+        # الحلقة = الموظف موجود في مسار المدير الجديد (فحص على القيمة المخزّنة بدل المشي صعودًا)
+        if self.pk and self.manager_id:
+            manager = type(self)._base_manager.only("manager_path", "manager_id").filter(pk=self.manager_id).first()
+            if manager and self.pk in manager.manager_chain_ids(include_self=True):
                 raise ValidationError({"manager": "Cyclic managerial hierarchy is not allowed."})
-            node = node.manager
 
         if self.barcode is not None:
             self.barcode = self.barcode.strip() or None
 
     def save(self, *args, **kwargs):
+        """
+        1) full_clean (إلا مع _skip_full_clean)
+        2) الحفظ لضمان وجود PK
+        3) manager_path للسجل نفسه عبر UPDATE مباشر (بدون إعادة إطلاق الإشارات)
+        4) عند تغيّر المدير: إعادة كتابة مسارات كل التابعين بعبارة UPDATE واحدة
+        """
         if kwargs.pop("_skip_full_clean", False) is not True:
             self.full_clean()
-        return super().save(*args, **kwargs)
+
+        result = super().save(*args, **kwargs)
+
+        # القيم القديمة تلتقطها إشارة pre_save (hr.employee.capture_old_values)
+        old_path = getattr(self, "_old_manager_path", self.manager_path)
+        if old_path and self.manager_id == getattr(self, "_old_manager_id", self.manager_id):
+            self.manager_path = old_path
+            return result
+
+        new_path = self._compute_manager_path()
+        if new_path != old_path:
+            self.manager_path = new_path
+            type(self)._base_manager.filter(pk=self.pk).update(manager_path=new_path)
+            if old_path:
+                type(self)._rewrite_manager_paths(old_path, new_path)
+        return result
+
+    # ------------------------------------------------------------
+    # Manager hierarchy (materialized path)
+    # ------------------------------------------------------------
+    def _compute_manager_path(self):
+        if not self.manager_id:
+            return f"{self.pk}/"
+        return f"{type(self)._materialized_path(self.manager_id)}{self.pk}/"
+
+    @classmethod
+    def _materialized_path(cls, pk):
+        """
+        المسار الكامل لـ pk (من الجذر حتى pk).
+        مسار فارغ (bulk_create) = غير محسوب → نصعد عبر manager_id حتى أول سلف له مسار
+        (أو الجذر) بدل مسار مبتور يحتوي المدير المباشر فقط.
+        """
+        from django.db import connection
+
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE up(id, manager_id, manager_path, depth) AS (
+                    SELECT id, manager_id, manager_path, 0 FROM {table} WHERE id = %s
+                    UNION ALL
+                    SELECT e.id, e.manager_id, e.manager_path, up.depth + 1
+                    FROM {table} e JOIN up ON e.id = up.manager_id
+                    WHERE up.manager_path = '' AND up.depth < 1000
+                )
+                SELECT
+                    COALESCE((SELECT manager_path FROM up WHERE manager_path <> '' ORDER BY depth LIMIT 1), '')
+                    || COALESCE(
+                        (SELECT string_agg(id::text || '/', '' ORDER BY depth DESC) FROM up WHERE manager_path = ''),
+                        ''
+                    )
+                """,
+                [pk],
+            )
+            row = cursor.fetchone()
+        return (row[0] if row else "") or f"{pk}/"
+
+    @classmethod
+    def _rewrite_manager_paths(cls, old_prefix, new_prefix):
+        """
+        استبدال البادئة old_prefix بـ new_prefix لكل من يقع تحتها (عبارة UPDATE واحدة).
+        old_prefix يخص موظفًا حُدِّث مساره مسبقًا، لذا لا يطابق إلا التابعين.
+        """
+        from django.db.models import Value
+        from django.db.models.functions import Concat, Substr
+
+        return cls._base_manager.filter(manager_path__startswith=old_prefix).update(
+            manager_path=Concat(
+                Value(new_prefix),
+                Substr("manager_path", len(old_prefix) + 1),
+                output_field=models.CharField(),
+            )
+        )
+
+    @classmethod
+    def rebuild_manager_paths(cls, company_id=None):
+        """
+        إعادة بناء manager_path من manager_id (CTE تكراري واحد).
+        للاستخدام بعد bulk_create / update(manager=...) التي لا تمر بـ save().
+        company_id: موظفو هذه الشركة فقط (المدير من شركة أخرى = بادئة من مساره المخزّن).
+        """
+        from django.db import connection
+
+        table = cls._meta.db_table
+        if company_id is None:
+            anchor, step, params = f"SELECT id, id::text || '/' FROM {table} WHERE manager_id IS NULL", "", []
+        else:
+            anchor = f"""
+                SELECT h.id,
+                       CASE WHEN m.id IS NULL THEN '' ELSE COALESCE(NULLIF(m.manager_path, ''), m.id::text || '/') END
+                       || h.id::text || '/'
+                FROM {table} h LEFT JOIN {table} m ON m.id = h.manager_id
+                WHERE h.company_id = %s AND (h.manager_id IS NULL OR m.company_id IS DISTINCT FROM h.company_id)
+            """
+            step, params = "WHERE e.company_id = %s", [company_id, company_id]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE tree(id, path) AS (
+                    {anchor}
+                    UNION ALL
+                    SELECT e.id, t.path || e.id::text || '/'
+                    FROM {table} e JOIN tree t ON e.manager_id = t.id
+                    {step}
+                )
+                UPDATE {table} h SET manager_path = tree.path
+                FROM tree
+                WHERE h.id = tree.id AND h.manager_path IS DISTINCT FROM tree.path
+                """,
+                params,
+            )
+            return cursor.rowcount
+
+    def manager_chain_ids(self, include_self=False):
+        """معرّفات سلسلة المدراء من الجذر حتى المدير المباشر (من manager_path)."""
+        if self.manager_path_is_current():
+            ids = [int(x) for x in self.manager_path.split("/") if x]
+        else:
+            # مسار غير محسوب (bulk_create) أو قديم → المشي التقليدي
+            ids, node = [], self
+            while node is not None and node.pk not in ids:
+                ids.insert(0, node.pk)
+                node = node.manager
+        return ids if include_self else ids[:-1]
+
+    def manager_path_is_current(self):
+        """المسار صالح فقط إن انتهى بـ (manager_id, pk)."""
+        ids = [int(x) for x in self.manager_path.split("/") if x] if self.manager_path else []
+        return bool(ids) and ids[-1] == self.pk and (ids[-2] if len(ids) > 1 else None) == self.manager_id
+
+    @classmethod
+    def has_unmaterialized_paths(cls):
+        """هل يوجد موظف بلا manager_path (bulk_create لم يتبعه rebuild_manager_paths)؟"""
+        return cls._base_manager.filter(manager_path="").exists()
+
+    def get_all_reports(self):
+        """كل التابعين (مباشرين وغير مباشرين) عبر فهرس manager_path، أو CTE إن وُجدت مسارات غير محسوبة."""
+        if not self.manager_path_is_current() or type(self).has_unmaterialized_paths():
+            return type(self).objects.filter(pk__in=type(self).subordinates_sql(self.pk))
+        return type(self).objects.filter(
+            manager_path__startswith=self.manager_path,
+        ).exclude(pk=self.pk)
+
+    @classmethod
+    def subordinates_sql(cls, manager_id):
+        """كل من تمرّ سلسلة مدرائه بـ manager_id (CTE تعاودي عبر manager_id، لا يعتمد على manager_path)."""
+        from django.db.models.expressions import RawSQL
+
+        table = cls._meta.db_table
+        return RawSQL(
+            f"""
+            WITH RECURSIVE subs(id) AS (
+                SELECT id FROM {table} WHERE manager_id = %s
+                UNION
+                SELECT e.id FROM {table} e JOIN subs s ON e.manager_id = s.id
+            )
+            SELECT id FROM subs
+            """,
+            (manager_id,),
+        )
 
     # ------------------------------------------------------------
     # URLs
@@ -14,6 +14,7 @@
 
 # NOTE:
 # Signals in this module intentionally use transaction.on_commit()
+# (or base.side_effects.on_commit_once for keyed, coalesced work)
 # instead of wrapping logic in atomic().
 # This ensures all side effects (ACL, counters, partner flags)
 # are applied only after the main DB transaction is fully committed.
@@ -25,10 +26,12 @@ from __future__ import annotations
 from django.apps import apps
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
 from django.db.models.signals import post_migrate, pre_save, post_save, post_delete
+from django.db.models import F
 from django.dispatch import receiver
 
+from base.side_effects import on_commit_once
+
 
 # ============================================================
 # Helpers
@@ -186,25 +189,32 @@ def _employee_capture_old_vals(sender, instance, **kwargs):
         try:
             old = sender.objects.only(
                 "job_id", "active", "user_id",
-                "work_contact_id", "department_id"
+                "work_contact_id", "department_id",
+                "manager_id", "manager_path",
             ).get(pk=instance.pk)
             instance._old_job_id = old.job_id
             instance._old_active = old.active
             instance._old_user_id = old.user_id
             instance._old_work_contact_id = old.work_contact_id
             instance._old_department_id = old.department_id
+            instance._old_manager_id = old.manager_id
+            instance._old_manager_path = old.manager_path
         except sender.DoesNotExist:
             instance._old_job_id = None
             instance._old_active = None
             instance._old_user_id = None
             instance._old_work_contact_id = None
             instance._old_department_id = None
+            instance._old_manager_id = None
+            instance._old_manager_path = ""
     else:
         instance._old_job_id = None
         instance._old_active = None
         instance._old_user_id = None
         instance._old_work_contact_id = None
         instance._old_department_id = None
+        instance._old_manager_id = None
+        instance._old_manager_path = ""
 
 # ============================================================
 # 4) Job Counters (Employee ↔ Job)
@@ -229,6 +239,26 @@ def recompute_job_counters(job_id):
     )
 
 
+def schedule_job_counters(job_id):
+    """إعادة حساب عدّادات الوظيفة مرة واحدة بعد commit (مهما تكرر الحفظ)."""
+    if job_id:
+        on_commit_once(("hr.job_counters", job_id), lambda: recompute_job_counters(job_id))
+
+
+def update_job_expected(job_id):
+    """expected = no_of_employee (المخزّن) + no_of_recruitment — UPDATE واحد بدون عدّ الموظفين."""
+    Job = _get_model("hr", "Job")
+    Job.objects.filter(pk=job_id).update(
+        expected_employees=F("no_of_employee") + F("no_of_recruitment"),
+    )
+
+
+def schedule_job_expected(job_id):
+    """حفظ الوظيفة نفسها: expected فقط، مرة واحدة بعد commit (العدّ الكامل لتغييرات الموظفين)."""
+    if job_id:
+        on_commit_once(("hr.job_expected", job_id), lambda: update_job_expected(job_id))
+
+
 @receiver(
     post_save,
     sender=_get_model("hr", "Employee"),
@@ -239,18 +269,16 @@ def _employee_recompute_jobs_after_save(sender, instance, created, **kwargs):
     old_job_id = getattr(instance, "_old_job_id", None)
     old_active = getattr(instance, "_old_active", None)
 
-    def _on_commit():
-        if created:
-            recompute_job_counters(new_job_id)
-        else:
-            changed_job = old_job_id != new_job_id
-            changed_active = old_active is not None and old_active != instance.active
-            if changed_job or changed_active:
-                if old_job_id and old_job_id != new_job_id:
-                    recompute_job_counters(old_job_id)
-                recompute_job_counters(new_job_id)
+    if created:
+        schedule_job_counters(new_job_id)
+        return
 
-    transaction.on_commit(_on_commit)
+    changed_job = old_job_id != new_job_id
+    changed_active = old_active is not None and old_active != instance.active
+    if changed_job or changed_active:
+        if old_job_id and old_job_id != new_job_id:
+            schedule_job_counters(old_job_id)
+        schedule_job_counters(new_job_id)
 
 
 @receiver(
@@ -259,7 +287,7 @@ def _employee_recompute_jobs_after_save(sender, instance, created, **kwargs):
     dispatch_uid="hr.employee.recompute_job_after_delete",
 )
 def _employee_recompute_jobs_after_delete(sender, instance, **kwargs):
-    transaction.on_commit(lambda: recompute_job_counters(instance.job_id))
+    schedule_job_counters(instance.job_id)
 
 
 @receiver(
@@ -268,10 +296,7 @@ def _employee_recompute_jobs_after_delete(sender, instance, **kwargs):
     dispatch_uid="hr.job.recompute_expected_on_recruitment",
 )
 def _job_recompute_expected_on_recruitment(sender, instance, **kwargs):
-    def _on_commit():
-        expected = (instance.no_of_employee or 0) + (instance.no_of_recruitment or 0)
-        sender.objects.filter(pk=instance.pk).update(expected_employees=expected)
-    transaction.on_commit(_on_commit)
+    schedule_job_expected(instance.pk)
 
 
 # ============================================================
@@ -367,6 +392,24 @@ def backfill_employee_current_status(sender, **kwargs):
         emp.save(update_fields=["current_status", "active"])
 
 
+# ============================================================
+# 6) Manager path on Employee delete
+# ============================================================
+
+@receiver(
+    post_delete,
+    sender=_get_model("hr", "Employee"),
+    dispatch_uid="hr.employee.reroot_manager_path_on_delete",
+)
+def _employee_reroot_reports_on_delete(sender, instance, **kwargs):
+    """
+    manager = SET_NULL → التابعون المباشرون يصبحون جذورًا:
+    نحذف بادئة مسار الموظف المحذوف من كل من تحته (UPDATE واحد).
+    """
+    if instance.manager_path:
+        sender._rewrite_manager_paths(instance.manager_path, "")
+
+
 # ============================================================
 # Employee current_status bootstrap & sync
 # ============================================================
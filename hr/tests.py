@@ -1,3 +1,56 @@
 from django.test import TestCase
 
-# Create your tests here.
+from base.models import Company
+from hr.models import Department, Employee
+
+
+class ManagerPathTests(TestCase):
+    """
+    manager_path: تغيير المدير يعيد تجذير الموظف وكل تابعيه،
+    وحذف المدير يجعل تابعيه المباشرين جذورًا.
+    """
+
+    def setUp(self):
+        company = Company.objects.create(name="Path Co")
+        dept = Department.objects.create(name="Ops", company=company)
+
+        def emp(name, manager=None):
+            return Employee.objects.create(name=name, company=company, department=dept, manager=manager)
+
+        self.ceo = emp("Ceo")
+        self.vp = emp("Vp", self.ceo)
+        self.lead = emp("Lead", self.vp)
+        self.dev = emp("Dev", self.lead)
+        self.other_root = emp("Other Root")
+
+    def _path(self, employee):
+        return Employee.all_objects.values_list("manager_path", flat=True).get(pk=employee.pk)
+
+    def _expected(self, *chain):
+        return "".join(f"{e.pk}/" for e in chain)
+
+    def test_paths_follow_manager_chain(self):
+        self.assertEqual(self._path(self.dev), self._expected(self.ceo, self.vp, self.lead, self.dev))
+        self.assertEqual(self.dev.manager_chain_ids(), [self.ceo.pk, self.vp.pk, self.lead.pk])
+
+    def test_manager_change_reroots_subtree(self):
+        self.lead.manager = self.other_root
+        self.lead.save()
+
+        self.assertEqual(self._path(self.lead), self._expected(self.other_root, self.lead))
+        self.assertEqual(self._path(self.dev), self._expected(self.other_root, self.lead, self.dev))
+        self.assertEqual(self._path(self.vp), self._expected(self.ceo, self.vp))
+
+        self.lead.manager = None
+        self.lead.save()
+
+        self.assertEqual(self._path(self.lead), self._expected(self.lead))
+        self.assertEqual(self._path(self.dev), self._expected(self.lead, self.dev))
+
+    def test_manager_delete_makes_reports_roots(self):
+        self.vp.delete()
+
+        self.assertEqual(self._path(self.lead), self._expected(self.lead))
+        self.assertEqual(self._path(self.dev), self._expected(self.lead, self.dev))
+        self.assertEqual(self._path(self.ceo), self._expected(self.ceo))
+        self.assertIsNone(Employee.all_objects.get(pk=self.lead.pk).manager_id)
@@ -28,6 +28,7 @@ from django.urls import reverse_lazy
 from django.views.generic import TemplateView
 from django.views.generic.edit import UpdateView
 from base.company_context import get_allowed_company_ids
+from base.search import matching_ids
 from base.views import BaseScopedListView, BaseScopedDetailView, BaseScopedCreateView, BaseScopedUpdateView, \
     BaseScopedDeleteView
 from skills.models import EmployeeSkill, JobSkill
@@ -701,14 +702,8 @@ class EmployeeListView(LoginRequiredMixin, BaseScopedListView):
         # --------------------------------------------------
         q = (params.get("q") or "").strip()
         if q:
-            qs = qs.filter(
-                Q(name__icontains=q)
-                | Q(user__email__icontains=q)
-                | Q(job__name__icontains=q)
-                | Q(department__name__icontains=q)
-                | Q(manager__name__icontains=q)
-                | Q(company__name__icontains=q)
-            )
+            # name / email / job / department / manager / company عبر فهرس البحث
+            qs = qs.filter(pk__in=matching_ids("employee", q))
 
         # --------------------------------------------------
         # 4) Filters
@@ -13,10 +13,15 @@ from __future__ import annotations
 from typing import Optional, Iterable
 
 from django.contrib.auth import get_user_model
+from django.db.models import CharField, Exists, F, OuterRef, Q, QuerySet
+from django.db.models.functions import Cast
+from django.db.models.lookups import StartsWith
 
+from base.access_context import get_access_context
 from hr.models import Employee, Department
 from performance.models import (
     Objective,
+    ObjectiveParticipant,
     KPI,
     Task,
     Evaluation,
@@ -121,12 +126,11 @@ def can_edit_objective(user: User, obj: Objective) -> bool:
         # same dept manager
         if dept and dept.manager_id == me.id:
             return True
-        # parent chain managers
-        current = dept.parent if dept else None
-        while current:
-            if current.manager_id == me.id:
+        # parent chain managers (parent_path → استعلام واحد)
+        if dept:
+            parent_ids = [int(x) for x in dept.parent_path.split("/") if x and int(x) != dept.pk]
+            if parent_ids and Department.objects.filter(pk__in=parent_ids, manager_id=me.id).exists():
                 return True
-            current = current.parent
 
     return False
 
@@ -346,3 +350,165 @@ def can_edit_evaluation(user: User, evaluation: Evaluation) -> bool:
         return True
 
     return False
+
+
+# ============================================================
+# 6) Queryset builders (same rules, compiled to SQL)
+# ============================================================
+# نفس قواعد can_view_* / can_edit_objective كشروط SQL:
+# قائمة بـ N عنصر = استعلام واحد بدل N×k (get_employee، participants.exists()، سلاسل المدراء).
+# الاختبارات في performance/tests.py تتحقق من التطابق مع الدوال لكل عنصر.
+
+def _visibility_scope(user: User):
+    """(employee, company_ids) أو None إن لم يكن للمستخدم أي رؤية."""
+    if not user or not user.is_authenticated:
+        return None
+    me = get_employee(user)
+    if not me:
+        return None
+    ctx = get_access_context(user)
+    return me, list(ctx.company_ids if ctx is not None else user.company_ids)
+
+
+def _subordinates(me: Employee):
+    """
+    كل التابعين (مباشرين وغير مباشرين) = user_is_in_manager_chain لكل موظف:
+    بادئة manager_path المفهرسة، و CTE (Employee.subordinates_sql) عندما لا يمكن الوثوق بالمسارات:
+    مسار me غير محسوب/قديم، أو يوجد موظفون بلا مسار (bulk_create) قد يكونون تحته.
+    """
+    if not me.manager_path_is_current() or Employee.has_unmaterialized_paths():
+        return Employee.subordinates_sql(me.id)
+    return (
+        Employee._base_manager
+        .filter(manager_path__startswith=me.manager_path)
+        .exclude(pk=me.id)
+        .values("id")
+    )
+
+
+def _participant_exists(me_id: int, objective_ref: str) -> Exists:
+    return Exists(
+        ObjectiveParticipant.objects.filter(objective_id=OuterRef(objective_ref), employee_id=me_id)
+    )
+
+
+def visible_objectives(user: User, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """Objectives that can_view_objective(user, obj) accepts."""
+    qs = Objective.objects.all() if queryset is None else queryset
+    scope = _visibility_scope(user)
+    if scope is None:
+        return qs.none()
+    me, company_ids = scope
+
+    rule = (
+        Q(reviewer_id=me.id)
+        | _participant_exists(me.id, "pk")
+        | Q(target_kind="employee", target_employee_id=me.id)
+        | Q(target_kind="department", target_department_id=me.department_id)
+        | Q(
+            target_kind="department",
+            target_department__isnull=False,
+            target_employee_id__in=_subordinates(me),
+        )
+        | Q(target_kind="company")
+    )
+    return qs.filter(rule, company_id__in=company_ids)
+
+
+def editable_objectives(user: User, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    Objectives that can_edit_objective(user, obj) accepts.
+    مدير القسم المستهدف أو أي قسم أعلى منه = قسم يديره المستخدم ومساره بادئة لمسار القسم المستهدف.
+    """
+    qs = Objective.objects.all() if queryset is None else queryset
+    scope = _visibility_scope(user)
+    if scope is None:
+        return qs.none()
+    me, company_ids = scope
+
+    managed_ancestor = Exists(
+        Department.all_objects
+        .filter(manager_id=me.id)
+        .exclude(parent_path="")
+        .filter(StartsWith(
+            Cast(OuterRef("target_department__parent_path"), output_field=CharField()),
+            F("parent_path"),
+        ))
+    )
+
+    rule = (
+        Q(reviewer_id=me.id)
+        | Q(target_kind="employee", target_employee__manager_id=me.id)
+        | Q(target_kind="department", target_department__manager_id=me.id)
+        | (Q(target_kind="department") & managed_ancestor)
+    )
+    return qs.filter(rule, company_id__in=company_ids)
+
+
+def visible_tasks(user: User, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """Tasks that can_view_task(user, task) accepts."""
+    qs = Task.objects.all() if queryset is None else queryset
+    scope = _visibility_scope(user)
+    if scope is None:
+        return qs.none()
+    me, company_ids = scope
+
+    rule = (
+        Q(assignee_id=me.id)
+        | Q(assignee__manager_id=me.id)
+        | Q(objective__reviewer_id=me.id)
+        | _participant_exists(me.id, "objective_id")
+    )
+    return qs.filter(rule, company_id__in=company_ids)
+
+
+def visible_evaluations(user: User, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """Evaluations that can_view_evaluation(user, evaluation) accepts."""
+    qs = Evaluation.objects.all() if queryset is None else queryset
+    scope = _visibility_scope(user)
+    if scope is None:
+        return qs.none()
+    me, company_ids = scope
+
+    rule = (
+        Q(employee_id=me.id)
+        | Q(evaluator_id=me.id)
+        # is_manager_of + user_is_in_manager_chain
+        | Q(employee_id__in=_subordinates(me))
+    )
+    return qs.filter(rule, company_id__in=company_ids)
+
+
+# ============================================================
+# 7) Daily rating — bulk team entry
+# ============================================================
+
+def rateable_managers(user: User, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    المدراء الذين يحق للمستخدم تقييم فريقهم اليومي (شاشة daily_rating_bulk):
+    - صلاحية performance.change_dailyrating → أي مدير ضمن شركات المستخدم
+    - وإلا: الموظف المرتبط بالمستخدم + التابعون له (manager_path)
+    """
+    qs = (
+        Employee.objects.filter(active=True, managed_employees__active=True).distinct()
+        if queryset is None else queryset
+    )
+    if not user or not user.is_authenticated:
+        return qs.none()
+
+    ctx = get_access_context(user)
+    qs = qs.filter(company_id__in=list(ctx.company_ids if ctx is not None else user.company_ids))
+    if user.has_perm("performance.change_dailyrating"):
+        return qs
+
+    me = get_employee(user)
+    if not me:
+        return qs.none()
+    return qs.filter(Q(pk=me.id) | Q(pk__in=_subordinates(me)))
+
+
+def can_rate_team(user: User, manager: Employee) -> bool:
+    """rateable_managers كفحص لمدير واحد (إعادة التحقق عند POST)."""
+    if manager is None:
+        return False
+    return rateable_managers(user).filter(pk=manager.pk).exists()
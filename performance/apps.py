@@ -8,4 +8,7 @@ class PerformanceConfig(AppConfig):
 
     def ready(self):
         # تفعيل الإشارات بتحميل ملف signals مرة واحدة
-        from . import signals  # noqa: F401
+        from . import signals
+
+        # كاش EXTERNAL_METRIC: إبطال عند تغيّر الموديلات المسجّلة (سجل ثابت من الإعدادات)
+        signals.connect_external_metric_receivers()
@@ -209,3 +209,13 @@ class TaskForm(_ScopedModelForm):
         super().__init__(*args, **kwargs)
         from hr.models import Employee
         self._filter_by_company("assignee", Employee.objects.all())
+
+    def clean_depends_on(self):
+        deps = self.cleaned_data.get("depends_on")
+        if deps and self.instance.pk:
+            from performance.services import TaskDependencyGraph  # LAZY IMPORT
+            existing = set(self.instance.depends_on.values_list("pk", flat=True))
+            for dep in deps:
+                if dep.pk not in existing and TaskDependencyGraph.creates_cycle(self.instance.pk, dep.pk):
+                    raise forms.ValidationError(f"Depending on '{dep}' would create a cycle.")
+        return deps
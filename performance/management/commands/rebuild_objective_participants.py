@@ -1,20 +1,97 @@
 # performance/management/commands/rebuild_objective_participants.py
 
-from django.core.management.base import BaseCommand
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
 from performance.models import Objective
+from performance.services import (
+    ObjectiveParticipantService,
+    _pool_initializer,
+    _rebuild_participants_chunk,
+)
 
 
 class Command(BaseCommand):
-    help = "Rebuild Objective participants for all existing objectives."
+    help = "Rebuild Objective participants (set-based, optionally dirty-only and in parallel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, default=None, help="Limit to one company id")
+        parser.add_argument(
+            "--since", type=str, default=None,
+            help="Only objectives changed (or whose assignments changed) since YYYY-MM-DD[THH:MM]",
+        )
+        parser.add_argument(
+            "--only-dirty", action="store_true",
+            help="Skip objectives whose assignments and department subtree are unchanged since the last rebuild",
+        )
+        parser.add_argument("--workers", type=int, default=1, help="Process pool size (1 = in-process)")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Objectives per rebuild statement")
 
     def handle(self, *args, **options):
-        qs = Objective.objects.all()
-        total = qs.count()
-        self.stdout.write(f"Rebuilding participants for {total} objectives ...")
+        started = time.perf_counter()
+
+        qs = Objective.all_objects.all()
+        if options.get("company"):
+            qs = qs.filter(company_id=options["company"])
+
+        since = options.get("since")
+        if since:
+            try:
+                since_dt = datetime.fromisoformat(since)
+            except ValueError:
+                raise CommandError("--since must be YYYY-MM-DD or an ISO datetime.")
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            qs = qs.filter(
+                Q(updated_at__gte=since_dt)
+                | Q(dept_assignments__updated_at__gte=since_dt)
+                | Q(employee_assignments__updated_at__gte=since_dt)
+            ).distinct()
+
+        ids = list(qs.order_by("id").values_list("id", flat=True))
+        total = len(ids)
+
+        if options.get("only_dirty"):
+            ids = ObjectiveParticipantService.dirty_objective_ids(ids)
+
+        self.stdout.write(
+            f"Rebuilding participants for {len(ids)} of {total} objective(s)"
+            + (" (dirty only)" if options.get("only_dirty") else "")
+            + " ..."
+        )
+
+        chunk_size = max(1, options.get("chunk_size") or 500)
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        workers = max(1, options.get("workers") or 1)
+
+        if workers > 1 and len(chunks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # الاتصالات المفتوحة لا تُورَّث للعمّال
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_pool_initializer) as pool:
+                results = list(pool.map(_rebuild_participants_chunk, chunks))
+        else:
+            workers = 1
+            results = [_rebuild_participants_chunk(chunk) for chunk in chunks]
+
+        rebuilt = sum(r[0] for r in results)
+        removed = sum(r[1] for r in results)
+        added = sum(r[2] for r in results)
 
-        for idx, obj in enumerate(qs, start=1):
-            # تستدعي المنطق الداخلي الموجود في الموديل
-            obj._rebuild_participants()
-            self.stdout.write(f"- [{idx}/{total}] rebuilt for Objective #{obj.id}")
+        elapsed = time.perf_counter() - started
+        rate = rebuilt / elapsed if elapsed else 0
 
-        self.stdout.write(self.style.SUCCESS("Done rebuilding participants for all objectives."))
+        self.stdout.write(
+            f"- objectives: {total} selected, {total - rebuilt} skipped, {rebuilt} rebuilt "
+            f"in {len(chunks)} chunk(s) with {workers} worker(s)"
+        )
+        self.stdout.write(f"- participants: +{added} / -{removed}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.2f}s ({rate:.0f} objectives/s)."
+        ))
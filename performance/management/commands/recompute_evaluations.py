@@ -0,0 +1,47 @@
+# performance/management/commands/recompute_evaluations.py
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from performance.services import EvaluationCycleEngine
+
+
+class Command(BaseCommand):
+    help = "Bulk-recompute evaluations of a cycle (company + date range, or explicit ids)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, default=None, help="Company id")
+        parser.add_argument("--date-start", type=str, default=None, help="Cycle start YYYY-MM-DD")
+        parser.add_argument("--date-end", type=str, default=None, help="Cycle end YYYY-MM-DD")
+        parser.add_argument("--ids", type=str, default=None, help="Comma-separated evaluation ids")
+        parser.add_argument("--workers", type=int, default=1, help="Process pool size (1 = in-process)")
+        parser.add_argument("--chunk-size", type=int, default=200, help="Evaluations per chunk/transaction")
+
+    def handle(self, *args, **options):
+        try:
+            date_start = date.fromisoformat(options["date_start"]) if options.get("date_start") else None
+            date_end = date.fromisoformat(options["date_end"]) if options.get("date_end") else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        evaluations = None
+        if options.get("ids"):
+            evaluations = [int(x) for x in options["ids"].split(",") if x.strip()]
+
+        started = time.perf_counter()
+        stats = EvaluationCycleEngine.recompute(
+            evaluations,
+            company_id=options.get("company"),
+            date_start=date_start,
+            date_end=date_end,
+            workers=options.get("workers") or 1,
+            chunk_size=options.get("chunk_size") or 200,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {stats['evaluations']} evaluation(s) in {stats['chunks']} chunk(s) "
+            f"with {stats['workers']} worker(s) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,58 @@
+# performance/management/commands/run_recurring_tasks.py
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from performance.services import RecurringTaskService
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate tasks for every active TaskRecurringDefinition due on a date "
+        "(monthly → YYYY-MM, weekly → YYYY-Www). Safe to re-run: one task per definition/period/employee."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=str, default=None, help="Run as of YYYY-MM-DD (default: today)")
+        parser.add_argument("--company", type=int, default=None, help="Limit to one company id")
+        parser.add_argument("--ids", type=str, default=None, help="Comma-separated definition ids")
+        parser.add_argument(
+            "--period", type=str, default=None,
+            help="Explicit period label (overrides schedule_kind; required for custom definitions)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            on_date = date.fromisoformat(options["date"]) if options.get("date") else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        definition_ids = None
+        if options.get("ids"):
+            definition_ids = [int(x) for x in options["ids"].split(",") if x.strip()]
+
+        started = time.perf_counter()
+        report = RecurringTaskService.run_due(
+            on_date,
+            company_id=options.get("company"),
+            definition_ids=definition_ids,
+            period_label=options.get("period"),
+        )
+        elapsed = time.perf_counter() - started
+
+        total = 0
+        skipped = 0
+        for row in report:
+            definition = row["definition"]
+            if row["period"] is None:
+                skipped += 1
+                self.stdout.write(f"- {definition} [{definition.schedule_kind}]: skipped (needs --period)")
+                continue
+            total += row["created"]
+            self.stdout.write(f"- {definition} [{row['period']}]: {row['created']} task(s) created")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(report) - skipped} definition(s), created {total} task(s) in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,47 @@
+# performance/management/commands/sweep_task_sla.py
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from performance.services import TaskSLASweeper
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly SLA sweep: recompute timeliness_pct of open overdue tasks per TaskSLAPolicy "
+        "with set-based UPDATEs, then rescore only the affected objectives."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=str, default=None, help="Sweep as of YYYY-MM-DD (default: today)")
+        parser.add_argument("--company", type=int, default=None, help="Limit to one company id")
+        parser.add_argument("--batch-size", type=int, default=50000, help="Task id range per UPDATE/transaction")
+        parser.add_argument("--no-rescore", action="store_true", help="Only update tasks; skip employee rescoring")
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options["date"]) if options.get("date") else None
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        started = time.perf_counter()
+        stats = TaskSLASweeper.sweep(
+            today,
+            company_id=options.get("company"),
+            batch_size=max(1, options.get("batch_size") or 50000),
+        )
+        swept = time.perf_counter() - started
+
+        objective_ids = stats["objective_ids"]
+        self.stdout.write(
+            f"- {stats['tasks']} task(s) updated across {stats['policies']} policy(ies) in {swept:.2f}s; "
+            f"{len(objective_ids)} objective(s) affected"
+        )
+
+        if objective_ids and not options.get("no_rescore"):
+            n = TaskSLASweeper.rescore_objectives(objective_ids)
+            self.stdout.write(f"- rescored {n} objective(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0004_alter_evaluation_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='evaluationparameter',
+            name='external_aggregation',
+            field=models.CharField(blank=True, choices=[('sum', 'Sum'), ('avg', 'Average'), ('count', 'Count'), ('max', 'Max'), ('latest', 'Latest')], default='', help_text='How to combine values', max_length=16),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0024_alter_department_managers'),
+        ('performance', '0005_external_aggregation_count_max'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='objectivedepartmentassignment',
+            index=models.Index(fields=['department', 'include_children', 'objective'], name='perf_obj_dept_rev_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0006_objective_dept_reverse_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='objective',
+            name='participants_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='objective',
+            name='participants_rebuilt_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+        ('hr', '0024_alter_department_managers'),
+        ('performance', '0007_objective_participants_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurring_definition',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_tasks', to='performance.taskrecurringdefinition'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurring_period',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring_definition__isnull', False)), fields=('recurring_definition', 'recurring_period', 'assignee'), name='uniq_task_recurring_period_assignee'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+        ('hr', '0024_alter_department_managers'),
+        ('performance', '0008_task_recurring_period'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['sla_policy', 'due_date'], name='perf_task_open_sla_due_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:17
+
+import base.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_alter_user_options_alter_company_managers_and_more'),
+        ('hr', '0024_alter_department_managers'),
+        ('performance', '0009_task_open_sla_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRatingMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_min', models.PositiveIntegerField(default=0)),
+                ('rating_max', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_set', to='base.company')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rating_months', to='hr.employee')),
+            ],
+            options={
+                'db_table': 'perf_daily_rating_monthly',
+                'ordering': ['employee', 'month'],
+                'indexes': [models.Index(fields=['company', 'month'], name='perf_daily__company_b5d4f8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'company', 'month'), name='uniq_daily_rating_monthly')],
+            },
+            managers=[
+                ('objects', base.models.CompanyScopeManager()),
+            ],
+        ),
+        # تعبئة أولية من التقييمات اليومية الموجودة
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO perf_daily_rating_monthly
+                    (company_id, employee_id, month, rating_sum, rating_count, rating_min, rating_max, updated_at)
+                SELECT company_id, employee_id, date_trunc('month', date)::date,
+                       SUM(overall_score_pct), COUNT(*), MIN(overall_score_pct), MAX(overall_score_pct), NOW()
+                FROM perf_daily_rating
+                GROUP BY company_id, employee_id, date_trunc('month', date)
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -322,6 +322,14 @@ class TaskDependency(
     def __str__(self):
         return f"{self.task.title} depends on {self.depends_on.title}"
 
+    def clean(self):
+        super().clean()
+
+        if self.active and self.task_id and self.depends_on_id:
+            from performance.services import TaskDependencyGraph  # LAZY IMPORT
+            if TaskDependencyGraph.creates_cycle(self.task_id, self.depends_on_id):
+                raise ValidationError({"depends_on": "This dependency would create a cycle."})
+
 
 # ------------------------------------------------------------
 # Task (الدعم الكامل بعد المرحلة الثانية)
@@ -497,18 +505,42 @@ class Task( TimeStampedMixin, UserStampedMixin, ActivableMixin, models.Model ):
     temporary_source_type = models.CharField(max_length=32, blank=True)
     temporary_source_ref = models.CharField(max_length=64, blank=True)
 
+    # -----------------------------------------
+    # مصدر المهمة الدورية (RecurringTaskService)
+    # مهمة واحدة لكل (تعريف، فترة، موظف) → إعادة التشغيل آمنة
+    # -----------------------------------------
+    recurring_definition = models.ForeignKey(
+        "performance.TaskRecurringDefinition",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="generated_tasks",
+    )
+    recurring_period = models.CharField(max_length=32, blank=True)
+
     class Meta:
         db_table = "perf_task"
         indexes = [
             models.Index(fields=["company", "objective"]),
             models.Index(fields=["due_date"]),
             models.Index(fields=["status"]),
+            # sweep_task_sla: المهام المفتوحة حسب السياسة وتاريخ الاستحقاق
+            models.Index(
+                fields=["sla_policy", "due_date"],
+                condition=models.Q(completed_at__isnull=True),
+                name="perf_task_open_sla_due_idx",
+            ),
         ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(percent_complete__gte=0, percent_complete__lte=100),
                 name="chk_task_percent_0_100",
-            )
+            ),
+            models.UniqueConstraint(
+                fields=["recurring_definition", "recurring_period", "assignee"],
+                condition=models.Q(recurring_definition__isnull=False),
+                name="uniq_task_recurring_period_assignee",
+            ),
         ]
 
     def __str__(self):
@@ -583,6 +615,12 @@ class Task( TimeStampedMixin, UserStampedMixin, ActivableMixin, models.Model ):
             self.objective.recompute_progress_and_score()
             self.objective.save(update_fields=["progress_pct", "score_pct"])
 
+        # --------------------------------------------------------
+        # 7) رفع تقدم المهمة إلى سلسلة parent_task (مرة واحدة عند commit)
+        # --------------------------------------------------------
+        if self.parent_task_id:
+            services.TaskSubtaskEngine.schedule_rollup(self.parent_task_id)
+
 
 # ------------------------------------------------------------
 # KPI
@@ -1061,6 +1099,13 @@ class Objective(  CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
         help_text="Aggregated KPI score (0..100)",
     )
 
+    # -------------------
+    # بصمة آخر إعادة بناء للمشاركين (md5 لمدخلات الاستهداف: التعيينات + مسارات الأقسام)
+    # rebuild_objective_participants --only-dirty يتخطّى الأهداف التي لم تتغير بصمتها
+    # -------------------
+    participants_fingerprint = models.CharField(max_length=32, blank=True, default="", editable=False)
+    participants_rebuilt_at = models.DateTimeField(null=True, blank=True, editable=False)
+
 
 
     class Meta:
@@ -1155,39 +1200,19 @@ class Objective(  CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
         Aggregation logic:
         1) If rollup and children exist → aggregate from children.
         2) Otherwise → aggregate from own KPIs and Tasks.
+        كل مصدر باستعلام aggregate واحد (ObjectiveRollupService).
         """
-        # Children rollup
-        children = list(self.children.filter(active=True).all())
-
-        if children and self.rollup_strategy != "none":
-
-            if self.rollup_strategy == "average":
-                self.progress_pct = int(round(sum(c.progress_pct for c in children) / len(children)))
-                self.score_pct = int(round(sum(c.score_pct for c in children) / len(children)))
-
-            elif self.rollup_strategy == "weighted":
-                total_w = sum(c.weight_pct for c in children) or 1
-                self.progress_pct = int(round(sum(c.progress_pct * c.weight_pct for c in children) / total_w))
-                self.score_pct = int(round(sum(c.score_pct * c.weight_pct for c in children) / total_w))
-
-            return
+        from performance.services import ObjectiveRollupService  # LAZY IMPORT
+        self.progress_pct, self.score_pct = ObjectiveRollupService.compute(self)
 
-        # Original aggregation from own KPIs/Tasks
-        tasks = Task.objects.filter(objective=self).exclude(status="cancelled")
-
-        if tasks.exists():
-            self.progress_pct = int(round(sum(t.percent_complete for t in tasks) / tasks.count()))
-        else:
-            self.progress_pct = 0
-
-        kpis = KPI.objects.filter(objective=self)
-
-        if kpis.exists():
-            total_w = sum(k.weight_pct or 0 for k in kpis) or (kpis.count() * 100)
-            num = sum((k.score_pct or 0) * (k.weight_pct or 100) for k in kpis)
-            self.score_pct = max(0, min(100, int(round(num / total_w))))
-        else:
-            self.score_pct = 0
+    def propagate_rollup(self, *extra_parent_ids):
+        """
+        رفع التغيير إلى سلسلة الأسلاف فقط (parent → parent → …)
+        بدل إعادة حساب الشجرة كاملة.
+        """
+        from performance.services import ObjectiveRollupService  # LAZY IMPORT
+        for parent_id in {self.parent_id, *extra_parent_ids} - {None}:
+            ObjectiveRollupService.propagate(parent_id)
 
     # ------------------------------------------------------------
     # Participants Collection
@@ -1250,22 +1275,13 @@ class Objective(  CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
 
         return emp_ids
 
-    @transaction.atomic
     def _rebuild_participants(self):
-        target_ids  = set(self._collect_employee_ids())
-        current_ids = set(self.participants.values_list("employee_id", flat=True))
-
-        to_add = target_ids - current_ids
-        to_del = current_ids - target_ids
-
-        if to_del:
-            ObjectiveParticipant.objects.filter(objective=self, employee_id__in=list(to_del)).delete()
-
-        if to_add:
-            ObjectiveParticipant.objects.bulk_create(
-                [ObjectiveParticipant(objective=self, employee_id=eid) for eid in to_add],
-                ignore_conflicts=True,
-            )
+        """
+        إعادة بناء المشاركين بزوج DELETE + INSERT … SELECT (نفس قواعد _collect_employee_ids)
+        بدل الفرق في بايثون واستعلام subtree لكل تعيين قسم.
+        """
+        from performance.services import ObjectiveParticipantService  # LAZY IMPORT
+        return ObjectiveParticipantService.rebuild([self.pk])
 
     # ------------------------------------------------------------
     # Compute Employee Scores (Final – Using ObjectiveScoreEngine)
@@ -1422,11 +1438,20 @@ class Objective(  CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
     # Save Hook
     # ------------------------------------------------------------
     def save(self, *args, **kwargs):
+        # الأب السابق (إن تغيّر parent) يحتاج إعادة تجميع أيضًا
+        old_parent_id = None
+        update_fields = kwargs.get("update_fields")
+        if self.pk and (update_fields is None or "parent" in update_fields or "parent_id" in update_fields):
+            old_parent_id = (
+                Objective.all_objects.filter(pk=self.pk).values_list("parent_id", flat=True).first()
+            )
+
         super().save(*args, **kwargs)
         self.recompute_progress_and_score()
         super().save(update_fields=["progress_pct", "score_pct"])
         self._rebuild_participants()
         self.compute_employee_scores()
+        self.propagate_rollup(old_parent_id)
 
 
 # Objective Assignments & Participants
@@ -1457,7 +1482,11 @@ class ObjectiveDepartmentAssignment(TimeStampedMixin, UserStampedMixin):
                 name="perf_obj_dept_uniq",
             ),
         ]
-        indexes = [models.Index(fields=["objective", "department"])]
+        indexes = [
+            models.Index(fields=["objective", "department"]),
+            # الفهرس العكسي: قسم → أهداف (نقل موظف / تغيير active)
+            models.Index(fields=["department", "include_children", "objective"], name="perf_obj_dept_rev_idx"),
+        ]
         permissions = [("manage_department_assignments", "Can manage department assignments")]
 
     def __str__(self):
@@ -2006,7 +2035,7 @@ class EvaluationParameter( TimeStampedMixin, UserStampedMixin):
     # مصدر خارجي عام (model.field + agg + فلتر JSON مع placeholders)
     external_model       = models.CharField(max_length=128, blank=True, help_text="e.g. 'attendance.AttendanceLog'")
     external_field       = models.CharField(max_length=64, blank=True, help_text="Field to aggregate (e.g., 'worked_minutes')")
-    external_aggregation = models.CharField(max_length=16, blank=True, choices=[("sum","Sum"),("avg","Average"),("latest","Latest")], default="", help_text="How to combine values")
+    external_aggregation = models.CharField(max_length=16, blank=True, choices=[("sum","Sum"),("avg","Average"),("count","Count"),("max","Max"),("latest","Latest")], default="", help_text="How to combine values")
     external_filter      = models.JSONField(default=dict, blank=True, help_text="Optional filter JSON (key->value)")
 
     # قيم يدوية/حدود قصّ للنتيجة
@@ -2417,6 +2446,10 @@ class Evaluation( CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
           - نتائج EvaluationParameterResult لكل Parameter في الـ Template
           - الدرجة النهائية final_score_pct
           - تأثير الاستثناءات PerformanceException
+
+        البيانات تُحمَّل مرة واحدة في EvaluationContext، وكل SourceKind يقرأ منه
+        (عدد استعلامات ثابت مهما كان عدد المعاملات، عدا EXTERNAL_METRIC).
+        نفس المحرك يستخدمه EvaluationCycleEngine للحساب الجماعي.
         """
 
         # ملاحظة مهمة:
@@ -2424,407 +2457,28 @@ class Evaluation( CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
         # لا تقوم بتعديل حقول المعايرة (calibrated_score_pct, ...).
         # أي معايرة تتم من خلال EvaluationCalibration أو عبر واجهة الإدارة.
 
-        from performance.models import (
-            EvaluationParameter,
-            EvaluationParameterResult,
-            DailyRating,
-            Task,
-            PerformanceException,
-            EvaluationExceptionAdjustment,
-            EmployeeObjectiveScore,
-        )
         from performance import services as svc
 
-        EP = EvaluationParameter
-        SPR = EvaluationParameterResult
-
-        # نحذف النتائج القديمة
-        self.parameter_results.all().delete()
-
-        params = EP.objects.filter(template=self.template).order_by("id")
-
-        total_weight = 0
-        weighted_sum = 0
-
-        # ------------------------------------------------------------
-        # 1. حساب نتائج كل EvaluationParameterResult
-        # ------------------------------------------------------------
-        for p in params:
-            raw_number = None
-            raw_json = None
-            score = p.manual_default_score_pct or 0
-
-            min_s = p.min_score_pct if p.min_score_pct is not None else 0
-            max_s = p.max_score_pct if p.max_score_pct is not None else 100
-
-            # --------------------------
-            # MANUAL
-            # --------------------------
-            if p.source_kind == EP.SourceKind.MANUAL:
-                score = p.manual_default_score_pct or 0
-
-            # --------------------------
-            # OBJECTIVE_SCORE
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.OBJECTIVE_SCORE:
-                obj = p.objective
-                if obj and svc.objective_applies(self, obj):
-                    raw_number = obj.score_pct
-                    score = raw_number
-
-            # --------------------------
-            # OBJECTIVE_PROGRESS
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.OBJECTIVE_PROGRESS:
-                obj = p.objective
-                if obj and svc.objective_applies(self, obj):
-                    raw_number = obj.progress_pct
-                    score = raw_number
-
-            # --------------------------
-            # KPI_SCORE
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.KPI_SCORE:
-                kpi = p.kpi
-                if (
-                    kpi
-                    and kpi.company_id == self.company_id
-                    and kpi.objective
-                    and svc.objective_applies(self, kpi.objective)
-                ):
-                    raw_number = kpi.score_pct
-                    score = raw_number
-
-            # --------------------------
-            # TASKS_PROGRESS
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.TASKS_PROGRESS:
-                obj = p.objective
-                if obj and svc.objective_applies(self, obj):
-                    raw_number = svc.avg_task_progress_for(self, obj)
-                    score = raw_number
-
-            # --------------------------
-            # DAILY_RATING
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.DAILY_RATING:
-                qs = DailyRating.objects.filter(
-                    employee=self.employee,
-                    company=self.company,
-                    date__range=(self.date_start, self.date_end),
-                )
-                if qs.exists():
-                    raw_number = sum(r.overall_score_pct for r in qs) / qs.count()
-                    score = int(round(raw_number))
-
-            # --------------------------
-            # TEMP_TASKS_LOAD
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.TEMP_TASKS_LOAD:
-                qs = Task.objects.filter(
-                    company=self.company,
-                    assignee=self.employee,
-                    due_date__range=(self.date_start, self.date_end),
-                ).exclude(status__in=["cancelled"])
-
-                temp_qs = qs.filter(task_kind="temporary")
-                non_temp_qs = qs.exclude(task_kind="temporary")
-
-                def _total_effort(q):
-                    return sum(t.actual_minutes or t.estimated_minutes for t in q)
-
-                temp_effort = _total_effort(temp_qs)
-                planned_effort = _total_effort(non_temp_qs)
-
-                if temp_effort + planned_effort == 0:
-                    raw_number = None
-                    score = p.manual_default_score_pct or 0
-                else:
-                    raw_number = (temp_effort / (temp_effort + planned_effort)) * 100.0
-                    score = int(round(raw_number))
-
-            # --------------------------
-            # TEMP_TASKS_SCORE
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.TEMP_TASKS_SCORE:
-                qs = Task.objects.filter(
-                    company=self.company,
-                    assignee=self.employee,
-                    due_date__range=(self.date_start, self.date_end),
-                    task_kind="temporary",
-                ).exclude(status__in=["cancelled"])
-
-                if not qs.exists():
-                    raw_number = None
-                    score = p.manual_default_score_pct or 0
-                else:
-                    PRIORITY_WEIGHTS = {
-                        "critical": 3.0,
-                        "high": 2.0,
-                        "normal": 1.0,
-                        "low": 0.5,
-                    }
-
-                    weighted_sum_temp = 0.0
-                    total_weight_temp = 0.0
-
-                    for t in qs:
-                        w = PRIORITY_WEIGHTS.get(getattr(t, "priority", "normal"), 1.0)
-                        eff = (t.actual_minutes or t.estimated_minutes or 30)
-                        item_weight = w * eff
-                        total_weight_temp += item_weight
-
-                        q_score = t.quality_score_pct or t.percent_complete
-                        weighted_sum_temp += q_score * item_weight
-
-                    if total_weight_temp == 0:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-                    else:
-                        raw_number = weighted_sum_temp / total_weight_temp
-                        score = int(round(raw_number))
-
-
-            # ----------------------------------------
-            # QUALITY_SCORE
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.QUALITY_SCORE:
-                from performance.models import QualityIncident
-
-                incidents = QualityIncident.objects.filter(
-                    company=self.company,
-                    employee=self.employee,
-                    date__range=(self.date_start, self.date_end),
-                )
-
-                if not incidents.exists():
-                    raw_number = 100
-                    score = 100
-                else:
-                    SEVERITY_WEIGHTS = {
-                        "critical": 3.0,
-                        "high": 2.0,
-                        "medium": 1.5,
-                        "low": 1.0,
-                    }
-
-                    penalty = 0.0
-
-                    for inc in incidents:
-                        sev_w = SEVERITY_WEIGHTS.get(inc.severity, 1.0)
-                        penalty += sev_w * (100 - inc.impact_score_pct)
-
-                    # لا يمكن أن يزيد العقاب عن 100
-                    penalty = min(penalty, 100)
-
-                    raw_number = max(0, 100 - penalty)
-                    score = int(round(raw_number))
-
-
-            # ----------------------------------------
-            # EMPLOYEE_OBJECTIVE_SCORE (جديد)
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.EMPLOYEE_OBJECTIVE_SCORE:
-                obj = p.objective
-                if obj:
-                    eos = EmployeeObjectiveScore.objects.filter(
-                        employee=self.employee,
-                        objective=obj,
-                    ).first()
-                    if eos:
-                        raw_number = eos.final_score_pct
-                        score = eos.final_score_pct
-                    else:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-
-            # ----------------------------------------
-            # EMPLOYEE_OBJECTIVE_TIMELINESS
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.EMPLOYEE_OBJECTIVE_TIMELINESS:
-                obj = p.objective
-                if obj:
-                    eos = EmployeeObjectiveScore.objects.filter(
-                        employee=self.employee,
-                        objective=obj,
-                    ).first()
-                    if eos:
-                        raw_number = eos.timeliness_pct
-                        score = eos.timeliness_pct
-                    else:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-
-            # ----------------------------------------
-            # EMPLOYEE_OBJECTIVE_EFFICIENCY
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.EMPLOYEE_OBJECTIVE_EFFICIENCY:
-                obj = p.objective
-                if obj:
-                    eos = EmployeeObjectiveScore.objects.filter(
-                        employee=self.employee,
-                        objective=obj,
-                    ).first()
-                    if eos:
-                        raw_number = eos.efficiency_pct
-                        score = eos.efficiency_pct
-                    else:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-
-            # ----------------------------------------
-            # EMPLOYEE_OBJECTIVE_QUALITY
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.EMPLOYEE_OBJECTIVE_QUALITY:
-                obj = p.objective
-                if obj:
-                    eos = EmployeeObjectiveScore.objects.filter(
-                        employee=self.employee,
-                        objective=obj,
-                    ).first()
-                    if eos:
-                        raw_number = eos.quality_pct
-                        score = eos.quality_pct
-                    else:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-
-
-            # ----------------------------------------
-            # FEEDBACK_SCORE (360° Feedback)
-            # ----------------------------------------
-            elif p.source_kind == EP.SourceKind.FEEDBACK_SCORE:
-                # نقرأ كل الـ feedbacks المرتبطة بهذا الـ evaluation
-                fqs = self.feedbacks.select_related("evaluation").all()
-
-                if not fqs.exists():
-                    raw_number = None
-                    score = p.manual_default_score_pct or 0
-                else:
-                    # أوزان الأدوار المختلفة (يمكن تعديلها لاحقاً حسب سياسة الشركة)
-                    ROLE_WEIGHTS = {
-                        "self": 1.0,
-                        "peer": 1.5,
-                        "manager": 3.0,
-                        "skip_manager": 2.5,
-                        "hr": 2.0,
-                        "other": 1.0,
-                    }
-
-                    weighted_sum_fb = 0.0
-                    total_weight_fb = 0.0
-
-                    for fb in fqs:
-                        w = ROLE_WEIGHTS.get(fb.role, 1.0)
-                        total_weight_fb += w
-                        weighted_sum_fb += fb.overall_score_pct * w
-
-                    if total_weight_fb == 0:
-                        raw_number = None
-                        score = p.manual_default_score_pct or 0
-                    else:
-                        raw_number = weighted_sum_fb / total_weight_fb
-                        score = int(round(raw_number))
-
-
-            # --------------------------
-            # EXTERNAL_METRIC
-            # --------------------------
-            elif p.source_kind == EP.SourceKind.EXTERNAL_METRIC:
-                adapter = svc.get_adapter("generic_model")
-                if adapter and p.external_model and p.external_field:
-                    ctx = {
-                        "employee_id": self.employee_id,
-                        "company_id": self.company_id,
-                        "date_start": self.date_start,
-                        "date_end": self.date_end,
-                    }
-                    raw_number, extra = adapter(
-                        app_model=p.external_model,
-                        field=p.external_field,
-                        aggregation=p.external_aggregation or "avg",
-                        filter_json=p.external_filter or {},
-                        context=ctx,
-                    )
-                    raw_json = extra
-                    if raw_number is not None:
-                        score = svc.clamp_to_pct(raw_number, min_s, max_s)
-
-            # --------------------------
-            # ضبط score ضمن min/max
-            # --------------------------
-            if p.source_kind != EP.SourceKind.EXTERNAL_METRIC:
-                score = svc.clamp_to_pct(score, min_s, max_s)
-
-            # --------------------------
-            # إنشاء EvaluationParameterResult
-            # --------------------------
-            SPR.objects.create(
-                evaluation=self,
-                parameter=p,
-                raw_value_number=raw_number,
-                raw_value_json=raw_json,
-                score_pct=score,
+        params = []
+        if self.template_id:
+            params = list(
+                EvaluationParameter.objects.filter(template_id=self.template_id)
+                .select_related("objective", "kpi", "kpi__objective")
+                .order_by("id")
             )
 
-            # تجميع final score
-            w = p.weight_pct or 0
-            total_weight += w
-            weighted_sum += score * w
-
-        # ------------------------------------------------------------
-        # 2. حساب الدرجة الأساسية قبل الاستثناءات
-        # ------------------------------------------------------------
-        if total_weight > 0:
-            base_score = int(round(weighted_sum / total_weight))
-        else:
-            base_score = 0
+        ctx = svc.EvaluationContext.build(self, params)
+        results, adjustments, final = svc.EvaluationScoringEngine.score(self, params, ctx)
 
-        self.final_score_pct = base_score
+        # نستبدل النتائج القديمة
+        self.parameter_results.all().delete()
+        EvaluationParameterResult.objects.bulk_create(results)
 
-        # ------------------------------------------------------------
-        # 3. حساب تأثير الاستثناءات (PerformanceException)
-        # ------------------------------------------------------------
         self.exception_adjustments.all().delete()
+        if adjustments:
+            EvaluationExceptionAdjustment.objects.bulk_create(adjustments)
 
-        exceptions = PerformanceException.objects.filter(
-            employee=self.employee,
-            company=self.company,
-            date_start__lte=self.date_end,
-            date_end__gte=self.date_start,
-        )
-
-        exception_total = 0.0
-
-        for exc in exceptions:
-            # multiplier: impact_pct أو type.multiplier
-            multiplier = exc.impact_pct if exc.impact_pct is not None else exc.type.multiplier
-
-            # enforce is_positive
-            if exc.type.is_positive and multiplier < 0:
-                multiplier = abs(multiplier)
-            if not exc.type.is_positive and multiplier > 0:
-                multiplier = -abs(multiplier)
-
-            # enforce max_impact_pct
-            max_pct = (exc.type.max_impact_pct or 100) / 100.0
-            if abs(multiplier) > max_pct:
-                multiplier = max_pct if multiplier > 0 else -max_pct
-
-            impact = base_score * multiplier
-
-            EvaluationExceptionAdjustment.objects.create(
-                evaluation=self,
-                exception=exc,
-                adjustment_pct=impact,
-            )
-
-            exception_total += impact
-
-        # تطبيق تأثير الاستثناءات
-        self.final_score_pct = int(round(base_score + exception_total))
-        self.final_score_pct = max(0, min(100, self.final_score_pct))
-
+        self.final_score_pct = final
         return self
 
     def save(self, *args, **kwargs):
@@ -2864,11 +2518,14 @@ class Evaluation( CompanyOwnedMixin, TimeStampedMixin, UserStampedMixin, Activab
 
         if kind == step.ApproverKind.MANAGER_CHAIN:
             emp = self.employee
-            for _ in range(step.manager_level):
-                if not emp or not emp.manager:
-                    return None
-                emp = emp.manager
-            return emp
+            if not emp or step.manager_level < 1:
+                return emp
+            # المستوى N = العنصر N من نهاية manager_path (بدون المشي مديرًا مديرًا)
+            chain = emp.manager_chain_ids()
+            if step.manager_level > len(chain):
+                return None
+            from hr.models import Employee
+            return Employee._base_manager.filter(pk=chain[-step.manager_level]).first()
 
         return None
 
@@ -3164,6 +2821,44 @@ class DailyRatingItem(TimeStampedMixin, UserStampedMixin, models.Model):
         self.daily_rating.save(update_fields=["overall_score_pct"])
 
 
+class DailyRatingMonthly(CompanyOwnedMixin, models.Model):
+    """
+    تجميع شهري مُخزَّن لـ DailyRating لكل (موظف، شركة، شهر):
+    مجموع/عدد/أدنى/أعلى overall_score_pct.
+    يُحدَّث تلقائيًا عند تغيّر التقييمات اليومية (DailyRatingRollupService)،
+    ويُستخدم في معاملات DAILY_RATING للتقييم (الأشهر الكاملة) وفي رسوم الاتجاه.
+    """
+    employee = models.ForeignKey("hr.Employee", on_delete=models.CASCADE, related_name="daily_rating_months")
+    month = models.DateField(help_text="First day of the month.")
+
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_min = models.PositiveIntegerField(default=0)
+    rating_max = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "perf_daily_rating_monthly"
+        ordering = ["employee", "month"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "company", "month"],
+                name="uniq_daily_rating_monthly",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["company", "month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} @ {self.month:%Y-%m}: {self.average_pct}% ({self.rating_count})"
+
+    @property
+    def average_pct(self) -> int:
+        return int(round(self.rating_sum / self.rating_count)) if self.rating_count else 0
+
+
 # ---------------------------------------------------------------------------------
 # PerformanceExceptionType , PerformanceException  , EvaluationExceptionAdjustment
 # --------------------------------------------------------------------------------
@@ -3,16 +3,41 @@
 # Unified Services + Adapters + Engines (COMPLETE)
 # ======================================================================
 
+import calendar
+import hashlib
+import json
+from datetime import timedelta
 from typing import Optional, Tuple, Dict, Any, Callable
 from django.apps import apps
-from django.db import transaction, models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction, models
+from django.db.models.functions import RowNumber
+from django.db.models.constants import OnConflict
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from base.security_context import get_current_user_id
+
 from performance.models import (
     Task,
+    KPI,
+    Objective,
+    ObjectiveDepartmentAssignment,
     ObjectiveParticipant,
     TaskRecurringDefinition,
+    Evaluation,
+    EvaluationParameter,
+    EvaluationParameterResult,
+    EvaluationFeedback,
+    EmployeeObjectiveScore,
+    DailyRating,
+    DailyRatingFactor,
+    DailyRatingItem,
+    DailyRatingMonthly,
+    QualityIncident,
+    PerformanceException,
+    EvaluationExceptionAdjustment,
 )
 
 # ======================================================================
@@ -22,12 +47,23 @@ from performance.models import (
 AdapterFunc = Callable[..., Tuple[Optional[float], Dict[str, Any]]]
 _REGISTRY: dict[str, AdapterFunc] = {}
 
+# Batch adapters (اختياري): نفس الوسائط + employee_ids
+# → {employee_id: (value, meta)} باستعلام واحد لكل الموظفين
+BatchAdapterFunc = Callable[..., Dict[int, Tuple[Optional[float], Dict[str, Any]]]]
+_BATCH_REGISTRY: dict[str, BatchAdapterFunc] = {}
+
 def register_adapter(code: str, fn: AdapterFunc):
     _REGISTRY[code] = fn
 
 def get_adapter(code: str) -> Optional[AdapterFunc]:
     return _REGISTRY.get(code)
 
+def register_batch_adapter(code: str, fn: BatchAdapterFunc):
+    _BATCH_REGISTRY[code] = fn
+
+def get_batch_adapter(code: str) -> Optional[BatchAdapterFunc]:
+    return _BATCH_REGISTRY.get(code)
+
 # ======================================================================
 # Generic External Model Adapter
 # ======================================================================
@@ -39,26 +75,76 @@ def _apply_placeholders(v: Any, ctx: Dict[str, Any]) -> Any:
     return v
 
 
-def generic_model_adapter(
-    *,
-    app_model: str,
-    field: str,
-    aggregation: str,
-    filter_json: Dict[str, Any],
-    context: Dict[str, Any],
-) -> Tuple[Optional[float], Dict[str, Any]]:
-    """
-    Generic adapter used for external metrics.
-    """
+# ----------------------------------------------------------------------
+# Result cache (TTL + per-model version)
+# ----------------------------------------------------------------------
+# المفتاح يتضمن "نسخة" الموديل الخارجي: أي حفظ/حذف في ذلك الموديل يرفع النسخة بعد commit
+# فتصبح كل النتائج القديمة غير مرئية (تنتهي لاحقًا بالـTTL).
+# - الإبطال فوري عبر كل العمليات فقط مع كاش مشترك (CACHE_URL: redis/memcached)؛
+#   مع LocMemCache (الافتراضي) كل process (gunicorn / ProcessPool) يرى نسخته فقط → التقادم حتى الـTTL
+# - bulk_create/update/QuerySet.update لا تطلق إشارات → الـTTL هو الحد الأقصى للتقادم
+# - سجل ثابت: PERFORMANCE_EXTERNAL_METRIC_MODELS — إشاراتها تُربط مرة واحدة في PerformanceConfig.ready()؛
+#   موديل خارجي غير مسجّل يُحسب دائمًا بدون كاش (لا شيء يبطل نتائجه)
+
+EXTERNAL_METRIC_CACHE_TTL = getattr(settings, "PERFORMANCE_EXTERNAL_METRIC_CACHE_TTL", 300)
+EXTERNAL_METRIC_CACHED_MODELS = frozenset(
+    label.lower() for label in getattr(settings, "PERFORMANCE_EXTERNAL_METRIC_MODELS", ())
+)
+
+
+def _external_metric_cacheable(Model) -> bool:
+    return bool(EXTERNAL_METRIC_CACHE_TTL) and Model._meta.label_lower in EXTERNAL_METRIC_CACHED_MODELS
+
+
+def _model_version_key(label: str) -> str:
+    return f"perf:extm:v:{label.lower()}"
+
+
+def _external_metric_cache_key(label, field, aggregation, flt, context, version=None) -> str:
+    raw = json.dumps(
+        [
+            label.lower(),
+            field,
+            aggregation,
+            sorted((k, str(v)) for k, v in flt.items()),
+            context.get("company_id"),
+            str(context.get("date_start") or ""),
+            str(context.get("date_end") or ""),
+        ],
+        separators=(",", ":"),
+    )
+    if version is None:
+        version = cache.get_or_set(_model_version_key(label), 1, timeout=None)
+    return f"perf:extm:{version}:{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+
+def invalidate_external_metric_cache(model) -> None:
+    """رفع نسخة الموديل → تجاهل كل النتائج المخزنة له (يُستدعى بعد commit)."""
+    key = _model_version_key(model._meta.label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+_EXTERNAL_AGGREGATIONS = {"sum": models.Sum, "avg": models.Avg, "count": models.Count, "max": models.Max}
+
+# lookups لا يمكن التجميع عليها كحقل (الفلتر عندها ليس مساواة)
+_NON_GROUPABLE_LOOKUPS = {
+    "iexact", "contains", "icontains", "in", "gt", "gte", "lt", "lte",
+    "startswith", "istartswith", "endswith", "iendswith", "range", "isnull", "regex", "iregex",
+}
+
+
+def _resolve_external_model(app_model: str):
     try:
         app_label, model_name = app_model.split(".", 1)
-        Model = apps.get_model(app_label, model_name)
+        return apps.get_model(app_label, model_name)
     except Exception:
-        return None, {"error": "invalid_model"}
+        return None
 
-    if not Model:
-        return None, {"error": "model_not_found"}
 
+def _resolve_external_filter(Model, filter_json: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
     flt = {k: _apply_placeholders(v, context) for k, v in (filter_json or {}).items()}
 
     # Auto-inject company_id if supported by model
@@ -69,30 +155,181 @@ def generic_model_adapter(
 
     if has_company and context.get("company_id") and "company_id" not in flt:
         flt["company_id"] = context["company_id"]
+    return flt
+
+
+def generic_model_adapter(
+    *,
+    app_model: str,
+    field: str,
+    aggregation: str,
+    filter_json: Dict[str, Any],
+    context: Dict[str, Any],
+) -> Tuple[Optional[float], Dict[str, Any]]:
+    """
+    Generic adapter used for external metrics.
+    - التجميع يتم في SQL (Sum/Avg/Count/Max، وlatest عبر ORDER BY -pk LIMIT 1)
+    - النتيجة تُخزّن في الكاش (TTL) وتُبطَل عند تغيّر الموديل الخارجي
+    """
+    Model = _resolve_external_model(app_model)
+    if not Model:
+        return None, {"error": "invalid_model"}
+
+    if aggregation not in _EXTERNAL_AGGREGATIONS and aggregation != "latest":
+        return None, {"error": "invalid_aggregation"}
+
+    flt = _resolve_external_filter(Model, filter_json, context)
+
+    cache_key = None
+    if _external_metric_cacheable(Model):
+        cache_key = _external_metric_cache_key(Model._meta.label, field, aggregation, flt, context)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
 
     qs = Model.objects.all()
     if flt:
         qs = qs.filter(**flt)
-
-    values = qs.values_list(field, flat=True)
-    vals = [float(x) for x in values if x is not None]
-    if not vals:
-        return None, {"count": 0}
-
-    if aggregation == "sum":
-        raw = sum(vals)
-    elif aggregation == "avg":
-        raw = sum(vals) / len(vals)
-    elif aggregation == "latest":
-        raw = float(values.order_by("-pk").first() or 0)
+    qs = qs.exclude(**{f"{field}__isnull": True})
+
+    if aggregation == "latest":
+        # صف واحد: آخر قيمة + عدد القيم (window) في نفس الاستعلام
+        row = (
+            qs.annotate(_n=models.Window(expression=models.Count("pk")))
+            .order_by("-pk")
+            .values_list(field, "_n")
+            .first()
+        )
+        n = row[1] if row else 0
+        raw = float(row[0]) if row else None
     else:
-        return None, {"error": "invalid_aggregation"}
+        row = qs.aggregate(_raw=_EXTERNAL_AGGREGATIONS[aggregation](field), _n=models.Count(field))
+        n = row["_n"] or 0
+        raw = float(row["_raw"]) if n and row["_raw"] is not None else None
+
+    result = (raw, {"count": n, "agg": aggregation}) if n else (None, {"count": 0})
+
+    if cache_key:
+        cache.set(cache_key, result, timeout=EXTERNAL_METRIC_CACHE_TTL)
+    return result
+
+
+def generic_model_batch_adapter(
+    *,
+    app_model: str,
+    field: str,
+    aggregation: str,
+    filter_json: Dict[str, Any],
+    context: Dict[str, Any],
+    employee_ids,
+) -> Dict[int, Tuple[Optional[float], Dict[str, Any]]]:
+    """
+    نسخة الدفعة من generic_model_adapter: {employee_id: (value, meta)}.
+    - إذا كان الفلتر يربط حقلاً بالقيمة "{employee_id}" حرفيًا → استعلام واحد مجمّع
+      values(<ذلك الحقل>).annotate(...) لكل الموظفين
+    - إذا لم يذكر الفلتر الموظف إطلاقًا → النتيجة واحدة للجميع (استعلام واحد)
+    - غير ذلك (placeholder داخل نص أطول...) → رجوع للمحوّل الفردي لكل موظف
+    يشارك نفس مفاتيح الكاش مع المحوّل الفردي.
+    """
+    employee_ids = list(dict.fromkeys(employee_ids))
+    if not employee_ids:
+        return {}
 
-    return raw, {"count": len(vals), "agg": aggregation}
+    Model = _resolve_external_model(app_model)
+    if not Model:
+        return {eid: (None, {"error": "invalid_model"}) for eid in employee_ids}
+
+    if aggregation not in _EXTERNAL_AGGREGATIONS and aggregation != "latest":
+        return {eid: (None, {"error": "invalid_aggregation"}) for eid in employee_ids}
+
+    filter_json = filter_json or {}
+    emp_keys = [k for k, v in filter_json.items() if isinstance(v, str) and "{employee_id}" in v]
+
+    def _single(eid):
+        return generic_model_adapter(
+            app_model=app_model, field=field, aggregation=aggregation,
+            filter_json=filter_json, context={**context, "employee_id": eid},
+        )
+
+    if not emp_keys:
+        shared = _single(employee_ids[0])
+        return {eid: shared for eid in employee_ids}
+
+    group_key = emp_keys[0]
+    if len(emp_keys) > 1 or filter_json[group_key] != "{employee_id}":
+        return {eid: _single(eid) for eid in employee_ids}
+
+    group_field = group_key[: -len("__exact")] if group_key.endswith("__exact") else group_key
+    if group_field.rsplit("__", 1)[-1] in _NON_GROUPABLE_LOOKUPS:
+        return {eid: _single(eid) for eid in employee_ids}
+
+    # ---------------- cache lookup (نفس مفاتيح المحوّل الفردي) ----------------
+    results: Dict[int, Tuple[Optional[float], Dict[str, Any]]] = {}
+    keys_by_emp: dict[int, str] = {}
+    if _external_metric_cacheable(Model):
+        version = cache.get_or_set(_model_version_key(Model._meta.label), 1, timeout=None)
+        for eid in employee_ids:
+            emp_ctx = {**context, "employee_id": eid}
+            flt = _resolve_external_filter(Model, filter_json, emp_ctx)
+            keys_by_emp[eid] = _external_metric_cache_key(
+                Model._meta.label, field, aggregation, flt, emp_ctx, version=version,
+            )
+        cached = cache.get_many(list(keys_by_emp.values()))
+        for eid, key in keys_by_emp.items():
+            if key in cached:
+                results[eid] = cached[key]
+
+    missing = [eid for eid in employee_ids if eid not in results]
+    if not missing:
+        return results
+
+    # ---------------- one grouped query ----------------
+    base_filter = {k: v for k, v in filter_json.items() if k != group_key}
+    flt = _resolve_external_filter(Model, base_filter, context)
+    flt[f"{group_field}__in"] = missing
+
+    qs = Model.objects.filter(**flt).exclude(**{f"{field}__isnull": True})
+
+    computed: Dict[int, Tuple[Optional[float], Dict[str, Any]]] = {}
+    if aggregation == "latest":
+        rows = (
+            qs.annotate(
+                _rn=models.Window(
+                    expression=RowNumber(),
+                    partition_by=[models.F(group_field)],
+                    order_by=models.F("pk").desc(),
+                ),
+                _n=models.Window(expression=models.Count("pk"), partition_by=[models.F(group_field)]),
+            )
+            .filter(_rn=1)
+            .values_list(group_field, field, "_n")
+        )
+        for eid, value, n in rows:
+            computed[eid] = (float(value), {"count": n, "agg": aggregation})
+    else:
+        rows = (
+            qs.values(group_field)
+            .annotate(_raw=_EXTERNAL_AGGREGATIONS[aggregation](field), _n=models.Count(field))
+            .values_list(group_field, "_raw", "_n")
+        )
+        for eid, raw, n in rows:
+            if n and raw is not None:
+                computed[eid] = (float(raw), {"count": n, "agg": aggregation})
+
+    to_cache = {}
+    for eid in missing:
+        results[eid] = computed.get(eid, (None, {"count": 0}))
+        if eid in keys_by_emp:
+            to_cache[keys_by_emp[eid]] = results[eid]
+    if to_cache:
+        cache.set_many(to_cache, timeout=EXTERNAL_METRIC_CACHE_TTL)
+
+    return results
 
 
 # Register the generic adapter
 register_adapter("generic_model", generic_model_adapter)
+register_batch_adapter("generic_model", generic_model_batch_adapter)
 
 
 # ======================================================================
@@ -133,7 +370,7 @@ def avg_task_progress_for(evaluation, objective) -> int:
     qs = Task.objects.filter(
         objective=objective,
         company=evaluation.company
-    ).exclude(status__in=["cancelled"])
+    ).exclude(status__code="cancelled")
 
     qs = qs.filter(
         models.Q(assignee=evaluation.employee) |
@@ -183,6 +420,108 @@ class TaskSLAEngine:
         return policy.severe_delay_pct
 
 
+class TaskSLASweeper:
+    """
+    تحديث timeliness_pct للمهام المفتوحة المتأخرة دون حفظها واحدة واحدة.
+    نفس قواعد TaskSLAEngine.compute_timeliness (completed_at = الآن):
+      blocked_external + allow_no_penalty → on_time
+      تأخير 1..3 أيام → mild، أكثر → severe
+    UPDATE واحد لكل سياسة ولكل شريحة id، يعيد الأهداف المتأثرة فقط.
+
+    لا Task.save ولا post_save: progress/score للهدف لا يعتمدان على timeliness،
+    ومتابعة assignee (chatter) لا تتغير هنا؛ الأثر الوحيد يُعاد عبر rescore_objectives.
+    """
+
+    MILD_DELAY_DAYS = 3
+
+    _SQL = """
+        UPDATE perf_task AS t
+        SET timeliness_pct = CASE
+                WHEN %(blocked_ok)s AND t.blocked_external THEN %(on_time)s
+                WHEN %(today)s - t.due_date <= 0 THEN %(on_time)s
+                WHEN %(today)s - t.due_date <= %(mild_days)s THEN %(mild)s
+                ELSE %(severe)s
+            END,
+            updated_at = NOW()
+        WHERE t.sla_policy_id = %(policy_id)s
+          AND t.completed_at IS NULL
+          AND t.due_date < %(today)s
+          AND NOT t.is_locked
+          AND t.id >= %(id_from)s AND t.id < %(id_to)s
+          AND t.timeliness_pct IS DISTINCT FROM CASE
+                WHEN %(blocked_ok)s AND t.blocked_external THEN %(on_time)s
+                WHEN %(today)s - t.due_date <= 0 THEN %(on_time)s
+                WHEN %(today)s - t.due_date <= %(mild_days)s THEN %(mild)s
+                ELSE %(severe)s
+            END
+        RETURNING t.objective_id
+    """
+
+    @classmethod
+    def sweep_policy(cls, policy, today, *, batch_size=50000) -> Tuple[int, set]:
+        """(updated_tasks, objective_ids) لسياسة واحدة."""
+        bounds = Task.objects.filter(
+            sla_policy=policy, completed_at__isnull=True, due_date__lt=today,
+        ).aggregate(lo=models.Min("id"), hi=models.Max("id"))
+        if bounds["lo"] is None:
+            return 0, set()
+
+        params = {
+            "policy_id": policy.pk,
+            "today": today,
+            "blocked_ok": bool(policy.allow_blocked_external_no_penalty),
+            "on_time": policy.on_time_pct,
+            "mild": policy.mild_delay_pct,
+            "severe": policy.severe_delay_pct,
+            "mild_days": cls.MILD_DELAY_DAYS,
+        }
+
+        updated = 0
+        objective_ids: set[int] = set()
+        id_from = bounds["lo"]
+        while id_from <= bounds["hi"]:
+            # شرائح قصيرة → أقفال صفوف قصيرة حتى مع مئات آلاف المهام
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(cls._SQL, {**params, "id_from": id_from, "id_to": id_from + batch_size})
+                rows = cursor.fetchall()
+            updated += len(rows)
+            objective_ids.update(r[0] for r in rows)
+            id_from += batch_size
+
+        return updated, objective_ids
+
+    @classmethod
+    def sweep(cls, today=None, *, company_id=None, batch_size=50000) -> dict:
+        from performance.models import TaskSLAPolicy
+
+        today = today or timezone.now().date()
+
+        policies = TaskSLAPolicy.all_objects.filter(active=True).order_by("id")
+        if company_id:
+            policies = policies.filter(company_id=company_id)
+
+        stats = {"policies": 0, "tasks": 0, "objective_ids": set()}
+        for policy in policies:
+            updated, objective_ids = cls.sweep_policy(policy, today, batch_size=batch_size)
+            stats["policies"] += 1
+            stats["tasks"] += updated
+            stats["objective_ids"].update(objective_ids)
+
+        return stats
+
+    @staticmethod
+    def rescore_objectives(objective_ids) -> int:
+        """
+        timeliness يدخل فقط في EmployeeObjectiveScore (progress/score للهدف لا يتأثران)
+        → نعيد حساب درجات الموظفين للأهداف المتأثرة فقط.
+        """
+        n = 0
+        for objective in Objective.all_objects.filter(id__in=list(objective_ids), active=True).order_by("id"):
+            objective.compute_employee_scores()
+            n += 1
+        return n
+
+
 # ======================================================================
 # TASK EFFICIENCY ENGINE
 # ======================================================================
@@ -212,30 +551,356 @@ class TaskEfficiencyEngine:
 # ======================================================================
 
 class TaskSubtaskEngine:
+    # حماية من حلقات parent_task غير المتوقعة
+    MAX_DEPTH = 32
+
     @staticmethod
     def compute_from_subtasks(task: Task):
-        subs = task.subtasks.filter(active=True)
-        if not subs.exists():
+        if not task.pk:
             return None
 
-        total = sum(t.percent_complete for t in subs)
-        return int(round(total / subs.count()))
+        agg = Task.objects.filter(parent_task_id=task.pk, active=True).aggregate(
+            n=models.Count("id"),
+            total=models.Sum("percent_complete"),
+        )
+        if not agg["n"]:
+            return None
+
+        return int(round(agg["total"] / agg["n"]))
+
+    # ------------------------------------------------------------------
+    # Upward rollup (parent_task chain), coalesced per transaction
+    # ------------------------------------------------------------------
+    @classmethod
+    def schedule_rollup(cls, parent_id):
+        """
+        يسجّل الأب لإعادة التجميع عند commit.
+        كل تغييرات المعاملة على أبناء نفس الشجرة تُعالج مرة واحدة.
+
+        المجموعة مربوطة بقائمة on_commit للمعاملة الحالية (connection.run_on_commit):
+        commit أو rollback يستبدلان القائمة → معاملة لاحقة تبدأ بمجموعة جديدة،
+        ومعرّفات معاملة متراجعة تُهمل مع الـ callback الخاص بها.
+        (تراجع savepoint يستبدل القائمة أيضًا → مجموعة ثانية و flush ثانٍ لنفس المعاملة، وهذا آمن)
+        """
+        if not parent_id:
+            return
+
+        conn = transaction.get_connection()
+        state = getattr(conn, "_subtask_rollup_pending", None)
+        if state is not None and state[0] is conn.run_on_commit and conn.in_atomic_block:
+            state[1].add(parent_id)
+            return
+
+        pending = {parent_id}
+        conn._subtask_rollup_pending = (conn.run_on_commit, pending)
+        transaction.on_commit(lambda: cls._flush_pending(conn, pending))
+
+    @classmethod
+    def _flush_pending(cls, conn, pending):
+        state = getattr(conn, "_subtask_rollup_pending", None)
+        if state is not None and state[1] is pending:
+            conn._subtask_rollup_pending = None
+        if not pending:
+            return
+        parent_ids = set(pending)
+        pending.clear()
+        cls.rollup(parent_ids)
+
+    @classmethod
+    def rollup(cls, parent_ids) -> int:
+        """
+        يعيد حساب percent_complete للآباء (use_subtasks) من القيم المخزنة لأبنائهم
+        باستعلام aggregate واحد لكل مستوى، ثم يصعد لمن تغيّر فقط.
+        بعد السلسلة: إعادة تجميع كل هدف متأثر مرة واحدة. يعيد عدد المهام المحدّثة.
+        """
+        current = {int(x) for x in parent_ids if x}
+        seen: set[int] = set()
+        objective_ids: set[int] = set()
+        updated = 0
+        depth = 0
+
+        while current and depth < cls.MAX_DEPTH:
+            depth += 1
+            seen |= current
+
+            parents = list(
+                Task.objects
+                .filter(id__in=current, is_locked=False, progress_policy__use_subtasks=True)
+                .only("id", "parent_task_id", "objective_id", "percent_complete")
+            )
+            if not parents:
+                break
+
+            stats = {
+                row["parent_task_id"]: row
+                for row in Task.objects
+                .filter(parent_task_id__in=[p.pk for p in parents], active=True)
+                .values("parent_task_id")
+                .annotate(n=models.Count("id"), total=models.Sum("percent_complete"))
+            }
+
+            changed = []
+            for parent in parents:
+                row = stats.get(parent.pk)
+                if not row or not row["n"]:
+                    continue
+                pct = max(0, min(int(round(row["total"] / row["n"])), 100))
+                if pct != parent.percent_complete:
+                    parent.percent_complete = pct
+                    parent.updated_at = timezone.now()
+                    changed.append(parent)
+
+            if changed:
+                # bulk_update: بدون Task.save() لكل مستوى (الهدف يُعاد تجميعه مرة في النهاية)
+                Task.objects.bulk_update(changed, ["percent_complete", "updated_at"])
+                updated += len(changed)
+                objective_ids.update(p.objective_id for p in changed)
+
+            current = {p.parent_task_id for p in changed if p.parent_task_id} - seen
+
+        for objective in Objective.all_objects.filter(id__in=objective_ids):
+            objective.recompute_progress_and_score()
+            objective.save(update_fields=["progress_pct", "score_pct"])
+
+        return updated
 
 
 # ======================================================================
 # DEPENDENCY ENGINE
 # ======================================================================
 
+# الحواف (task يعتمد على depends_on) من المصدرين: Task.depends_on (M2M) و TaskDependency النشطة
+_TASK_EDGES_SQL = """
+    SELECT from_task_id AS task_id, to_task_id AS depends_on_id FROM perf_task_depends_on
+    UNION
+    SELECT task_id, depends_on_id FROM perf_task_dependency WHERE active
+"""
+
+
 class TaskDependencyEngine:
     @staticmethod
     def validate_dependencies(task: Task):
-        needed = task.depends_on.filter(active=True).all()
+        if not task.pk:
+            return
+
+        open_deps = TaskDependencyGraph.open_dependencies([task.pk]).get(task.pk)
+        if open_deps:
+            raise ValidationError(
+                f"Cannot start or complete this task because dependency '{open_deps[0][1]}' is not finished."
+            )
 
-        for parent in needed:
-            if not parent.status or not parent.status.is_closed:
-                raise ValidationError(
-                    f"Cannot start or complete this task because dependency '{parent.title}' is not finished."
+
+class TaskDependencyCycleError(IntegrityError):
+    """
+    حلقة اعتماد وصلت إلى الحفظ متجاوزة clean()/TaskForm (كود، bulk، shell):
+    تُعامل كخرق قيد في قاعدة البيانات (مثل unique_together) لا كخطأ إدخال.
+    """
+
+
+class TaskDependencyGraph:
+    """
+    رسم اعتماديات مهام هدف واحد محمّل مرة واحدة (حواف + عقد):
+    - كشف الحلقات، ترتيب طوبولوجي، المسار الحرج (estimated_minutes)
+    - المهام المحجوبة حاليًا (اعتماد نشط غير مغلق)
+    الدوال العامة (classmethods) تجيب لمجموعة مهام باستعلام واحد — للوحات المهام.
+    """
+
+    def __init__(self, objective_id: int):
+        self.objective_id = objective_id
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT e.task_id, e.depends_on_id
+                FROM ({_TASK_EDGES_SQL}) e
+                JOIN perf_task t ON t.id = e.task_id
+                WHERE t.objective_id = %s
+                """,
+                [objective_id],
+            )
+            edges = cursor.fetchall()
+
+        # العقد: مهام الهدف + اعتماديات خارجه
+        external = {dep for _task, dep in edges}
+        rows = Task.objects.filter(
+            models.Q(objective_id=objective_id) | models.Q(id__in=external)
+        ).values_list("id", "title", "estimated_minutes", "active", "status__is_closed")
+
+        self.nodes: dict[int, dict] = {
+            tid: {"title": title, "minutes": minutes or 0, "active": active, "closed": bool(closed)}
+            for tid, title, minutes, active, closed in rows
+        }
+
+        # depends_on[t] = ما تعتمد عليه t ؛ dependents[d] = ما ينتظر d
+        self.depends_on: dict[int, set] = {tid: set() for tid in self.nodes}
+        self.dependents: dict[int, set] = {tid: set() for tid in self.nodes}
+        for task_id, dep_id in edges:
+            if task_id in self.nodes and dep_id in self.nodes:
+                self.depends_on[task_id].add(dep_id)
+                self.dependents[dep_id].add(task_id)
+
+    @classmethod
+    def for_objective(cls, objective) -> "TaskDependencyGraph":
+        return cls(getattr(objective, "pk", objective))
+
+    # ------------------------------------------------------------------
+    # Cycles / ordering
+    # ------------------------------------------------------------------
+    def find_cycle(self) -> Optional[list]:
+        """أول حلقة [a, b, ..., a] أو None."""
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = dict.fromkeys(self.nodes, WHITE)
+
+        for root in self.nodes:
+            if color[root] != WHITE:
+                continue
+            stack = [(root, iter(self.depends_on[root]))]
+            path = [root]
+            color[root] = GREY
+            while stack:
+                node, it = stack[-1]
+                nxt = next(it, None)
+                if nxt is None:
+                    color[node] = BLACK
+                    stack.pop()
+                    path.pop()
+                elif color[nxt] == GREY:
+                    return path[path.index(nxt):] + [nxt]
+                elif color[nxt] == WHITE:
+                    color[nxt] = GREY
+                    stack.append((nxt, iter(self.depends_on[nxt])))
+                    path.append(nxt)
+        return None
+
+    def topological_order(self) -> list:
+        """الاعتماديات أولًا (Kahn). ValidationError عند وجود حلقة."""
+        pending = {tid: len(deps) for tid, deps in self.depends_on.items()}
+        ready = sorted(tid for tid, n in pending.items() if n == 0)
+        order = []
+
+        while ready:
+            tid = ready.pop()
+            order.append(tid)
+            for nxt in self.dependents[tid]:
+                pending[nxt] -= 1
+                if pending[nxt] == 0:
+                    ready.append(nxt)
+
+        if len(order) != len(self.nodes):
+            raise ValidationError(f"Task dependency cycle detected: {self.find_cycle()}")
+        return order
+
+    def critical_path(self) -> Tuple[int, list]:
+        """(إجمالي الدقائق، [task ids]) — أطول سلسلة اعتماد حسب estimated_minutes."""
+        best: dict[int, int] = {}
+        prev: dict[int, Optional[int]] = {}
+
+        for tid in self.topological_order():
+            base, via = 0, None
+            for dep in self.depends_on[tid]:
+                if best[dep] > base:
+                    base, via = best[dep], dep
+            best[tid] = base + self.nodes[tid]["minutes"]
+            prev[tid] = via
+
+        if not best:
+            return 0, []
+
+        end = max(best, key=lambda t: (best[t], -t))
+        path = []
+        while end is not None:
+            path.append(end)
+            end = prev[end]
+        path.reverse()
+        return best[path[-1]], path
+
+    # ------------------------------------------------------------------
+    # Blocked state (in-memory)
+    # ------------------------------------------------------------------
+    def _is_open(self, tid) -> bool:
+        node = self.nodes[tid]
+        return node["active"] and not node["closed"]
+
+    def blocked_ids(self) -> set:
+        """مهام الهدف التي لها اعتماد نشط غير مغلق."""
+        return {
+            tid for tid, deps in self.depends_on.items()
+            if any(self._is_open(dep) for dep in deps)
+        }
+
+    # ------------------------------------------------------------------
+    # Set-based queries (أي مجموعة مهام، استعلام واحد)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def open_dependencies(task_ids) -> dict:
+        """{task_id: [(depends_on_id, title), ...]} للاعتماديات النشطة غير المغلقة."""
+        task_ids = [int(x) for x in task_ids]
+        if not task_ids:
+            return {}
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT e.task_id, d.id, d.title
+                FROM ({_TASK_EDGES_SQL}) e
+                JOIN perf_task d ON d.id = e.depends_on_id
+                LEFT JOIN perf_task_status s ON s.id = d.status_id
+                WHERE e.task_id = ANY(%s)
+                  AND d.active
+                  AND NOT COALESCE(s.is_closed, FALSE)
+                ORDER BY e.task_id, d.id
+                """,
+                [task_ids],
+            )
+            result: dict[int, list] = {}
+            for task_id, dep_id, title in cursor.fetchall():
+                result.setdefault(task_id, []).append((dep_id, title))
+            return result
+
+    @classmethod
+    def blocked_task_ids(cls, task_ids) -> set:
+        """أيّ هذه المهام محجوب الآن — بديل سؤال كل مهمة على حدة في لوحات المهام."""
+        return set(cls.open_dependencies(task_ids))
+
+    @staticmethod
+    def creates_cycle(task_id, depends_on_id) -> bool:
+        """
+        هل إضافة (task يعتمد على depends_on) تغلق حلقة؟
+        تتبع الاعتماديات من depends_on بـ CTE تعاودي (عبر كل الأهداف).
+        """
+        if not task_id or not depends_on_id:
+            return False
+        if task_id == depends_on_id:
+            return True
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH RECURSIVE edges AS ({_TASK_EDGES_SQL}),
+                reach(id) AS (
+                    SELECT %(dep)s::bigint
+                    UNION
+                    SELECT e.depends_on_id FROM edges e JOIN reach r ON e.task_id = r.id
                 )
+                SELECT EXISTS (SELECT 1 FROM reach WHERE id = %(task)s)
+                """,
+                {"task": task_id, "dep": depends_on_id},
+            )
+            return bool(cursor.fetchone()[0])
+
+    @classmethod
+    def validate_edge(cls, task_id, depends_on_id):
+        """للنماذج و clean(): خطأ إدخال يُعرض للمستخدم."""
+        if cls.creates_cycle(task_id, depends_on_id):
+            raise ValidationError("This dependency would create a cycle.")
+
+    @classmethod
+    def ensure_acyclic(cls, task_id, depends_on_id):
+        """للإشارات (آخر خط دفاع قبل الكتابة): TaskDependencyCycleError."""
+        if cls.creates_cycle(task_id, depends_on_id):
+            raise TaskDependencyCycleError(
+                f"Task {task_id} depending on task {depends_on_id} would create a dependency cycle."
+            )
 
 
 # ======================================================================
@@ -344,36 +1009,1371 @@ class ObjectiveScoreEngine:
         return {"timeliness": tim, "efficiency": eff, "quality": qua}
 
 
+# ======================================================================
+# OBJECTIVE ROLLUP (SQL aggregates + upward propagation)
+# ======================================================================
+
+class ObjectiveRollupService:
+    """
+    تجميع progress/score للهدف باستعلام aggregate واحد لكل مصدر
+    (الأبناء، أو المهام ثم KPIs)، ورفع التغيير عبر سلسلة parent فقط:
+    كل مستوى يقرأ القيم المخزنة لأبنائه المباشرين.
+    """
+
+    # حماية من حلقات parent غير المتوقعة
+    MAX_DEPTH = 64
+
+    @staticmethod
+    def _from_children(objective) -> Optional[Tuple[int, int]]:
+        agg = Objective.all_objects.filter(parent_id=objective.pk, active=True).aggregate(
+            n=models.Count("id"),
+            progress=models.Sum("progress_pct"),
+            score=models.Sum("score_pct"),
+            weight=models.Sum("weight_pct"),
+            w_progress=models.Sum(models.F("progress_pct") * models.F("weight_pct")),
+            w_score=models.Sum(models.F("score_pct") * models.F("weight_pct")),
+        )
+        n = agg["n"]
+        if not n:
+            return None
+
+        if objective.rollup_strategy == "weighted":
+            total_w = agg["weight"] or 1
+            return (
+                int(round((agg["w_progress"] or 0) / total_w)),
+                int(round((agg["w_score"] or 0) / total_w)),
+            )
+
+        return int(round(agg["progress"] / n)), int(round(agg["score"] / n))
+
+    @staticmethod
+    def _from_own(objective) -> Tuple[int, int]:
+        tasks = Task.objects.filter(objective_id=objective.pk).exclude(status__code="cancelled").aggregate(
+            n=models.Count("id"),
+            total=models.Sum("percent_complete"),
+        )
+        progress = int(round(tasks["total"] / tasks["n"])) if tasks["n"] else 0
+
+        kpis = KPI.objects.filter(objective_id=objective.pk).aggregate(
+            n=models.Count("id"),
+            weight=models.Sum(models.functions.Coalesce("weight_pct", 0)),
+            num=models.Sum(
+                models.functions.Coalesce("score_pct", 0)
+                * models.Case(
+                    models.When(weight_pct__gt=0, then=models.F("weight_pct")),
+                    default=models.Value(100),
+                )
+            ),
+        )
+        if kpis["n"]:
+            total_w = kpis["weight"] or (kpis["n"] * 100)
+            score = max(0, min(100, int(round((kpis["num"] or 0) / total_w))))
+        else:
+            score = 0
+
+        return progress, score
+
+    @classmethod
+    def compute(cls, objective) -> Tuple[int, int]:
+        """(progress_pct, score_pct) بدون كتابة."""
+        if objective.rollup_strategy != "none" and objective.pk:
+            rolled = cls._from_children(objective)
+            if rolled is not None:
+                return rolled
+        return cls._from_own(objective)
+
+    @classmethod
+    def propagate(cls, parent_id) -> int:
+        """
+        يعيد تجميع الأسلاف بدءًا من parent_id صعودًا.
+        يتوقف عند أول مستوى لا يجمع من أبنائه (rollup=none) أو لم تتغير قيمه.
+        يعيد عدد الأهداف التي حُدّثت.
+        """
+        updated = 0
+        seen = set()
+
+        while parent_id and parent_id not in seen and len(seen) < cls.MAX_DEPTH:
+            seen.add(parent_id)
+            parent = (
+                Objective.all_objects
+                .filter(pk=parent_id)
+                .only("id", "parent_id", "rollup_strategy", "progress_pct", "score_pct")
+                .first()
+            )
+            if parent is None or parent.rollup_strategy == "none":
+                break
+
+            progress, score = cls.compute(parent)
+            if (progress, score) == (parent.progress_pct, parent.score_pct):
+                break
+
+            # update() مباشرة: لا نعيد تشغيل Objective.save (مشاركين + درجات الموظفين) لكل سلف
+            Objective.all_objects.filter(pk=parent.pk).update(
+                progress_pct=progress,
+                score_pct=score,
+                updated_at=timezone.now(),
+            )
+            updated += 1
+            parent_id = parent.parent_id
+
+        return updated
+
+
+# ======================================================================
+# OBJECTIVE PARTICIPANTS (set-based)
+# ======================================================================
+
+# أزواج (objective, employee) المستهدفة لمجموعة أهداف — نفس قواعد
+# Objective._collect_employee_ids() لكن في SQL واحد:
+#   - target_kind=employee → target_employee
+#   - ObjectiveEmployeeAssignment
+#   - موظفون نشطون في أقسام النطاق: target_department (+كل الفروع عبر parent_path)
+#     و ObjectiveDepartmentAssignment (+الفروع إن include_children)
+_PARTICIPANT_TARGETS_SQL = """
+WITH obj AS (
+    SELECT id, company_id, target_kind, target_department_id, target_employee_id
+    FROM perf_objective
+    WHERE id = ANY(%(objective_ids)s)
+),
+scope AS (
+    SELECT o.id AS objective_id, d.id AS dept_id, d.parent_path AS prefix, TRUE AS subtree
+    FROM obj o
+    JOIN hr_department d ON d.id = o.target_department_id
+    WHERE o.target_kind = 'department'
+    UNION ALL
+    SELECT a.objective_id, d.id, d.parent_path, a.include_children
+    FROM perf_objective_dept_assignment a
+    JOIN obj o ON o.id = a.objective_id
+    JOIN hr_department d ON d.id = a.department_id
+),
+targets AS (
+    SELECT o.id AS objective_id, o.target_employee_id AS employee_id
+    FROM obj o
+    WHERE o.target_kind = 'employee' AND o.target_employee_id IS NOT NULL {emp_filter_o}
+    UNION
+    SELECT a.objective_id, a.employee_id
+    FROM perf_objective_employee_assignment a
+    WHERE a.objective_id = ANY(%(objective_ids)s) {emp_filter_a}
+    UNION
+    SELECT s.objective_id, e.id
+    FROM scope s
+    JOIN obj o ON o.id = s.objective_id
+    JOIN hr_department d
+      ON d.id = s.dept_id
+      OR (s.subtree AND s.prefix <> '' AND d.company_id = o.company_id AND d.parent_path LIKE s.prefix || '%%')
+    JOIN hr_employee e
+      ON e.department_id = d.id AND e.company_id = o.company_id AND e.active {emp_filter_e}
+)
+"""
+
+
+# بصمة "مدخلات" المجموعة المستهدفة (لا المجموعة نفسها): أرخص من targets (لا join على الموظفين)
+# - أعمدة الاستهداف في الهدف + صفوف التعيينات (موظفين/أقسام)
+# - parent_path / updated_at للأقسام المستهدفة، و (id, parent_path) لفروعها:
+#   نقل قسم إلى/من الشجرة يغيّر البصمة
+# نقل/أرشفة موظف لا يغيّرها: sync_employee (إشارات hr) يحدّث مشاركيه مباشرة.
+_PARTICIPANT_INPUTS_FP_SQL = """
+WITH obj AS (
+    SELECT id, company_id, target_kind, target_department_id, target_employee_id
+    FROM perf_objective
+    WHERE id = ANY(%(objective_ids)s)
+),
+scope AS (
+    SELECT o.id AS objective_id, o.target_department_id AS dept_id, TRUE AS subtree
+    FROM obj o
+    WHERE o.target_kind = 'department' AND o.target_department_id IS NOT NULL
+    UNION ALL
+    SELECT a.objective_id, a.department_id, a.include_children
+    FROM perf_objective_dept_assignment a
+    WHERE a.objective_id = ANY(%(objective_ids)s)
+),
+inputs AS (
+    SELECT o.id AS objective_id,
+           concat_ws(':', 'o', o.company_id, o.target_kind, o.target_department_id, o.target_employee_id) AS item
+    FROM obj o
+    UNION ALL
+    SELECT a.objective_id, concat_ws(':', 'e', a.employee_id)
+    FROM perf_objective_employee_assignment a
+    WHERE a.objective_id = ANY(%(objective_ids)s)
+    UNION ALL
+    SELECT s.objective_id, concat_ws(':', 'd', s.dept_id, s.subtree, d.parent_path, d.updated_at)
+    FROM scope s
+    LEFT JOIN hr_department d ON d.id = s.dept_id
+    UNION ALL
+    SELECT s.objective_id, concat_ws(':', 's', c.id, c.parent_path)
+    FROM scope s
+    JOIN obj o ON o.id = s.objective_id
+    JOIN hr_department d ON d.id = s.dept_id
+    JOIN hr_department c
+      ON s.subtree AND d.parent_path <> '' AND c.company_id = o.company_id
+     AND c.parent_path LIKE d.parent_path || '%%' AND c.id <> d.id
+),
+fp AS (
+    SELECT objective_id, md5(string_agg(item, ',' ORDER BY item)) AS hash
+    FROM inputs
+    GROUP BY objective_id
+)
+"""
+
+class ObjectiveParticipantService:
+    """
+    صيانة ObjectiveParticipant بعمليات set-based:
+    - rebuild(): DELETE + INSERT … SELECT لمجموعة أهداف (اختياريًا لموظفين محدّدين)
+    - objective_ids_for_departments(): الفهرس العكسي قسم → أهداف
+      (عبر parent_path: القسم + أسلافه، مع فهارس department على التعيينات)
+    - sync_employee(): تحديث موظف واحد بعد نقل القسم/تغيير active
+    """
+
+    @staticmethod
+    def _targets_sql(employee_ids=None) -> str:
+        if employee_ids is None:
+            return _PARTICIPANT_TARGETS_SQL.format(emp_filter_o="", emp_filter_a="", emp_filter_e="")
+        return _PARTICIPANT_TARGETS_SQL.format(
+            emp_filter_o="AND o.target_employee_id = ANY(%(employee_ids)s)",
+            emp_filter_a="AND a.employee_id = ANY(%(employee_ids)s)",
+            emp_filter_e="AND e.id = ANY(%(employee_ids)s)",
+        )
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, objective_ids, employee_ids=None) -> tuple[int, int]:
+        """
+        يعيد (removed, added).
+        employee_ids=None → إعادة بناء كاملة للأهداف؛ وإلا يقتصر الأثر على هؤلاء الموظفين.
+        """
+        objective_ids = [int(x) for x in objective_ids]
+        if not objective_ids:
+            return 0, 0
+
+        params = {"objective_ids": objective_ids}
+        emp_clause = ""
+        if employee_ids is not None:
+            params["employee_ids"] = [int(x) for x in employee_ids]
+            emp_clause = "AND p.employee_id = ANY(%(employee_ids)s)"
+
+        targets = cls._targets_sql(employee_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                targets + f"""
+                DELETE FROM perf_objective_participant p
+                WHERE p.objective_id = ANY(%(objective_ids)s) {emp_clause}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM targets t
+                      WHERE t.objective_id = p.objective_id AND t.employee_id = p.employee_id
+                  )
+                """,
+                params,
+            )
+            removed = cursor.rowcount
+
+            cursor.execute(
+                targets + """
+                INSERT INTO perf_objective_participant (objective_id, employee_id, created_at, updated_at)
+                SELECT t.objective_id, t.employee_id, NOW(), NOW()
+                FROM targets t
+                ON CONFLICT (objective_id, employee_id) DO NOTHING
+                """,
+                params,
+            )
+            added = cursor.rowcount
+
+            if employee_ids is None:
+                # إعادة بناء كاملة → نخزّن بصمة المدخلات
+                cursor.execute(
+                    _PARTICIPANT_INPUTS_FP_SQL + """
+                    UPDATE perf_objective o
+                    SET participants_fingerprint = fp.hash,
+                        participants_rebuilt_at = NOW()
+                    FROM fp
+                    WHERE o.id = fp.objective_id
+                    """,
+                    params,
+                )
+
+        return removed, added
+
+    @classmethod
+    def dirty_objective_ids(cls, objective_ids) -> list[int]:
+        """
+        الأهداف التي تغيّرت مدخلاتها منذ آخر rebuild (أعمدة الاستهداف، التعيينات،
+        مسار/تحديث الأقسام المستهدفة وفروعها): مقارنة البصمة فقط، بدون حساب targets ولا كتابة.
+        """
+        objective_ids = [int(x) for x in objective_ids]
+        if not objective_ids:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _PARTICIPANT_INPUTS_FP_SQL + """
+                SELECT o.id
+                FROM perf_objective o
+                JOIN fp ON fp.objective_id = o.id
+                WHERE o.participants_fingerprint IS DISTINCT FROM fp.hash
+                ORDER BY o.id
+                """,
+                {"objective_ids": objective_ids},
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def objective_ids_for_departments(department_ids) -> set[int]:
+        """
+        الأهداف التي يشمل نطاقها أيًّا من الأقسام المعطاة:
+        - target_department أو تعيين قسم = القسم نفسه
+        - أو = أحد أسلافه (target_department دائمًا يشمل الفروع، التعيين إن include_children)
+        """
+        from hr.models import Department
+
+        department_ids = [d for d in department_ids if d]
+        if not department_ids:
+            return set()
+
+        self_ids, ancestor_ids = set(department_ids), set()
+        paths = Department.all_objects.filter(id__in=department_ids).values_list("id", "parent_path")
+        for dept_id, path in paths:
+            ancestor_ids.update(int(x) for x in (path or "").split("/") if x and int(x) != dept_id)
+
+        objective_ids = set(
+            Objective.all_objects.filter(
+                target_kind="department",
+                target_department_id__in=self_ids | ancestor_ids,
+            ).values_list("id", flat=True)
+        )
+        objective_ids.update(
+            ObjectiveDepartmentAssignment.objects.filter(
+                models.Q(department_id__in=self_ids)
+                | models.Q(department_id__in=ancestor_ids, include_children=True)
+            ).values_list("objective_id", flat=True)
+        )
+        return objective_ids
+
+    @classmethod
+    def sync_employee(cls, employee_id: int, department_ids) -> tuple[int, int]:
+        """
+        بعد تغيير قسم/حالة موظف: فقط الأهداف التي تستهدف القسم القديم أو الجديد
+        (مع أسلافهما) تُحدَّث، ولهذا الموظف فقط.
+        """
+        objective_ids = cls.objective_ids_for_departments(department_ids)
+        if not objective_ids:
+            return 0, 0
+        return cls.rebuild(objective_ids, employee_ids=[employee_id])
+
+
+def _rebuild_participants_chunk(objective_ids) -> tuple[int, int, int]:
+    """نقطة دخول عامل الـprocess pool: (objectives, removed, added)."""
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        removed, added = ObjectiveParticipantService.rebuild(objective_ids)
+        return len(objective_ids), removed, added
+    finally:
+        close_old_connections()
+
+
 # ======================================================================
 # RECURRING TASK SERVICE
 # ======================================================================
 
 class RecurringTaskService:
+    """
+    توليد مهام التعريفات الدورية دفعة واحدة:
+    - bulk_create مع حقول السياسات محسوبة مسبقًا (TaskPolicyEngine)
+    - إعادة تجميع الهدف مرة واحدة بدل مرة لكل مهمة
+    - المكلَّفون متابعون للمهام (follow_many) كما في Task.objects.create
+    - مهمة واحدة لكل (تعريف، فترة، موظف) → إعادة التشغيل لنفس الفترة لا تكرر شيئًا
+    """
+
     @staticmethod
-    @transaction.atomic
-    def generate_tasks(definition: TaskRecurringDefinition, period_label: str):
-        objective = definition.objective
+    def period_for(definition: TaskRecurringDefinition, on_date) -> Optional[Tuple[str, Any]]:
+        """
+        (period_label, due_date) للفترة التي تحتوي on_date حسب schedule_kind.
+        custom: لا قاعدة فترة في التعريف → None (يُولَّد بتسمية صريحة فقط).
+        """
+        if definition.schedule_kind == "monthly":
+            return f"{on_date:%Y-%m}", _month_end(on_date)
 
-        participants = objective.participants.values_list("employee_id", flat=True)
-        excluded = definition.excluded_employees.values_list("id", flat=True)
+        if definition.schedule_kind == "weekly":
+            iso_year, iso_week, iso_day = on_date.isocalendar()
+            return f"{iso_year}-W{iso_week:02d}", on_date + timedelta(days=7 - iso_day)
+
+        return None
 
-        final_ids = [eid for eid in participants if eid not in excluded]
+    @staticmethod
+    @transaction.atomic
+    def generate_tasks(definition: TaskRecurringDefinition, period_label: str, due_date=None):
+        # قفل التعريف → تشغيلان متزامنان لنفس الفترة لا يتسابقان
+        TaskRecurringDefinition.all_objects.select_for_update().filter(pk=definition.pk).first()
 
-        created = []
+        objective = definition.objective
 
+        participants = objective.participants.values_list("employee_id", flat=True)
+        excluded = set(definition.excluded_employees.values_list("id", flat=True))
+        existing = set(
+            Task.objects.filter(
+                recurring_definition=definition,
+                recurring_period=period_label,
+            ).values_list("assignee_id", flat=True)
+        )
+
+        final_ids = [eid for eid in participants if eid not in excluded and eid not in existing]
+        if not final_ids:
+            return []
+
+        user_id = get_current_user_id()
+        due_date = due_date or timezone.now().date()
+
+        tasks = []
         for emp_id in final_ids:
-            task = Task.objects.create(
-                company=objective.company,
+            task = Task(
+                company_id=objective.company_id,
                 objective=objective,
-                task_type=definition.task_type,
-                task_category=definition.task_category,
+                task_type_id=definition.task_type_id,
+                task_category_id=definition.task_category_id,
+                sla_policy=definition.sla_policy,
+                progress_policy=definition.progress_policy,
                 assignee_id=emp_id,
                 title=f"{definition.name} – {period_label}",
                 description=definition.description,
                 estimated_minutes=definition.target_count,
-                due_date=timezone.now().date(),
+                due_date=due_date,
                 status=None,
+                recurring_definition=definition,
+                recurring_period=period_label,
+                created_by_id=user_id,
+                updated_by_id=user_id,
             )
-            created.append(task)
+            # نفس ما يفعله Task.save() قبل الحفظ (مهمة جديدة: لا subtasks ولا dependencies)
+            TaskPolicyEngine.apply(task)
+            tasks.append(task)
+
+        created = Task.objects.bulk_create(tasks, batch_size=1000)
+
+        # bulk_create لا يطلق post_save → المتابعة التلقائية (chatter.task_auto_follow) صراحةً
+        from chatter.services import follow_many  # LAZY IMPORT
+        follow_many(created, "assignee")
+
+        # أثر Task.save() على الهدف — مرة واحدة للدفعة
+        objective.recompute_progress_and_score()
+        objective.save(update_fields=["progress_pct", "score_pct"])
 
         return created
+
+    @classmethod
+    def run_due(cls, on_date=None, *, company_id=None, definition_ids=None, period_label=None) -> list[dict]:
+        """
+        يولّد مهام كل تعريف نشط مستحق في on_date.
+        period_label صريح يتجاوز قاعدة schedule_kind (ويشمل custom).
+        """
+        on_date = on_date or timezone.localdate()
+
+        qs = (
+            TaskRecurringDefinition.all_objects
+            .filter(active=True, objective__active=True)
+            .select_related("objective", "sla_policy", "progress_policy")
+            .order_by("company_id", "id")
+        )
+        if company_id:
+            qs = qs.filter(company_id=company_id)
+        if definition_ids:
+            qs = qs.filter(id__in=definition_ids)
+
+        report = []
+        for definition in qs:
+            if period_label:
+                label, due_date = period_label, on_date
+            else:
+                period = cls.period_for(definition, on_date)
+                if period is None:
+                    report.append({"definition": definition, "period": None, "created": 0})
+                    continue
+                label, due_date = period
+
+            created = cls.generate_tasks(definition, label, due_date=due_date)
+            report.append({"definition": definition, "period": label, "created": len(created)})
+
+        return report
+
+
+# ======================================================================
+# DAILY RATING (bulk team entry)
+# ======================================================================
+
+class DailyRatingService:
+    """
+    إدخال تقييمات يوم كامل لفريق دفعة واحدة:
+    upsert للـDailyRating والـDailyRatingItem بـbulk_create(update_conflicts)
+    ثم حساب overall_score_pct لكل التقييمات بتجميع واحد (بدل DailyRatingItem.save() لكل عنصر).
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_rate(company, rating_date, ratings, *, rated_by=None) -> dict:
+        """
+        ratings: {employee_id: {factor_id: score_pct | (score_pct, comment)}}
+        يعيد {"ratings": n, "items": n, "overall": {employee_id: overall_score_pct}}.
+        """
+        company_id = getattr(company, "pk", company)
+        rated_by_id = getattr(rated_by, "pk", rated_by)
+        user_id = get_current_user_id()
+
+        from hr.models import Employee
+
+        employee_ids = {int(e) for e in ratings}
+        valid_employees = set(
+            Employee.all_objects.filter(company_id=company_id, id__in=employee_ids).values_list("id", flat=True)
+        )
+        if employee_ids - valid_employees:
+            raise ValidationError(
+                f"Employees not found in this company: {sorted(employee_ids - valid_employees)}"
+            )
+
+        factor_ids = {int(f) for scores in ratings.values() for f in scores}
+        valid_factors = set(
+            DailyRatingFactor.all_objects.filter(company_id=company_id, active=True, id__in=factor_ids)
+            .values_list("id", flat=True)
+        )
+        if factor_ids - valid_factors:
+            raise ValidationError(f"Unknown or inactive rating factors: {sorted(factor_ids - valid_factors)}")
+
+        # 1) DailyRating (employee, date) — overall يُحسب بعد العناصر
+        headers = DailyRating.objects.bulk_create(
+            [
+                DailyRating(
+                    company_id=company_id,
+                    employee_id=emp_id,
+                    rated_by_id=rated_by_id,
+                    date=rating_date,
+                    created_by_id=user_id,
+                    updated_by_id=user_id,
+                )
+                for emp_id in sorted(employee_ids)
+            ],
+            update_conflicts=True,
+            unique_fields=["employee", "date"],
+            update_fields=["rated_by", "updated_at", "updated_by"],
+        )
+        rating_by_employee = {r.employee_id: r for r in headers}
+
+        # 2) DailyRatingItem (daily_rating, factor)
+        items = []
+        for emp_id, scores in ratings.items():
+            rating = rating_by_employee[int(emp_id)]
+            for factor_id, value in scores.items():
+                score, comment = value if isinstance(value, (tuple, list)) else (value, "")
+                items.append(
+                    DailyRatingItem(
+                        daily_rating_id=rating.pk,
+                        factor_id=int(factor_id),
+                        score_pct=max(0, min(100, int(score))),
+                        comment=comment or "",
+                        created_by_id=user_id,
+                        updated_by_id=user_id,
+                    )
+                )
+        DailyRatingItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=["daily_rating", "factor"],
+            update_fields=["score_pct", "comment", "updated_at", "updated_by"],
+        )
+
+        # 3) overall لكل التقييمات (بما فيها عناصر سابقة غير مرسلة الآن) — نفس DailyRating.recompute()
+        totals = {
+            row["daily_rating_id"]: row
+            for row in DailyRatingItem.objects
+            .filter(daily_rating_id__in=[r.pk for r in headers])
+            .values("daily_rating_id")
+            .annotate(
+                total_weight=models.Sum("factor__weight_pct"),
+                weighted=models.Sum(models.F("score_pct") * models.F("factor__weight_pct")),
+            )
+        }
+        for rating in headers:
+            row = totals.get(rating.pk)
+            if not row:
+                rating.overall_score_pct = 0
+                continue
+            total_weight = row["total_weight"] or 1
+            rating.overall_score_pct = min(100, max(0, int(round((row["weighted"] or 0) / total_weight))))
+
+        DailyRating.objects.bulk_update(headers, ["overall_score_pct"])
+
+        # bulk_update لا يطلق post_save → تحديث التجميع الشهري مرة واحدة للدفعة
+        DailyRatingRollupService.refresh(
+            employee_ids=employee_ids, date_from=rating_date, date_to=rating_date, company_id=company_id,
+        )
+
+        return {
+            "ratings": len(headers),
+            "items": len(items),
+            "overall": {r.employee_id: r.overall_score_pct for r in headers},
+        }
+
+
+# ======================================================================
+# DAILY RATING MONTHLY ROLLUP
+# ======================================================================
+
+def _month_start(d):
+    return d.replace(day=1)
+
+
+def _month_end(d):
+    return d.replace(day=calendar.monthrange(d.year, d.month)[1])
+
+
+class DailyRatingRollupService:
+    """
+    صيانة DailyRatingMonthly وقراءته.
+    - refresh(): إعادة تجميع الأشهر المتأثرة فقط (تجميع واحد + upsert واحد + حذف الفارغ)
+    - window_totals(): مجموع/عدد لفترة = أشهر كاملة من الجدول + أطراف جزئية من DailyRating
+    - trend(): سلسلة شهرية لرسوم الاتجاه
+    """
+
+    @staticmethod
+    def refresh(*, employee_ids=None, date_from=None, date_to=None, company_id=None) -> int:
+        """يعيد حساب الأشهر التي تغطي [date_from, date_to] (كل الأشهر إن لم تُحدد)."""
+        daily = DailyRating.all_objects.all()
+        monthly = DailyRatingMonthly.all_objects.all()
+
+        if employee_ids is not None:
+            employee_ids = [int(x) for x in employee_ids]
+            daily = daily.filter(employee_id__in=employee_ids)
+            monthly = monthly.filter(employee_id__in=employee_ids)
+        if company_id:
+            daily = daily.filter(company_id=company_id)
+            monthly = monthly.filter(company_id=company_id)
+        if date_from:
+            daily = daily.filter(date__gte=_month_start(date_from))
+            monthly = monthly.filter(month__gte=_month_start(date_from))
+        if date_to:
+            daily = daily.filter(date__lte=_month_end(date_to))
+            monthly = monthly.filter(month__lte=_month_start(date_to))
+
+        rows = (
+            daily
+            .annotate(m=models.functions.TruncMonth("date"))
+            .values("employee_id", "company_id", "m")
+            .annotate(
+                s=models.Sum("overall_score_pct"),
+                n=models.Count("id"),
+                lo=models.Min("overall_score_pct"),
+                hi=models.Max("overall_score_pct"),
+            )
+        )
+        buckets = [
+            DailyRatingMonthly(
+                company_id=r["company_id"],
+                employee_id=r["employee_id"],
+                month=r["m"],
+                rating_sum=r["s"] or 0,
+                rating_count=r["n"],
+                rating_min=r["lo"] or 0,
+                rating_max=r["hi"] or 0,
+            )
+            for r in rows
+        ]
+
+        kept = []
+        if buckets:
+            kept = DailyRatingMonthly.all_objects.bulk_create(
+                buckets,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["employee", "company", "month"],
+                update_fields=["rating_sum", "rating_count", "rating_min", "rating_max", "updated_at"],
+            )
+
+        # أشهر لم يبق فيها أي تقييم يومي
+        monthly.exclude(pk__in=[b.pk for b in kept]).delete()
+        return len(kept)
+
+    @classmethod
+    def refresh_for(cls, employee_id, day, company_id=None):
+        cls.refresh(employee_ids=[employee_id], date_from=day, date_to=day, company_id=company_id)
+
+    @staticmethod
+    def full_months(date_start, date_end):
+        """(أول شهر كامل، آخر شهر كامل) داخل الفترة أو None."""
+        first = date_start if date_start.day == 1 else _month_end(date_start) + timedelta(days=1)
+        last_end = date_end if date_end == _month_end(date_end) else _month_start(date_end) - timedelta(days=1)
+        if first > last_end:
+            return None
+        return first, _month_start(last_end)
+
+    @classmethod
+    def window_totals(cls, company_id, employee_ids, date_start, date_end) -> dict:
+        """{employee_id: (sum, count)} للفترة: الأشهر الكاملة من الجدول + الأطراف من DailyRating."""
+        totals: dict[int, list] = {}
+
+        def _add(emp_id, s, n):
+            acc = totals.setdefault(emp_id, [0, 0])
+            acc[0] += s or 0
+            acc[1] += n or 0
+
+        months = cls.full_months(date_start, date_end)
+
+        monthly = None
+        if months is None:
+            edges = models.Q(date__range=(date_start, date_end))
+        else:
+            first, last = months
+            monthly = (
+                DailyRatingMonthly.all_objects
+                .filter(company_id=company_id, employee_id__in=employee_ids, month__range=(first, last))
+                .values("employee_id")
+                .annotate(s=models.Sum("rating_sum"), n=models.Sum("rating_count"))
+            )
+
+            edges = None
+            if date_start < first:
+                edges = models.Q(date__gte=date_start, date__lt=first)
+            if _month_end(last) < date_end:
+                tail = models.Q(date__gt=_month_end(last), date__lte=date_end)
+                edges = tail if edges is None else edges | tail
+
+        daily = None
+        if edges is not None:
+            daily = (
+                DailyRating.all_objects
+                .filter(edges, company_id=company_id, employee_id__in=employee_ids)
+                .values("employee_id")
+                .annotate(s=models.Sum("overall_score_pct"), n=models.Count("id"))
+            )
+
+        # استعلام واحد: الأشهر الكاملة UNION ALL الأطراف
+        if monthly is not None and daily is not None:
+            rows = monthly.union(daily, all=True)
+        else:
+            rows = monthly if monthly is not None else daily
+
+        for r in rows:
+            _add(r["employee_id"], r["s"], r["n"])
+
+        return {emp_id: (s, n) for emp_id, (s, n) in totals.items() if n}
+
+    @staticmethod
+    def trend(employee_id, date_from=None, date_to=None, company_id=None) -> list[dict]:
+        """[{month, average_pct, min, max, count}] مرتبة زمنيًا."""
+        qs = DailyRatingMonthly.all_objects.filter(employee_id=employee_id)
+        if company_id:
+            qs = qs.filter(company_id=company_id)
+        if date_from:
+            qs = qs.filter(month__gte=_month_start(date_from))
+        if date_to:
+            qs = qs.filter(month__lte=_month_start(date_to))
+
+        return [
+            {
+                "month": row.month,
+                "average_pct": row.average_pct,
+                "min": row.rating_min,
+                "max": row.rating_max,
+                "count": row.rating_count,
+            }
+            for row in qs.order_by("month")
+        ]
+
+
+# ======================================================================
+# EVALUATION CONTEXT (preloaded data for scoring)
+# ======================================================================
+
+def _is_cancelled_q(prefix: str = "") -> models.Q:
+    """المهام الملغاة: حالة code='cancelled' (status FK)."""
+    return models.Q(**{f"{prefix}status__code": "cancelled"})
+
+
+class EvaluationContext:
+    """
+    كل ما يحتاجه حساب تقييم واحد، محمّلًا مسبقًا.
+    - محرك التقييم يقرأ من هنا فقط (لا استعلامات داخل حلقة المعاملات)
+    - bulk_build() يبني السياقات لعدة تقييمات بنفس الاستعلامات
+    """
+
+    def __init__(self):
+        # الأهداف التي يشارك فيها الموظف (ضمن أهداف معاملات القالب)
+        self.participant_objective_ids: set[int] = set()
+
+        # EmployeeObjectiveScore لكل هدف: {objective_id: {final, timeliness, efficiency, quality}}
+        self.eos_by_objective: dict[int, dict] = {}
+
+        # متوسط مهام الهدف (الموظف + غير المسندة): {objective_id: (sum_pct, count)}
+        self.task_progress_by_objective: dict[int, tuple[int, int]] = {}
+
+        # DailyRating
+        self.daily_rating_sum = 0
+        self.daily_rating_count = 0
+
+        # المهام المؤقتة / المخطّطة
+        self.temp_effort = 0
+        self.planned_effort = 0
+        self.temp_count = 0
+        self.temp_weighted_sum = 0.0
+        self.temp_total_weight = 0.0
+
+        # QualityIncident
+        self.incident_count = 0
+        self.incident_penalty = 0.0
+
+        # 360° Feedback
+        self.feedback_count = 0
+        self.feedback_weighted_sum = 0.0
+        self.feedback_total_weight = 0.0
+
+        # PerformanceException (مع type محمّل)
+        self.exceptions: list = []
+
+        # EXTERNAL_METRIC من batch adapter: {parameter_id: (value, meta)}
+        self.external_metrics: dict[int, tuple] = {}
+
+    @classmethod
+    def build(cls, evaluation, params) -> "EvaluationContext":
+        """سياق تقييم واحد (نفس استعلامات bulk_build لمجموعة من عنصر واحد)."""
+        return cls.bulk_build([evaluation], {evaluation.template_id: list(params)})[evaluation.id]
+
+    # ------------------------------------------------------------------
+    # Bulk loader
+    # ------------------------------------------------------------------
+    @classmethod
+    def bulk_build(cls, evaluations, params_by_template: dict) -> dict:
+        """
+        يبني {evaluation_id: EvaluationContext} لمجموعة تقييمات.
+        التجميع حسب (company, date_start, date_end) → كل دورة تقييم
+        تُحمَّل بعدد ثابت من الاستعلامات مهما كان عدد الموظفين.
+        """
+        SK = EvaluationParameter.SourceKind
+
+        contexts = {ev.id: cls() for ev in evaluations}
+
+        groups: dict[tuple, list] = {}
+        for ev in evaluations:
+            groups.setdefault((ev.company_id, ev.date_start, ev.date_end), []).append(ev)
+
+        for (company_id, date_start, date_end), evs in groups.items():
+            params = [p for ev in evs for p in params_by_template.get(ev.template_id, [])]
+            kinds = {p.source_kind for p in params}
+            emp_ids = {ev.employee_id for ev in evs}
+
+            ctx_by_emp: dict[int, list] = {}
+            for ev in evs:
+                ctx_by_emp.setdefault(ev.employee_id, []).append(contexts[ev.id])
+
+            def _each(emp_id):
+                return ctx_by_emp.get(emp_id, ())
+
+            # ---------------- Objectives / participants ----------------
+            objective_ids = set()
+            for p in params:
+                if p.objective_id:
+                    objective_ids.add(p.objective_id)
+                if p.kpi_id and p.kpi and p.kpi.objective_id:
+                    objective_ids.add(p.kpi.objective_id)
+
+            if objective_ids:
+                rows = ObjectiveParticipant.objects.filter(
+                    employee_id__in=emp_ids,
+                    objective_id__in=objective_ids,
+                ).values_list("employee_id", "objective_id")
+                for emp_id, obj_id in rows:
+                    for ctx in _each(emp_id):
+                        ctx.participant_objective_ids.add(obj_id)
+
+            eos_kinds = {
+                SK.EMPLOYEE_OBJECTIVE_SCORE, SK.EMPLOYEE_OBJECTIVE_TIMELINESS,
+                SK.EMPLOYEE_OBJECTIVE_EFFICIENCY, SK.EMPLOYEE_OBJECTIVE_QUALITY,
+            }
+            if objective_ids and kinds & eos_kinds:
+                rows = EmployeeObjectiveScore.objects.filter(
+                    employee_id__in=emp_ids,
+                    objective_id__in=objective_ids,
+                ).values(
+                    "employee_id", "objective_id",
+                    "final_score_pct", "timeliness_pct", "efficiency_pct", "quality_pct",
+                )
+                for r in rows:
+                    for ctx in _each(r["employee_id"]):
+                        ctx.eos_by_objective.setdefault(r["objective_id"], r)
+
+            if objective_ids and SK.TASKS_PROGRESS in kinds:
+                rows = (
+                    Task.objects.filter(objective_id__in=objective_ids, company_id=company_id)
+                    .exclude(_is_cancelled_q())
+                    .filter(models.Q(assignee_id__in=emp_ids) | models.Q(assignee__isnull=True))
+                    .filter(models.Q(due_date__isnull=True) | models.Q(due_date__range=(date_start, date_end)))
+                    .values("objective_id", "assignee_id")
+                    .annotate(s=models.Sum("percent_complete"), n=models.Count("id"))
+                )
+                shared, own = {}, {}
+                for r in rows:
+                    if r["assignee_id"] is None:
+                        shared[r["objective_id"]] = (r["s"] or 0, r["n"])
+                    else:
+                        own[(r["assignee_id"], r["objective_id"])] = (r["s"] or 0, r["n"])
+                for emp_id in emp_ids:
+                    for obj_id in objective_ids:
+                        s1, n1 = own.get((emp_id, obj_id), (0, 0))
+                        s2, n2 = shared.get(obj_id, (0, 0))
+                        if n1 + n2:
+                            for ctx in _each(emp_id):
+                                ctx.task_progress_by_objective[obj_id] = (s1 + s2, n1 + n2)
+
+            # ---------------- Daily ratings ----------------
+            if SK.DAILY_RATING in kinds:
+                # أشهر كاملة من DailyRatingMonthly + أطراف جزئية من DailyRating
+                totals = DailyRatingRollupService.window_totals(company_id, emp_ids, date_start, date_end)
+                for emp_id, (s, n) in totals.items():
+                    for ctx in _each(emp_id):
+                        ctx.daily_rating_sum = s
+                        ctx.daily_rating_count = n
+
+            # ---------------- Temporary tasks ----------------
+            if kinds & {SK.TEMP_TASKS_LOAD, SK.TEMP_TASKS_SCORE}:
+                rows = (
+                    Task.objects.filter(
+                        company_id=company_id,
+                        assignee_id__in=emp_ids,
+                        due_date__range=(date_start, date_end),
+                    )
+                    .exclude(_is_cancelled_q())
+                    .values_list(
+                        "assignee_id", "temporary_source_type", "actual_minutes",
+                        "estimated_minutes", "quality_score_pct", "percent_complete",
+                    )
+                )
+                for emp_id, temp_type, actual, estimated, quality, pct in rows:
+                    effort = actual or estimated
+                    for ctx in _each(emp_id):
+                        if temp_type:
+                            ctx.temp_effort += effort
+                            ctx.temp_count += 1
+                            weight = EvaluationScoringEngine.PRIORITY_WEIGHTS["normal"] * (actual or estimated or 30)
+                            ctx.temp_total_weight += weight
+                            ctx.temp_weighted_sum += (quality or pct) * weight
+                        else:
+                            ctx.planned_effort += effort
+
+            # ---------------- Quality incidents ----------------
+            if SK.QUALITY_SCORE in kinds:
+                rows = (
+                    QualityIncident.objects.filter(
+                        company_id=company_id,
+                        employee_id__in=emp_ids,
+                        date__range=(date_start, date_end),
+                    )
+                    .values("employee_id", "severity")
+                    .annotate(loss=models.Sum(100 - models.F("impact_score_pct")), n=models.Count("id"))
+                )
+                for r in rows:
+                    sev_w = EvaluationScoringEngine.SEVERITY_WEIGHTS.get(r["severity"], 1.0)
+                    for ctx in _each(r["employee_id"]):
+                        ctx.incident_count += r["n"]
+                        ctx.incident_penalty += sev_w * (r["loss"] or 0)
+
+            # ---------------- Feedback ----------------
+            if SK.FEEDBACK_SCORE in kinds:
+                rows = (
+                    EvaluationFeedback.objects.filter(evaluation_id__in=[ev.id for ev in evs])
+                    .values("evaluation_id", "role")
+                    .annotate(s=models.Sum("overall_score_pct"), n=models.Count("id"))
+                )
+                for r in rows:
+                    w = EvaluationScoringEngine.ROLE_WEIGHTS.get(r["role"], 1.0)
+                    ctx = contexts[r["evaluation_id"]]
+                    ctx.feedback_count += r["n"]
+                    ctx.feedback_total_weight += w * r["n"]
+                    ctx.feedback_weighted_sum += w * (r["s"] or 0)
+
+            # ---------------- External metrics (batch adapter) ----------------
+            # استدعاء واحد لكل معامل بدلاً من استدعاء لكل موظف
+            batch = get_batch_adapter("generic_model")
+            if batch and SK.EXTERNAL_METRIC in kinds:
+                seen = set()
+                for p in params:
+                    if p.source_kind != SK.EXTERNAL_METRIC or p.id in seen:
+                        continue
+                    seen.add(p.id)
+                    if not (p.external_model and p.external_field):
+                        continue
+                    p_emp_ids = [ev.employee_id for ev in evs if ev.template_id == p.template_id]
+                    values = batch(
+                        app_model=p.external_model,
+                        field=p.external_field,
+                        aggregation=p.external_aggregation or "avg",
+                        filter_json=p.external_filter or {},
+                        context={"company_id": company_id, "date_start": date_start, "date_end": date_end},
+                        employee_ids=p_emp_ids,
+                    )
+                    for emp_id, result in values.items():
+                        for ctx in _each(emp_id):
+                            ctx.external_metrics[p.id] = result
+
+            # ---------------- Exceptions ----------------
+            exceptions = PerformanceException.objects.filter(
+                company_id=company_id,
+                employee_id__in=emp_ids,
+                date_start__lte=date_end,
+                date_end__gte=date_start,
+            ).select_related("type")
+            for exc in exceptions:
+                for ctx in _each(exc.employee_id):
+                    ctx.exceptions.append(exc)
+
+        return contexts
+
+
+# ======================================================================
+# EVALUATION SCORING ENGINE
+# ======================================================================
+
+class EvaluationScoringEngine:
+    """
+    حساب نتائج معاملات تقييم واحد + الدرجة النهائية من EvaluationContext.
+    لا يكتب في قاعدة البيانات: يعيد كائنات غير محفوظة للـbulk_create.
+    """
+
+    PRIORITY_WEIGHTS = {"critical": 3.0, "high": 2.0, "normal": 1.0, "low": 0.5}
+    SEVERITY_WEIGHTS = {"critical": 3.0, "high": 2.0, "medium": 1.5, "low": 1.0}
+    ROLE_WEIGHTS = {"self": 1.0, "peer": 1.5, "manager": 3.0, "skip_manager": 2.5, "hr": 2.0, "other": 1.0}
+
+    @staticmethod
+    def objective_applies(evaluation, obj, ctx: EvaluationContext) -> bool:
+        """نفس شروط objective_applies() لكن المشاركة تُقرأ من السياق."""
+        if not obj or obj.company_id != evaluation.company_id:
+            return False
+        if obj.date_start > evaluation.date_end:
+            return False
+        if obj.date_end and obj.date_end < evaluation.date_start:
+            return False
+        return obj.id in ctx.participant_objective_ids
+
+    @classmethod
+    def score_parameter(cls, evaluation, p, ctx: EvaluationContext):
+        """يعيد (raw_number, raw_json, score_pct) لمعامل واحد."""
+        SK = EvaluationParameter.SourceKind
+
+        raw_number = None
+        raw_json = None
+        default = p.manual_default_score_pct or 0
+        score = default
+
+        min_s = p.min_score_pct if p.min_score_pct is not None else 0
+        max_s = p.max_score_pct if p.max_score_pct is not None else 100
+
+        kind = p.source_kind
+
+        if kind == SK.MANUAL:
+            score = default
+
+        elif kind in (SK.OBJECTIVE_SCORE, SK.OBJECTIVE_PROGRESS):
+            obj = p.objective
+            if obj and cls.objective_applies(evaluation, obj, ctx):
+                raw_number = obj.score_pct if kind == SK.OBJECTIVE_SCORE else obj.progress_pct
+                score = raw_number
+
+        elif kind == SK.KPI_SCORE:
+            kpi = p.kpi
+            if (
+                kpi
+                and kpi.company_id == evaluation.company_id
+                and kpi.objective
+                and cls.objective_applies(evaluation, kpi.objective, ctx)
+            ):
+                raw_number = kpi.score_pct
+                score = raw_number
+
+        elif kind == SK.TASKS_PROGRESS:
+            obj = p.objective
+            if obj and cls.objective_applies(evaluation, obj, ctx):
+                total, n = ctx.task_progress_by_objective.get(obj.id, (0, 0))
+                raw_number = int(round(total / n)) if n else 0
+                score = raw_number
+
+        elif kind == SK.DAILY_RATING:
+            if ctx.daily_rating_count:
+                raw_number = ctx.daily_rating_sum / ctx.daily_rating_count
+                score = int(round(raw_number))
+
+        elif kind == SK.TEMP_TASKS_LOAD:
+            total_effort = ctx.temp_effort + ctx.planned_effort
+            if total_effort:
+                raw_number = (ctx.temp_effort / total_effort) * 100.0
+                score = int(round(raw_number))
+
+        elif kind == SK.TEMP_TASKS_SCORE:
+            if ctx.temp_count and ctx.temp_total_weight:
+                raw_number = ctx.temp_weighted_sum / ctx.temp_total_weight
+                score = int(round(raw_number))
+
+        elif kind == SK.QUALITY_SCORE:
+            if not ctx.incident_count:
+                raw_number = 100
+                score = 100
+            else:
+                # لا يمكن أن يزيد العقاب عن 100
+                penalty = min(ctx.incident_penalty, 100)
+                raw_number = max(0, 100 - penalty)
+                score = int(round(raw_number))
+
+        elif kind in (
+            SK.EMPLOYEE_OBJECTIVE_SCORE, SK.EMPLOYEE_OBJECTIVE_TIMELINESS,
+            SK.EMPLOYEE_OBJECTIVE_EFFICIENCY, SK.EMPLOYEE_OBJECTIVE_QUALITY,
+        ):
+            if p.objective_id:
+                eos = ctx.eos_by_objective.get(p.objective_id)
+                if eos:
+                    field = {
+                        SK.EMPLOYEE_OBJECTIVE_SCORE: "final_score_pct",
+                        SK.EMPLOYEE_OBJECTIVE_TIMELINESS: "timeliness_pct",
+                        SK.EMPLOYEE_OBJECTIVE_EFFICIENCY: "efficiency_pct",
+                        SK.EMPLOYEE_OBJECTIVE_QUALITY: "quality_pct",
+                    }[kind]
+                    raw_number = eos[field]
+                    score = raw_number
+
+        elif kind == SK.FEEDBACK_SCORE:
+            if ctx.feedback_count and ctx.feedback_total_weight:
+                raw_number = ctx.feedback_weighted_sum / ctx.feedback_total_weight
+                score = int(round(raw_number))
+
+        elif kind == SK.EXTERNAL_METRIC:
+            adapter = get_adapter("generic_model")
+            if p.id in ctx.external_metrics:
+                raw_number, raw_json = ctx.external_metrics[p.id]
+                if raw_number is not None:
+                    score = clamp_to_pct(raw_number, min_s, max_s)
+            elif adapter and p.external_model and p.external_field:
+                raw_number, raw_json = adapter(
+                    app_model=p.external_model,
+                    field=p.external_field,
+                    aggregation=p.external_aggregation or "avg",
+                    filter_json=p.external_filter or {},
+                    context={
+                        "employee_id": evaluation.employee_id,
+                        "company_id": evaluation.company_id,
+                        "date_start": evaluation.date_start,
+                        "date_end": evaluation.date_end,
+                    },
+                )
+                if raw_number is not None:
+                    score = clamp_to_pct(raw_number, min_s, max_s)
+            return raw_number, raw_json, score
+
+        return raw_number, raw_json, clamp_to_pct(score, min_s, max_s)
+
+    @staticmethod
+    def exception_impact(exc, base_score: int) -> float:
+        """تأثير استثناء واحد على الدرجة الأساسية (نفس قواعد Evaluation.recompute)."""
+        multiplier = exc.impact_pct if exc.impact_pct is not None else exc.type.multiplier
+
+        if exc.type.is_positive and multiplier < 0:
+            multiplier = abs(multiplier)
+        if not exc.type.is_positive and multiplier > 0:
+            multiplier = -abs(multiplier)
+
+        max_pct = (exc.type.max_impact_pct or 100) / 100.0
+        if abs(multiplier) > max_pct:
+            multiplier = max_pct if multiplier > 0 else -max_pct
+
+        return base_score * multiplier
+
+    @classmethod
+    def score(cls, evaluation, params, ctx: EvaluationContext):
+        """
+        يعيد (results, adjustments, final_score_pct):
+        - results: EvaluationParameterResult غير محفوظة
+        - adjustments: EvaluationExceptionAdjustment غير محفوظة
+        """
+        uid = get_current_user_id()
+
+        results = []
+        total_weight = 0
+        weighted_sum = 0
+
+        for p in params:
+            raw_number, raw_json, score = cls.score_parameter(evaluation, p, ctx)
+            results.append(EvaluationParameterResult(
+                evaluation=evaluation,
+                parameter=p,
+                raw_value_number=raw_number,
+                raw_value_json=raw_json,
+                score_pct=score,
+                created_by_id=uid,
+                updated_by_id=uid,
+            ))
+            w = p.weight_pct or 0
+            total_weight += w
+            weighted_sum += score * w
+
+        base_score = int(round(weighted_sum / total_weight)) if total_weight > 0 else 0
+
+        adjustments = []
+        exception_total = 0.0
+        for exc in ctx.exceptions:
+            impact = cls.exception_impact(exc, base_score)
+            adjustments.append(EvaluationExceptionAdjustment(
+                evaluation=evaluation,
+                exception=exc,
+                adjustment_pct=impact,
+                created_by_id=uid,
+                updated_by_id=uid,
+            ))
+            exception_total += impact
+
+        final = max(0, min(100, int(round(base_score + exception_total))))
+        return results, adjustments, final
+
+
+# ======================================================================
+# EVALUATION CYCLE ENGINE (bulk recompute)
+# ======================================================================
+
+def _recompute_evaluation_chunk(evaluation_ids) -> int:
+    """نقطة دخول عامل الـprocess pool (يجب أن تكون على مستوى الموديول)."""
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        return EvaluationCycleEngine.recompute_chunk(evaluation_ids)
+    finally:
+        close_old_connections()
+
+
+def _pool_initializer():
+    # spawn/forkserver: العامل يبدأ بدون Django مهيأ
+    import django
+    from django.apps import apps as django_apps
+
+    if not django_apps.ready:
+        django.setup()
+
+
+class EvaluationCycleEngine:
+    """
+    إعادة حساب تقييمات دورة كاملة دفعة واحدة:
+    - تحميل القوالب/المعاملات/السياقات لكل الموظفين مرة واحدة لكل chunk
+    - bulk_create للنتائج والتعديلات + bulk_update للدرجة النهائية
+    - تقسيم اختياري على process pool
+    التقييمات المقفلة (approved/locked) لا تُلمس كما في Evaluation.save().
+    """
+
+    @staticmethod
+    def select(*, company_id=None, date_start=None, date_end=None):
+        qs = Evaluation.objects.filter(
+            locked_at__isnull=True,
+        ).exclude(state__in=["approved", "locked"])
+        if company_id:
+            qs = qs.filter(company_id=company_id)
+        if date_start:
+            qs = qs.filter(date_end__gte=date_start)
+        if date_end:
+            qs = qs.filter(date_start__lte=date_end)
+        return qs
+
+    @staticmethod
+    def insert_new(evaluations) -> list:
+        """
+        INSERT … ON CONFLICT DO NOTHING RETURNING id → ids الصفوف التي أدرجها هذا الاستدعاء فقط.
+        bulk_create(ignore_conflicts) لا يعيد pk، وإعادة القراءة بالمفاتيح تلتقط أيضًا
+        ما أدرجه طلب متزامن (أو ضغطة submit مزدوجة) لنفس (employee, period).
+        """
+        evaluations = list(evaluations)
+        if not evaluations:
+            return []
+        opts = Evaluation._meta
+        fields = [f for f in opts.concrete_fields if not f.generated and f is not opts.pk]
+        for ev in evaluations:
+            ev._prepare_related_fields_for_save(operation_name="bulk_create")
+        rows = Evaluation._base_manager._insert(
+            evaluations, fields, returning_fields=[opts.pk], on_conflict=OnConflict.IGNORE,
+        )
+        return [row[0] for row in rows]
+
+    @classmethod
+    def recompute(
+        cls,
+        evaluations=None,
+        *,
+        company_id=None,
+        date_start=None,
+        date_end=None,
+        workers: int = 1,
+        chunk_size: int = 200,
+    ) -> dict:
+        """
+        evaluations: قائمة Evaluation/ids، أو None لاختيار (company, date range).
+        يعيد {"evaluations": n, "chunks": k, "workers": w}.
+        """
+        if evaluations is not None:
+            ids = [getattr(e, "pk", e) for e in evaluations]
+            ids = list(cls.select().filter(id__in=ids).order_by("id").values_list("id", flat=True))
+        else:
+            ids = list(
+                cls.select(company_id=company_id, date_start=date_start, date_end=date_end)
+                .order_by("company_id", "date_start", "date_end", "id")
+                .values_list("id", flat=True)
+            )
+
+        chunk_size = max(1, int(chunk_size or 200))
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        workers = max(1, int(workers or 1))
+
+        if workers > 1 and len(chunks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            from django.db import connections
+
+            # الاتصالات المفتوحة لا تُورَّث للعمّال
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_pool_initializer) as pool:
+                done = sum(pool.map(_recompute_evaluation_chunk, chunks))
+        else:
+            workers = 1
+            done = sum(cls.recompute_chunk(chunk) for chunk in chunks)
+
+        return {"evaluations": done, "chunks": len(chunks), "workers": workers}
+
+    @classmethod
+    @transaction.atomic
+    def recompute_chunk(cls, evaluation_ids) -> int:
+        evaluations = list(
+            cls.select()
+            .filter(id__in=list(evaluation_ids))
+            .select_for_update(of=("self",))
+            .order_by("id")
+        )
+        if not evaluations:
+            return 0
+
+        template_ids = {ev.template_id for ev in evaluations if ev.template_id}
+        params_by_template: dict[int, list] = {}
+        if template_ids:
+            params = (
+                EvaluationParameter.objects.filter(template_id__in=template_ids)
+                .select_related("objective", "kpi", "kpi__objective")
+                .order_by("id")
+            )
+            for p in params:
+                params_by_template.setdefault(p.template_id, []).append(p)
+
+        contexts = EvaluationContext.bulk_build(evaluations, params_by_template)
+
+        results, adjustments = [], []
+        for ev in evaluations:
+            r, a, final = EvaluationScoringEngine.score(
+                ev, params_by_template.get(ev.template_id, []), contexts[ev.id]
+            )
+            results.extend(r)
+            adjustments.extend(a)
+            ev.final_score_pct = final
+
+        ids = [ev.id for ev in evaluations]
+        EvaluationParameterResult.objects.filter(evaluation_id__in=ids).delete()
+        EvaluationExceptionAdjustment.objects.filter(evaluation_id__in=ids).delete()
+
+        EvaluationParameterResult.objects.bulk_create(results, batch_size=1000)
+        EvaluationExceptionAdjustment.objects.bulk_create(adjustments, batch_size=1000)
+        Evaluation.all_objects.bulk_update(evaluations, ["final_score_pct"], batch_size=500)
+
+        return len(evaluations)
@@ -5,11 +5,13 @@ Signals:
 - إعادة تجميع الهدف عند تغيّر KPI/Task.
 - منح صلاحيات الكائن للمنشئ (Guardian).
 - إنشاء مجموعات وصلاحيات افتراضية بعد الترحيل.
+
+الأعمال المكلفة تُسجَّل عبر base.side_effects.on_commit_once: مرة لكل مفتاح بعد commit.
 """
 
-from typing import Optional
+import logging
 
-from django.db.models.signals import post_save, post_delete, post_migrate
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate, m2m_changed
 from django.dispatch import receiver
 from performance.models import (
     Objective, KPI, Task,
@@ -17,34 +19,36 @@ from performance.models import (
     EvaluationTemplate, EvaluationParameter, Evaluation, EvaluationParameterResult,
 )
 from . import models as m
+from base.side_effects import on_commit_once
+
+logger = logging.getLogger(__name__)
 
 
 # -----------------------------
 # Participants: rebuild on assignments change
 # -----------------------------
-def _get_objective_safe(obj_id) -> Optional[Objective]:
-    if not obj_id:
-        return None
-    try:
-        return Objective.objects.only("id").get(pk=obj_id)
-    except Objective.DoesNotExist:
-        return None
+def schedule_participants_rebuild(objective_id):
+    """إعادة بناء مشاركي الهدف مرة واحدة بعد commit (تعيينات كثيرة = rebuild واحد)."""
+    if not objective_id:
+        return
+
+    def _rebuild():
+        from performance.services import ObjectiveParticipantService  # LAZY IMPORT
+        ObjectiveParticipantService.rebuild([objective_id])
+
+    on_commit_once(("performance.participants", objective_id), _rebuild)
 
 
 @receiver(post_save, sender=ObjectiveDepartmentAssignment)
 @receiver(post_delete, sender=ObjectiveDepartmentAssignment)
 def rebuild_participants_on_dept_assignment_change(sender, instance, **kwargs):
-    obj = _get_objective_safe(getattr(instance, "objective_id", None))
-    if obj:
-        obj._rebuild_participants()
+    schedule_participants_rebuild(getattr(instance, "objective_id", None))
 
 
 @receiver(post_save, sender=ObjectiveEmployeeAssignment)
 @receiver(post_delete, sender=ObjectiveEmployeeAssignment)
 def rebuild_participants_on_emp_assignment_change(sender, instance, **kwargs):
-    obj = _get_objective_safe(getattr(instance, "objective_id", None))
-    if obj:
-        obj._rebuild_participants()
+    schedule_participants_rebuild(getattr(instance, "objective_id", None))
 
 
 # -----------------------------
@@ -55,6 +59,28 @@ def _recompute_objective(obj: Objective):
     obj.save(update_fields=["progress_pct", "score_pct"])
 
 
+@receiver(post_delete, sender=Objective, dispatch_uid="performance.objective.rollup_on_delete")
+def propagate_rollup_on_objective_delete(sender, instance, **kwargs):
+    """حذف هدف فرعي يغيّر تجميع الأب وسلسلة أسلافه."""
+    parent_id = instance.parent_id
+    if not parent_id:
+        return
+
+    def _on_commit():
+        from performance.services import ObjectiveRollupService  # LAZY IMPORT
+        ObjectiveRollupService.propagate(parent_id)
+
+    on_commit_once(("performance.objective_rollup", parent_id), _on_commit)
+
+
+@receiver(post_delete, sender=Task, dispatch_uid="performance.task.subtask_rollup_on_delete")
+def rollup_parent_task_on_delete(sender, instance, **kwargs):
+    """حذف مهمة فرعية يغيّر تقدم أبيها وسلسلة أسلافها."""
+    if instance.parent_task_id:
+        from performance.services import TaskSubtaskEngine  # LAZY IMPORT
+        TaskSubtaskEngine.schedule_rollup(instance.parent_task_id)
+
+
 # -----------------------------
 # Object-level permissions (creator ownership)
 # -----------------------------
@@ -62,3 +88,127 @@ def _recompute_objective(obj: Objective):
 # دون أي تغيير في باقي منطق الملف.
 
 
+
+
+# -----------------------------
+# External metric cache invalidation
+# -----------------------------
+# الإشارات مربوطة بموديلات PERFORMANCE_EXTERNAL_METRIC_MODELS فقط (لا كلفة على حفظ بقية الموديلات).
+# الربط ثابت: مرة واحدة من PerformanceConfig.ready() — بدون استعلامات ولا حالة لكل process.
+def invalidate_external_metric_on_change(sender, instance, **kwargs):
+    """تغيير في موديل مصدر خارجي يبطل نتائجه المخزنة بعد commit (لا قبلها)."""
+    if kwargs.get("raw"):
+        return
+    from performance import services  # LAZY IMPORT
+    on_commit_once(
+        ("performance.extm.invalidate", sender._meta.label_lower),
+        lambda: services.invalidate_external_metric_cache(sender),
+    )
+
+
+def connect_external_metric_receivers():
+    """ربط invalidate_external_metric_on_change بكل موديل في السجل الثابت."""
+    from django.apps import apps  # LAZY IMPORT
+    from performance import services  # LAZY IMPORT
+
+    for label in sorted(services.EXTERNAL_METRIC_CACHED_MODELS):
+        try:
+            Model = apps.get_model(label)
+        except (LookupError, ValueError):
+            logger.warning("PERFORMANCE_EXTERNAL_METRIC_MODELS: unknown model %r (not cached)", label)
+            continue
+        post_save.connect(invalidate_external_metric_on_change, sender=Model,
+                          dispatch_uid=f"performance.extm.{label}.saved")
+        post_delete.connect(invalidate_external_metric_on_change, sender=Model,
+                            dispatch_uid=f"performance.extm.{label}.deleted")
+
+
+# -----------------------------
+# Participants: incremental maintenance on employee moves
+# -----------------------------
+@receiver(post_save, sender="hr.Employee", dispatch_uid="performance.employee.sync_participants")
+def sync_participants_on_employee_change(sender, instance, created, **kwargs):
+    """
+    نقل موظف بين الأقسام أو تغيير active: نحدّث فقط الأهداف التي تستهدف
+    القسم القديم/الجديد (أو أسلافهما) ولهذا الموظف فقط.
+    يعتمد على _old_department_id / _old_active من hr.signals (pre_save).
+    """
+    if kwargs.get("raw"):
+        return
+
+    old_dept = getattr(instance, "_old_department_id", None)
+    old_active = getattr(instance, "_old_active", None)
+
+    if not created and old_dept == instance.department_id and old_active == instance.active:
+        return
+
+    employee_id = instance.pk
+    dept_ids = frozenset({old_dept, instance.department_id})
+
+    def _on_commit():
+        from performance.services import ObjectiveParticipantService  # LAZY IMPORT
+        ObjectiveParticipantService.sync_employee(employee_id, set(dept_ids))
+
+    on_commit_once(("performance.participants.employee", employee_id, dept_ids), _on_commit)
+
+
+# -----------------------------
+# Task dependencies: reject cycles on edit
+# التحقق للمستخدم في TaskDependency.clean() / TaskForm (ValidationError)؛
+# هنا فقط ما تجاوزهما → TaskDependencyCycleError (IntegrityError)
+# -----------------------------
+@receiver(pre_save, sender=m.TaskDependency, dispatch_uid="performance.task_dependency.no_cycles")
+def reject_task_dependency_cycle(sender, instance, **kwargs):
+    if kwargs.get("raw") or not instance.active:
+        return
+    from performance.services import TaskDependencyGraph  # LAZY IMPORT
+    TaskDependencyGraph.ensure_acyclic(instance.task_id, instance.depends_on_id)
+
+
+@receiver(m2m_changed, sender=Task.depends_on.through, dispatch_uid="performance.task_depends_on.no_cycles")
+def reject_task_depends_on_cycle(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != "pre_add" or not pk_set:
+        return
+    from performance.services import TaskDependencyGraph  # LAZY IMPORT
+    for pk in pk_set:
+        # reverse: instance هي الاعتماد (blocking_tasks.add) → pk هي المهمة المعتمدة
+        task_id, depends_on_id = (pk, instance.pk) if reverse else (instance.pk, pk)
+        TaskDependencyGraph.ensure_acyclic(task_id, depends_on_id)
+
+
+# -----------------------------
+# DailyRating → monthly rollup
+# -----------------------------
+@receiver(pre_save, sender=m.DailyRating, dispatch_uid="performance.daily_rating.capture_old_bucket")
+def capture_daily_rating_old_bucket(sender, instance, **kwargs):
+    """نقل تقييم لموظف/تاريخ آخر يغيّر شهرين: نحفظ القديم قبل الحفظ."""
+    instance._old_rollup_bucket = None
+    if kwargs.get("raw") or not instance.pk:
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not ({"employee", "date", "company"} & set(update_fields)):
+        return
+    instance._old_rollup_bucket = (
+        sender.all_objects.filter(pk=instance.pk).values_list("employee_id", "date", "company_id").first()
+    )
+
+
+@receiver(post_save, sender=m.DailyRating, dispatch_uid="performance.daily_rating.rollup_saved")
+@receiver(post_delete, sender=m.DailyRating, dispatch_uid="performance.daily_rating.rollup_deleted")
+def refresh_daily_rating_rollup(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+
+    def _schedule(employee_id, day, company_id):
+        # مفتاح = (موظف، شهر، شركة): تقييمات الشهر كلها → refresh واحد
+        def _refresh():
+            from performance.services import DailyRatingRollupService  # LAZY IMPORT
+            DailyRatingRollupService.refresh_for(employee_id, day, company_id)
+
+        on_commit_once(("performance.daily_rating_month", employee_id, day.replace(day=1), company_id), _refresh)
+
+    _schedule(instance.employee_id, instance.date, instance.company_id)
+
+    old = getattr(instance, "_old_rollup_bucket", None)
+    if old:
+        _schedule(old[0], old[1], old[2])
@@ -1,3 +1,862 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from base.models import Company, User
+from hr.models import Department, Employee
+from performance import access, services
+from performance import models as m
+
+
+class EvaluationRecomputeQueryCountTests(TestCase):
+    """
+    Evaluation.recompute() يقرأ من EvaluationContext:
+    عدد الاستعلامات ثابت مهما كان عدد معاملات القالب (عدا EXTERNAL_METRIC).
+    """
+
+    # كل الأنواع التي لا تعتمد على مصدر خارجي
+    KINDS = [
+        m.EvaluationParameter.SourceKind.MANUAL,
+        m.EvaluationParameter.SourceKind.OBJECTIVE_SCORE,
+        m.EvaluationParameter.SourceKind.OBJECTIVE_PROGRESS,
+        m.EvaluationParameter.SourceKind.KPI_SCORE,
+        m.EvaluationParameter.SourceKind.TASKS_PROGRESS,
+        m.EvaluationParameter.SourceKind.DAILY_RATING,
+        m.EvaluationParameter.SourceKind.TEMP_TASKS_LOAD,
+        m.EvaluationParameter.SourceKind.TEMP_TASKS_SCORE,
+        m.EvaluationParameter.SourceKind.QUALITY_SCORE,
+        m.EvaluationParameter.SourceKind.EMPLOYEE_OBJECTIVE_SCORE,
+        m.EvaluationParameter.SourceKind.EMPLOYEE_OBJECTIVE_TIMELINESS,
+        m.EvaluationParameter.SourceKind.EMPLOYEE_OBJECTIVE_EFFICIENCY,
+        m.EvaluationParameter.SourceKind.EMPLOYEE_OBJECTIVE_QUALITY,
+        m.EvaluationParameter.SourceKind.FEEDBACK_SCORE,
+    ]
+
+    MAX_QUERIES = 14
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Eval QC Co")
+        dept = Department.objects.create(name="Ops", company=cls.company)
+        cls.employee = Employee.objects.create(name="Eval QC Emp", company=cls.company, department=dept)
+
+        cls.date_start = date(2026, 1, 1)
+        cls.date_end = date(2026, 3, 31)
+
+        # نتجنّب Objective.save() (يعيد بناء المشاركين والدرجات) — نريد بيانات ثابتة فقط
+        m.Objective.objects.bulk_create([
+            m.Objective(company=cls.company, title=f"QC Objective {i}", date_start=cls.date_start, score_pct=70)
+            for i in range(3)
+        ])
+        cls.objectives = list(m.Objective.all_objects.filter(company=cls.company).order_by("id"))
+        m.ObjectiveParticipant.objects.bulk_create([
+            m.ObjectiveParticipant(objective=o, employee=cls.employee) for o in cls.objectives
+        ])
+        m.EmployeeObjectiveScore.objects.bulk_create([
+            m.EmployeeObjectiveScore(objective=o, employee=cls.employee, final_score_pct=80) for o in cls.objectives
+        ])
+
+        for day in range(5):
+            m.DailyRating.objects.create(
+                company=cls.company,
+                employee=cls.employee,
+                date=cls.date_start + timedelta(days=day),
+                overall_score_pct=60 + day,
+            )
+        m.QualityIncident.objects.create(
+            company=cls.company,
+            employee=cls.employee,
+            date=cls.date_start,
+            severity="medium",
+            impact_score_pct=90,
+        )
+
+    def _make_evaluation(self, n_params):
+        template = m.EvaluationTemplate.objects.create(company=self.company, name=f"QC Template {n_params}")
+        for i in range(n_params):
+            m.EvaluationParameter.objects.create(
+                template=template,
+                name=f"P{i}",
+                weight_pct=1,
+                source_kind=self.KINDS[i % len(self.KINDS)],
+                objective=self.objectives[i % len(self.objectives)],
+                manual_default_score_pct=50,
+            )
+
+        # bulk_create → بدون recompute تلقائي من save()
+        evaluation = m.Evaluation(
+            company=self.company,
+            employee=self.employee,
+            template=template,
+            date_start=self.date_start,
+            date_end=self.date_end + timedelta(days=n_params),
+        )
+        m.Evaluation.objects.bulk_create([evaluation])
+        m.EvaluationFeedback.objects.create(
+            company=self.company, evaluation=evaluation, role="manager", overall_score_pct=75,
+        )
+        return evaluation
+
+    def _count_recompute_queries(self, n_params):
+        evaluation = self._make_evaluation(n_params)
+        with CaptureQueriesContext(connection) as ctx:
+            evaluation.recompute()
+        self.assertEqual(evaluation.parameter_results.count(), n_params)
+        return len(ctx.captured_queries)
+
+    def test_query_count_small_template(self):
+        self.assertLessEqual(self._count_recompute_queries(len(self.KINDS)), self.MAX_QUERIES)
+
+    def test_query_count_medium_template(self):
+        baseline = self._count_recompute_queries(len(self.KINDS))
+        self.assertEqual(self._count_recompute_queries(len(self.KINDS) * 3), baseline)
+
+    def test_query_count_large_template(self):
+        baseline = self._count_recompute_queries(len(self.KINDS))
+        self.assertEqual(self._count_recompute_queries(len(self.KINDS) * 10), baseline)
+
+    def test_cycle_engine_matches_per_row_recompute(self):
+        evaluation = self._make_evaluation(len(self.KINDS) * 2)
+
+        def snapshot():
+            evaluation.refresh_from_db()
+            return evaluation.final_score_pct, sorted(
+                evaluation.parameter_results.values_list("parameter_id", "score_pct", "raw_value_number")
+            )
+
+        services.EvaluationCycleEngine.recompute([evaluation])
+        engine = snapshot()
+        evaluation.recompute()
+        per_row = snapshot()
+
+        self.assertEqual(engine, per_row)
+        self.assertEqual(len(engine[1]), len(self.KINDS) * 2)
+
+    def test_insert_new_returns_only_rows_it_inserted(self):
+        other = Employee.objects.create(name="Eval QC Other", company=self.company, department=self.employee.department)
+        period = dict(date_start=date(2027, 1, 1), date_end=date(2027, 3, 31))
+        # صف "متزامن" لنفس (employee, period) أُدرج قبلنا
+        m.Evaluation.objects.bulk_create([m.Evaluation(company=self.company, employee=self.employee, **period)])
+
+        ids = services.EvaluationCycleEngine.insert_new([
+            m.Evaluation(company=self.company, employee=self.employee, **period),
+            m.Evaluation(company=self.company, employee=other, **period),
+        ])
+
+        self.assertEqual(list(m.Evaluation.all_objects.filter(pk__in=ids).values_list("employee_id", flat=True)),
+                         [other.pk])
+
+
+class VisibilityQuerysetParityTests(TestCase):
+    """
+    visible_* / editable_objectives يجب أن تطابق دوال can_* لكل عنصر،
+    لكل مستخدم في هرمية (أقسام متداخلة + سلسلة مدراء).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Access Co")
+        other_company = Company.objects.create(name="Other Access Co")
+        c = cls.company
+
+        root = Department.objects.create(name="HQ", company=c)
+        ops = Department.objects.create(name="Ops", company=c, parent=root)
+        team = Department.objects.create(name="Ops Team", company=c, parent=ops)
+        sales = Department.objects.create(name="Sales", company=c, parent=root)
+
+        def emp(name, dept, manager=None):
+            user = User.objects.create_user(f"{name.lower()}@access.test", "x", username=name.lower(), company=c)
+            return Employee.objects.create(name=name, company=c, department=dept, manager=manager, user=user)
+
+        boss = emp("Boss", root)
+        lead = emp("Lead", ops, manager=boss)
+        dev1 = emp("Dev1", team, manager=lead)
+        dev2 = emp("Dev2", team, manager=lead)
+        seller = emp("Seller", sales, manager=boss)
+        loner = emp("Loner", sales)
+        cls.employees = [boss, lead, dev1, dev2, seller, loner]
+
+        Department.objects.filter(pk=root.pk).update(manager=boss)
+        Department.objects.filter(pk=ops.pk).update(manager=lead)
+
+        d0 = date(2026, 1, 1)
+        objectives = [
+            m.Objective(company=c, title="Company wide", date_start=d0),
+            m.Objective(company=c, title="Ops goal", date_start=d0, target_kind="department", target_department=ops),
+            m.Objective(company=c, title="Team goal", date_start=d0, target_kind="department",
+                        target_department=team, reviewer=seller),
+            m.Objective(company=c, title="Sales goal", date_start=d0, target_kind="department", target_department=sales),
+            m.Objective(company=c, title="Dev1 goal", date_start=d0, target_kind="employee", target_employee=dev1),
+            m.Objective(company=c, title="Seller goal", date_start=d0, target_kind="employee",
+                        target_employee=seller, reviewer=lead),
+        ]
+        for o in objectives:
+            o.save()
+        m.Objective.objects.bulk_create([
+            m.Objective(company=other_company, title="Elsewhere", date_start=d0),
+        ])
+
+        team_goal, seller_goal = objectives[2], objectives[5]
+        m.ObjectiveParticipant.objects.get_or_create(objective=seller_goal, employee=loner)
+
+        m.Task.objects.bulk_create([
+            m.Task(company=c, objective=team_goal, title="Dev1 task", assignee=dev1),
+            m.Task(company=c, objective=team_goal, title="Unassigned", assignee=None),
+            m.Task(company=c, objective=seller_goal, title="Seller task", assignee=seller),
+            m.Task(company=c, objective=objectives[3], title="Loner task", assignee=loner),
+        ])
+
+        m.Evaluation.objects.bulk_create([
+            m.Evaluation(company=c, employee=e, evaluator=(seller if e == dev2 else None),
+                         date_start=d0, date_end=date(2026, 3, 31))
+            for e in cls.employees
+        ])
+
+    def _assert_parity(self, builder, check, model):
+        items = list(model.objects.all())
+        for employee in self.employees:
+            user = User.objects.get(pk=employee.user_id)
+            expected = {obj.pk for obj in items if check(user, obj)}
+            actual = set(builder(user).values_list("pk", flat=True))
+            self.assertEqual(actual, expected, f"{builder.__name__} mismatch for {employee.name}")
+
+    def test_visible_objectives_match_can_view(self):
+        self._assert_parity(access.visible_objectives, access.can_view_objective, m.Objective)
+
+    def test_editable_objectives_match_can_edit(self):
+        self._assert_parity(access.editable_objectives, access.can_edit_objective, m.Objective)
+
+    def test_visible_tasks_match_can_view(self):
+        self._assert_parity(access.visible_tasks, access.can_view_task, m.Task)
+
+    def test_visible_evaluations_match_can_view(self):
+        self._assert_parity(access.visible_evaluations, access.can_view_evaluation, m.Evaluation)
+
+    def test_bulk_created_reports_stay_in_manager_chain(self):
+        boss, lead, dev1 = self.employees[:3]
+        # bulk_create → manager_path فارغ
+        intern = Employee(name="Intern", company=self.company, department=dev1.department, manager=dev1)
+        Employee.objects.bulk_create([intern])
+        evaluation = m.Evaluation(company=self.company, employee=intern,
+                                  date_start=date(2026, 1, 1), date_end=date(2026, 3, 31))
+        m.Evaluation.objects.bulk_create([evaluation])
+
+        boss_user = User.objects.get(pk=boss.user_id)
+        self.assertTrue(access.can_view_evaluation(boss_user, evaluation))
+        self.assertIn(evaluation.pk, set(access.visible_evaluations(boss_user).values_list("pk", flat=True)))
+
+        # مسار تابع لمدير بلا مسار = السلسلة كاملة، لا المدير المباشر فقط
+        sub = Employee.objects.create(name="Sub", company=self.company, department=dev1.department,
+                                      manager=Employee.all_objects.get(pk=intern.pk))
+        self.assertEqual(sub.manager_chain_ids(), [boss.pk, lead.pk, dev1.pk, intern.pk])
+
+    def test_builders_use_constant_queries(self):
+        user = User.objects.get(pk=self.employees[1].user_id)
+        with CaptureQueriesContext(connection) as ctx:
+            list(access.visible_tasks(user))
+        # get_employee + company_ids + القائمة نفسها
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+
+class ExternalMetricCacheInvalidationTests(TestCase):
+    """
+    الكاش لموديلات PERFORMANCE_EXTERNAL_METRIC_MODELS فقط (إشارات مربوطة في ready())،
+    ونسخة الكاش ترتفع بعد commit لا داخل المعاملة.
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(name="ExtM Co")
+        self.employee = Employee.objects.create(
+            name="ExtM Emp", company=self.company,
+            department=Department.objects.create(name="Ops", company=self.company),
+        )
+
+    def test_version_bumps_after_commit(self):
+        key = services._model_version_key("performance.QualityIncident")
+        before = cache.get_or_set(key, 1, timeout=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            m.QualityIncident.objects.create(
+                company=self.company, employee=self.employee, date=date(2026, 1, 1),
+                severity="low", impact_score_pct=10,
+            )
+            self.assertEqual(cache.get(key), before)
+        self.assertEqual(cache.get(key), before + 1)
+
+    def test_unregistered_model_is_never_cached(self):
+        self.assertNotIn("hr.department", services.EXTERNAL_METRIC_CACHED_MODELS)
+        context = {"company_id": self.company.pk}
+
+        with mock.patch.object(services.cache, "set") as cache_set:
+            first = services.generic_model_adapter(
+                app_model="hr.Department", field="id", aggregation="count", filter_json={}, context=context,
+            )
+            Department.objects.create(name="Sales", company=self.company)
+            second = services.generic_model_adapter(
+                app_model="hr.Department", field="id", aggregation="count", filter_json={}, context=context,
+            )
+
+        cache_set.assert_not_called()
+        self.assertEqual(second[0], first[0] + 1)
+
+
+class SubtaskRollupSchedulingTests(TestCase):
+    """schedule_rollup: الآباء مربوطون بالمعاملة؛ التراجع لا يسرّب معرّفات ولا يمنع جدولة لاحقة."""
+
+    def test_rolled_back_parents_are_dropped_and_later_ones_run(self):
+        engine = services.TaskSubtaskEngine
+        with mock.patch.object(engine, "rollup") as rollup:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        engine.schedule_rollup(111)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                engine.schedule_rollup(222)
+                engine.schedule_rollup(223)
+            with self.captureOnCommitCallbacks(execute=True):
+                engine.schedule_rollup(111)
+
+        self.assertEqual([c.args[0] for c in rollup.call_args_list], [{222, 223}, {111}])
+
+
+class DailyRatingBulkAccessTests(TestCase):
+    """daily_rating_bulk_view: تقييم فريق مدير آخر يحتاج تبعية (manager_path) أو change_dailyrating."""
+
+    @classmethod
+    def setUpTestData(cls):
+        c = Company.objects.create(name="Rating Co")
+        dept = Department.objects.create(name="Ops", company=c)
+
+        def emp(name, manager=None):
+            user = User.objects.create_user(f"{name.lower()}@rating.test", "x", username=name.lower(), company=c)
+            return Employee.objects.create(name=name, company=c, department=dept, manager=manager, user=user)
+
+        cls.lead = emp("Lead")
+        cls.member = emp("Member", cls.lead)
+        cls.peer = emp("Peer")
+        cls.peer_member = emp("PeerMember", cls.peer)
+        cls.factor = m.DailyRatingFactor.objects.create(name="Focus", company=c)
+
+    def _post(self, user, manager, employee):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse("performance:daily_rating_bulk"),
+            {
+                "rated_by": manager.pk,
+                "date": "2026-03-02",
+                f"score_{employee.pk}_{self.factor.pk}": "80",
+            },
+            HTTP_HOST="localhost",
+        )
+
+    def test_cannot_rate_another_managers_team(self):
+        response = self._post(self.lead.user, self.peer, self.peer_member)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("rated_by", response.context["form"].errors)
+        self.assertFalse(m.DailyRating.all_objects.filter(employee=self.peer_member).exists())
+        self.assertFalse(access.can_rate_team(self.lead.user, self.peer))
+
+    def test_rates_own_team(self):
+        response = self._post(self.lead.user, self.lead, self.member)
+
+        self.assertEqual(response.status_code, 302)
+        rating = m.DailyRating.all_objects.get(employee=self.member)
+        self.assertEqual(rating.rated_by_id, self.lead.pk)
+
+    def test_change_dailyrating_permission_rates_any_team(self):
+        self.lead.user.user_permissions.add(Permission.objects.get(codename="change_dailyrating"))
+
+        response = self._post(User.objects.get(pk=self.lead.user_id), self.peer, self.peer_member)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(m.DailyRating.all_objects.filter(employee=self.peer_member).exists())
+
+
+def _legacy_progress_and_score(objective):
+    """
+    المرجع: منطق Objective.recompute_progress_and_score قبل ObjectiveRollupService
+    (تجميع في بايثون على الصفوف) — للمقارنة فقط.
+    """
+    children = list(m.Objective.all_objects.filter(parent=objective, active=True))
+    if children and objective.rollup_strategy != "none":
+        if objective.rollup_strategy == "average":
+            return (
+                int(round(sum(c.progress_pct for c in children) / len(children))),
+                int(round(sum(c.score_pct for c in children) / len(children))),
+            )
+        total_w = sum(c.weight_pct for c in children) or 1
+        return (
+            int(round(sum(c.progress_pct * c.weight_pct for c in children) / total_w)),
+            int(round(sum(c.score_pct * c.weight_pct for c in children) / total_w)),
+        )
+
+    tasks = [t for t in m.Task.objects.filter(objective=objective) if not (t.status and t.status.code == "cancelled")]
+    progress = int(round(sum(t.percent_complete for t in tasks) / len(tasks))) if tasks else 0
+
+    kpis = list(m.KPI.objects.filter(objective=objective))
+    if kpis:
+        total_w = sum(k.weight_pct or 0 for k in kpis) or (len(kpis) * 100)
+        num = sum((k.score_pct or 0) * (k.weight_pct or 100) for k in kpis)
+        score = max(0, min(100, int(round(num / total_w))))
+    else:
+        score = 0
+    return progress, score
+
+
+class ObjectiveRollupParityTests(TestCase):
+    """ObjectiveRollupService.compute == المنطق القديم (أبناء average/weighted/none، مهام، KPIs)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Rollup Co")
+        cls.cancelled, _ = m.TaskStatus.objects.get_or_create(code="cancelled", defaults={"name": "Cancelled"})
+        cls.open, _ = m.TaskStatus.objects.get_or_create(code="in_progress", defaults={"name": "In Progress"})
+
+    def _objective(self, **kwargs):
+        # bulk_create → بدون Objective.save (مشاركين + درجات + رفع للأسلاف)
+        obj = m.Objective(company=self.company, title="Rollup", date_start=date(2026, 1, 1), **kwargs)
+        m.Objective.objects.bulk_create([obj])
+        return obj
+
+    def _tasks(self, objective, *rows):
+        m.Task.objects.bulk_create([
+            m.Task(company=self.company, objective=objective, title=f"T{i}", status=status, percent_complete=pct)
+            for i, (pct, status) in enumerate(rows)
+        ])
+
+    def _kpis(self, objective, *rows):
+        m.KPI.objects.bulk_create([
+            m.KPI(company=self.company, objective=objective, name=f"K{i}", target_value=1, score_pct=score, weight_pct=weight)
+            for i, (score, weight) in enumerate(rows)
+        ])
+
+    def _assert_parity(self, objective, expected):
+        objective.refresh_from_db()
+        self.assertEqual(_legacy_progress_and_score(objective), expected)
+        self.assertEqual(services.ObjectiveRollupService.compute(objective), expected)
+
+    def test_children_rollup_strategies(self):
+        parent = self._objective()
+        self._tasks(parent, (10, self.open))
+        for progress, score, weight, active in [(40, 90, 20, True), (80, 30, 60, True), (0, 0, 100, False)]:
+            self._objective(parent=parent, progress_pct=progress, score_pct=score, weight_pct=weight, active=active)
+
+        cases = {
+            "average": (60, 60),
+            "weighted": (70, 45),  # (40*20 + 80*60) / 80 ، (90*20 + 30*60) / 80
+            "none": (10, 0),       # من مهام الهدف نفسه فقط
+        }
+        for strategy, expected in cases.items():
+            with self.subTest(strategy=strategy):
+                m.Objective.all_objects.filter(pk=parent.pk).update(rollup_strategy=strategy)
+                self._assert_parity(parent, expected)
+
+    def test_rollup_without_active_children_uses_own_rows(self):
+        parent = self._objective(rollup_strategy="average")
+        self._objective(parent=parent, progress_pct=100, score_pct=100, active=False)
+        self._tasks(parent, (30, self.open), (50, None))
+        self._assert_parity(parent, (40, 0))
+
+    def test_cancelled_tasks_are_excluded(self):
+        objective = self._objective()
+        self._tasks(objective, (20, self.open), (60, None), (100, self.cancelled))
+        self._assert_parity(objective, (40, 0))
+
+    def test_kpi_zero_weight_counts_as_100_in_numerator(self):
+        objective = self._objective()
+        self._kpis(objective, (50, 80), (10, 0))
+        # (50*80 + 10*100) / 80 = 62.5 → 62 ، ثم القص إلى 0..100
+        self._assert_parity(objective, (0, 62))
+
+        self._kpis(objective, (100, 0))  # 15000 / 80 → 100
+        self._assert_parity(objective, (0, 100))
+
+    def test_kpi_total_weight_falls_back_to_count_times_100(self):
+        objective = self._objective()
+        self._kpis(objective, (70, 0), (30, 0))
+        self._assert_parity(objective, (0, 50))
+
+    def test_empty_objective(self):
+        self._assert_parity(self._objective(rollup_strategy="weighted"), (0, 0))
+
+
+class ObjectiveParticipantParityTests(TestCase):
+    """ObjectiveParticipantService.rebuild == Objective._collect_employee_ids (المنطق القديم في بايثون)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Participants Co")
+        other = Company.objects.create(name="Participants Other Co")
+
+        cls.root = Department.objects.create(name="Root", company=cls.company)
+        cls.child = Department.objects.create(name="Child", company=cls.company, parent=cls.root)
+        cls.grandchild = Department.objects.create(name="Grandchild", company=cls.company, parent=cls.child)
+        cls.side = Department.objects.create(name="Side", company=cls.company)
+        # حد الشركة: قسم شركة أخرى يقع مساره تحت Child (save لا يستدعي full_clean)
+        foreign = Department.objects.create(name="Foreign", company=other, parent=cls.child)
+        cls.foreign = foreign
+
+        def emp(name, dept, company=None):
+            return Employee.objects.create(name=name, company=company or cls.company, department=dept)
+
+        cls.e_root = emp("P Root", cls.root)
+        cls.e_child = emp("P Child", cls.child)
+        cls.e_grand = emp("P Grand", cls.grandchild)
+        cls.e_side = emp("P Side", cls.side)
+        inactive = emp("P Gone", cls.child)
+        Employee.all_objects.filter(pk=inactive.pk).update(active=False)
+        outsider = emp("P Outsider", Department.objects.create(name="Other Root", company=other), company=other)
+        Employee.all_objects.filter(pk=outsider.pk).update(department=foreign)
+
+    def _objective(self, **kwargs):
+        obj = m.Objective(company=self.company, title="Participants", date_start=date(2026, 1, 1), **kwargs)
+        m.Objective.objects.bulk_create([obj])
+        return obj
+
+    def _assert_parity(self, objective, expected):
+        services.ObjectiveParticipantService.rebuild([objective.pk])
+        actual = set(m.ObjectiveParticipant.objects.filter(objective=objective).values_list("employee_id", flat=True))
+        self.assertEqual(objective._collect_employee_ids(), {e.pk for e in expected})
+        self.assertEqual(actual, {e.pk for e in expected})
+
+    def test_target_department_includes_subtree_within_company(self):
+        self.assertTrue(self.foreign.parent_path.startswith(self.child.parent_path))
+        objective = self._objective(target_kind="department", target_department=self.child)
+        self._assert_parity(objective, [self.e_child, self.e_grand])
+
+    def test_target_employee(self):
+        objective = self._objective(target_kind="employee", target_employee=self.e_side)
+        self._assert_parity(objective, [self.e_side])
+
+    def test_department_assignments_with_and_without_children(self):
+        objective = self._objective()
+        m.ObjectiveDepartmentAssignment.objects.bulk_create([
+            m.ObjectiveDepartmentAssignment(objective=objective, department=self.root, include_children=False),
+            m.ObjectiveDepartmentAssignment(objective=objective, department=self.child, include_children=True),
+        ])
+        m.ObjectiveEmployeeAssignment.objects.bulk_create([
+            m.ObjectiveEmployeeAssignment(objective=objective, employee=self.e_side),
+        ])
+        self._assert_parity(objective, [self.e_root, self.e_child, self.e_grand, self.e_side])
+
+    def test_rebuild_removes_stale_participants(self):
+        objective = self._objective(target_kind="department", target_department=self.root)
+        self._assert_parity(objective, [self.e_root, self.e_child, self.e_grand])
+
+        m.Objective.all_objects.filter(pk=objective.pk).update(target_department=self.grandchild)
+        objective.refresh_from_db()
+        self._assert_parity(objective, [self.e_grand])
+
+
+class TaskSLASweeperTests(TestCase):
+    """sweep_task_sla: UPDATE مباشر (بدون Task.save) + إعادة تقييم كل هدف متأثر مرة واحدة."""
+
+    TODAY = date(2026, 3, 20)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="SLA Co")
+        cls.policy = m.TaskSLAPolicy.objects.create(
+            company=cls.company, name="Std", code="sla-sweep-std", on_time_pct=100, mild_delay_pct=80, severe_delay_pct=50,
+        )
+        objectives = [
+            m.Objective(company=cls.company, title=f"SLA {i}", date_start=date(2026, 1, 1)) for i in range(3)
+        ]
+        m.Objective.objects.bulk_create(objectives)
+        cls.o1, cls.o2, cls.o3 = objectives
+
+        def task(objective, due_in_days, **kwargs):
+            return m.Task(
+                company=cls.company, objective=objective, title="t", sla_policy=cls.policy,
+                due_date=cls.TODAY + timedelta(days=due_in_days), **kwargs,
+            )
+
+        cls.overdue, cls.breached, cls.blocked, cls.breached_2, cls.done, cls.future, cls.locked = (
+            m.Task.objects.bulk_create([
+                task(cls.o1, -2),                                     # تأخير ≤ 3 أيام → mild
+                task(cls.o1, -10),                                    # تأخير > 3 أيام → severe
+                task(cls.o1, -10, blocked_external=True),             # معفى → on_time (بدون تغيير)
+                task(cls.o2, -5),
+                task(cls.o3, -10, completed_at=timezone.now()),       # مغلقة
+                task(cls.o3, 3),                                      # لم تستحق بعد
+                task(cls.o3, -10, is_locked=True),                    # مجمّدة
+            ])
+        )
+
+    def _sweep(self):
+        out = StringIO()
+        with mock.patch.object(m.Objective, "compute_employee_scores", autospec=True) as rescore:
+            call_command("sweep_task_sla", date=self.TODAY.isoformat(), batch_size=2, stdout=out)
+        return sorted(c.args[0].pk for c in rescore.call_args_list), out.getvalue()
+
+    def _timeliness(self, task):
+        return m.Task.objects.values_list("timeliness_pct", flat=True).get(pk=task.pk)
+
+    def test_overdue_and_breached_transitions_rescore_each_objective_once(self):
+        rescored, out = self._sweep()
+
+        self.assertEqual(self._timeliness(self.overdue), 80)
+        self.assertEqual(self._timeliness(self.breached), 50)
+        self.assertEqual(self._timeliness(self.breached_2), 50)
+        for untouched in (self.blocked, self.done, self.future, self.locked):
+            self.assertEqual(self._timeliness(untouched), 100)
+
+        self.assertEqual(rescored, [self.o1.pk, self.o2.pk])
+        self.assertIn("3 task(s) updated", out)
+
+    def test_second_sweep_is_a_no_op(self):
+        self._sweep()
+        rescored, out = self._sweep()
+
+        self.assertEqual(rescored, [])
+        self.assertIn("0 task(s) updated", out)
+
+
+class TaskDependencyCycleTests(TestCase):
+    """الحلقات عبر perf_task_depends_on (M2M) ∪ perf_task_dependency: clean → ValidationError، الحفظ المباشر → IntegrityError."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Deps Co")
+        objective = m.Objective(company=cls.company, title="Deps", date_start=date(2026, 1, 1))
+        m.Objective.objects.bulk_create([objective])
+        cls.a, cls.b, cls.c = m.Task.objects.bulk_create([
+            m.Task(company=cls.company, objective=objective, title=t) for t in ("A", "B", "C")
+        ])
+
+    def _dependency(self, task, depends_on):
+        return m.TaskDependency(company=self.company, task=task, depends_on=depends_on)
+
+    def test_direct_cycle(self):
+        self._dependency(self.a, self.b).save()
+
+        back = self._dependency(self.b, self.a)
+        with self.assertRaises(ValidationError):
+            back.full_clean()
+        with self.assertRaises(services.TaskDependencyCycleError), transaction.atomic():
+            back.save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self._dependency(self.c, self.c).save()
+
+    def test_transitive_cycle_across_both_tables(self):
+        self.a.depends_on.add(self.b)           # M2M
+        self._dependency(self.b, self.c).save()  # جدول الاعتماديات
+
+        with self.assertRaises(ValidationError):
+            self._dependency(self.c, self.a).full_clean()
+        with self.assertRaises(services.TaskDependencyCycleError), transaction.atomic():
+            self._dependency(self.c, self.a).save()
+        self.assertFalse(m.TaskDependency.objects.filter(task=self.c).exists())
+
+    def test_m2m_add_rejects_cycle_in_both_directions(self):
+        self._dependency(self.a, self.b).save()
+        self.b.depends_on.add(self.c)
+
+        with self.assertRaises(services.TaskDependencyCycleError), transaction.atomic():
+            self.c.depends_on.add(self.a)
+        with self.assertRaises(services.TaskDependencyCycleError), transaction.atomic():
+            self.a.blocking_tasks.add(self.c)   # reverse: C يعتمد على A
+        self.assertFalse(self.c.depends_on.exists())
+
+    def test_inactive_dependency_does_not_count(self):
+        dep = self._dependency(self.a, self.b)
+        dep.active = False
+        dep.save()
+        self.b.depends_on.add(self.a)
+        self.assertTrue(self.b.depends_on.filter(pk=self.a.pk).exists())
+
+
+class DailyRatingRollupParityTests(TestCase):
+    """DailyRatingMonthly (تُصان عبر الإشارات) + window_totals == تجميع DailyRating مباشرة لأي فترة."""
+
+    WINDOWS = [
+        (date(2026, 1, 20), date(2026, 3, 31)),  # طرف أول جزئي + أشهر كاملة
+        (date(2026, 2, 1), date(2026, 2, 28)),   # شهر كامل فقط
+        (date(2026, 1, 1), date(2026, 4, 30)),   # كل الأشهر كاملة
+        (date(2026, 2, 10), date(2026, 2, 20)),  # داخل شهر واحد
+        (date(2026, 1, 31), date(2026, 3, 1)),   # طرفان جزئيان حول شهر كامل
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Rollup Rating Co")
+        other = Company.objects.create(name="Rollup Rating Other")
+        dept = Department.objects.create(name="Ops", company=cls.company)
+        cls.e1 = Employee.objects.create(name="DR One", company=cls.company, department=dept)
+        cls.e2 = Employee.objects.create(name="DR Two", company=cls.company, department=dept)
+        cls.other_company_id = other.pk
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            day = date(2026, 1, 15)
+            for i in range(0, 85, 3):
+                for emp, offset in ((self.e1, 0), (self.e2, 7)):
+                    m.DailyRating.objects.create(
+                        company=self.company, employee=emp,
+                        date=day + timedelta(days=i), overall_score_pct=(40 + i + offset) % 101,
+                    )
+            # شركة أخرى لنفس الموظف: لا تدخل في مجاميع الشركة
+            m.DailyRating.objects.create(
+                company_id=self.other_company_id, employee=self.e1, date=date(2026, 2, 3), overall_score_pct=99,
+            )
+
+    def _direct(self, date_start, date_end):
+        rows = (
+            m.DailyRating.all_objects
+            .filter(company=self.company, employee__in=[self.e1, self.e2], date__range=(date_start, date_end))
+            .values("employee_id")
+            .annotate(s=Sum("overall_score_pct"), n=Count("id"))
+        )
+        return {r["employee_id"]: (r["s"], r["n"]) for r in rows}
+
+    def _assert_parity(self):
+        for date_start, date_end in self.WINDOWS:
+            with self.subTest(window=(date_start, date_end)):
+                self.assertEqual(
+                    services.DailyRatingRollupService.window_totals(
+                        self.company.pk, [self.e1.pk, self.e2.pk], date_start, date_end,
+                    ),
+                    self._direct(date_start, date_end),
+                )
+
+    def test_window_totals_match_daily_rows(self):
+        # الأشهر الكاملة تُقرأ فعلًا من الجدول: يناير..أبريل لكل موظف
+        self.assertEqual(m.DailyRatingMonthly.all_objects.filter(company=self.company).count(), 8)
+        self._assert_parity()
+
+    def test_parity_after_move_and_delete(self):
+        moved = m.DailyRating.all_objects.filter(employee=self.e1, date__month=2).order_by("date").first()
+        gone = m.DailyRating.all_objects.filter(employee=self.e2, date__month=3).order_by("date").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.date = date(2026, 4, 28)
+            moved.overall_score_pct = 5
+            moved.save()
+            gone.delete()
+        self._assert_parity()
+
+        trend = services.DailyRatingRollupService.trend(self.e1.pk, company_id=self.company.pk)
+        self.assertEqual(
+            [(t["month"].month, t["count"]) for t in trend],
+            [
+                (month, m.DailyRating.all_objects.filter(company=self.company, employee=self.e1, date__month=month).count())
+                for month in (1, 2, 3, 4)
+            ],
+        )
+
+
+class RebuildParticipantsFingerprintTests(TestCase):
+    """rebuild_objective_participants --only-dirty: تكرار التشغيل بلا تغيير لا يعيد البناء."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Fingerprint Co")
+        cls.root = Department.objects.create(name="Root", company=cls.company)
+        cls.child = Department.objects.create(name="Child", company=cls.company, parent=cls.root)
+        cls.side = Department.objects.create(name="Side", company=cls.company)
+        cls.e_root = Employee.objects.create(name="FP Root", company=cls.company, department=cls.root)
+        cls.e_child = Employee.objects.create(name="FP Child", company=cls.company, department=cls.child)
+        cls.e_side = Employee.objects.create(name="FP Side", company=cls.company, department=cls.side)
+
+        objectives = [
+            m.Objective(company=cls.company, title="FP dept", date_start=date(2026, 1, 1),
+                        target_kind="department", target_department=cls.root),
+            m.Objective(company=cls.company, title="FP assigned", date_start=date(2026, 1, 1)),
+        ]
+        m.Objective.objects.bulk_create(objectives)
+        cls.by_dept, cls.assigned = objectives
+        m.ObjectiveEmployeeAssignment.objects.bulk_create([
+            m.ObjectiveEmployeeAssignment(objective=cls.assigned, employee=cls.e_side),
+        ])
+
+    def _participants(self, objective):
+        return set(m.ObjectiveParticipant.objects.filter(objective=objective).values_list("employee_id", flat=True))
+
+    def test_rebuild_is_idempotent_and_clears_dirty_flag(self):
+        svc = services.ObjectiveParticipantService
+        ids = [self.by_dept.pk, self.assigned.pk]
+        self.assertEqual(svc.dirty_objective_ids(ids), ids)
+
+        self.assertEqual(svc.rebuild(ids), (0, 3))
+        fingerprints = dict(m.Objective.all_objects.filter(pk__in=ids).values_list("id", "participants_fingerprint"))
+        self.assertEqual(svc.dirty_objective_ids(ids), [])
+
+        # إعادة البناء بلا تغيير: لا صفوف ولا بصمة جديدة
+        self.assertEqual(svc.rebuild(ids), (0, 0))
+        self.assertEqual(
+            dict(m.Objective.all_objects.filter(pk__in=ids).values_list("id", "participants_fingerprint")),
+            fingerprints,
+        )
+        self.assertEqual(self._participants(self.by_dept), {self.e_root.pk, self.e_child.pk})
+
+    def test_changed_inputs_mark_only_that_objective_dirty(self):
+        svc = services.ObjectiveParticipantService
+        ids = [self.by_dept.pk, self.assigned.pk]
+        svc.rebuild(ids)
+
+        # نقل قسم خارج الشجرة المستهدفة يغيّر البصمة
+        self.child.parent = None
+        self.child.save()
+        self.assertEqual(svc.dirty_objective_ids(ids), [self.by_dept.pk])
+
+        self.assertEqual(svc.rebuild(svc.dirty_objective_ids(ids)), (1, 0))
+        self.assertEqual(self._participants(self.by_dept), {self.e_root.pk})
+        self.assertEqual(svc.dirty_objective_ids(ids), [])
+
+        m.ObjectiveEmployeeAssignment.objects.bulk_create([
+            m.ObjectiveEmployeeAssignment(objective=self.assigned, employee=self.e_root),
+        ])
+        self.assertEqual(svc.dirty_objective_ids(ids), [self.assigned.pk])
+
+
+class RecurringTaskGenerationTests(TestCase):
+    """run_due: مهمة لكل مشارك غير مستثنى في الفترة، وإعادة التشغيل لا تكرر."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name="Recurring Co")
+        dept = Department.objects.create(name="Ops", company=cls.company)
+        cls.employees = [
+            Employee.objects.create(name=f"Rec {i}", company=cls.company, department=dept) for i in range(3)
+        ]
+        objective = m.Objective(company=cls.company, title="Recurring", date_start=date(2026, 1, 1))
+        m.Objective.objects.bulk_create([objective])
+        # مشاركون عبر التعيينات: objective.save() بعد التوليد يعيد بناءهم منها
+        m.ObjectiveEmployeeAssignment.objects.bulk_create([
+            m.ObjectiveEmployeeAssignment(objective=objective, employee=e) for e in cls.employees
+        ])
+        services.ObjectiveParticipantService.rebuild([objective.pk])
+        cls.objective = objective
+        cls.definition = m.TaskRecurringDefinition.objects.create(
+            company=cls.company, name="Monthly report", schedule_kind="monthly", objective=objective,
+        )
+        cls.definition.excluded_employees.add(cls.employees[2])
+
+    def test_generates_once_per_period(self):
+        on_date = date(2026, 3, 10)
+        report = services.RecurringTaskService.run_due(on_date, company_id=self.company.pk)
+
+        self.assertEqual([(r["period"], r["created"]) for r in report], [("2026-03", 2)])
+        tasks = m.Task.objects.filter(recurring_definition=self.definition)
+        self.assertEqual(
+            set(tasks.values_list("assignee_id", flat=True)), {self.employees[0].pk, self.employees[1].pk},
+        )
+        self.assertEqual(set(tasks.values_list("due_date", flat=True)), {date(2026, 3, 31)})
+
+        again = services.RecurringTaskService.run_due(on_date, company_id=self.company.pk)
+        self.assertEqual([r["created"] for r in again], [0])
 
-# Create your tests here.
+        next_month = services.RecurringTaskService.run_due(date(2026, 4, 2), company_id=self.company.pk)
+        self.assertEqual([(r["period"], r["created"]) for r in next_month], [("2026-04", 2)])
@@ -130,6 +130,11 @@ urlpatterns = [
         views.evaluation_bulk_create_view,
         name="evaluation_bulk_create",
     ),
+    path(
+        "daily-ratings/bulk/",
+        views.daily_rating_bulk_view,
+        name="daily_rating_bulk",
+    ),
     path(
         "evaluations/new/",
         views.EvaluationCreateView.as_view(),
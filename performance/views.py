@@ -18,11 +18,15 @@ from base.views import (
 from . import models as m
 from . import forms as f
 from . import services as svc
+from . import access
 from django import forms
 from base.company_context import get_current_company_object
 from base.models import Company
 from hr.models import Employee
+from chatter.services import follow_many
 from django.db.models import Q
+from django.db import transaction
+from django.core.exceptions import PermissionDenied, ValidationError
 
 
 # ============================================================
@@ -421,6 +425,38 @@ class EvaluationBulkCreateForm(forms.Form):
             self.fields["employees"].queryset = Employee.objects.none()
 
 
+# ------------------------------------------------------------
+# Bulk Daily Rating Form (non-model)
+# ------------------------------------------------------------
+class DailyRatingBulkForm(forms.Form):
+    """
+    اختيار المدير والتاريخ؛ الفريق = الموظفون النشطون المباشرون للمدير.
+    المدراء المتاحون = access.rateable_managers (نفسه/تابعوه ما لم يملك change_dailyrating).
+    درجات العناصر تُقرأ من حقول score_<employee>_<factor> في نفس الطلب.
+    """
+    date = forms.DateField(
+        label="Date",
+        widget=forms.DateInput(attrs={"type": "date"}),
+    )
+    rated_by = forms.ModelChoiceField(
+        queryset=Employee.objects.none(),
+        required=True,
+        label="Manager",
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.request = kwargs.pop("request", None)
+        super().__init__(*args, **kwargs)
+
+        user = getattr(self.request, "user", None)
+        self.fields["rated_by"].queryset = access.rateable_managers(user).order_by("name")
+
+        # الافتراضي: الموظف المرتبط بالمستخدم الحالي
+        own = getattr(user, "employee", None) if user and user.is_authenticated else None
+        if own is not None:
+            self.fields["rated_by"].initial = own
+
+
 
 
 
@@ -839,7 +875,8 @@ def evaluation_reject_step_view(request, pk):
 def evaluation_bulk_create_view(request):
     """
     إنشاء تقييمات جماعية لمجموعة موظفين لنفس الفترة ونفس النوع/القالب.
-    - يراعي UniqueConstraint (employee, date_start, date_end) باستخدام get_or_create
+    - يراعي UniqueConstraint (employee, date_start, date_end): الموجود مسبقًا (أو المُدرَج بالتوازي) يُتخطّى
+    - إدراج جماعي (EvaluationCycleEngine.insert_new) ثم حساب واحد للدورة (بدلاً من recompute لكل موظف)
     - لا يضبط الـ workflow إلا بعد عملية submit (كما هو منطق أفضل الممارسات)
     """
     if request.method == "POST":
@@ -852,25 +889,43 @@ def evaluation_bulk_create_view(request):
             date_end = form.cleaned_data["date_end"]
             employees = form.cleaned_data["employees"]
 
-            created_count = 0
-            skipped_count = 0
+            emp_ids = [emp.id for emp in employees]
+            existing_ids = set(
+                m.Evaluation.all_objects.filter(
+                    employee_id__in=emp_ids,
+                    date_start=date_start,
+                    date_end=date_end,
+                ).values_list("employee_id", flat=True)
+            )
 
-            for emp in employees:
-                obj, created = m.Evaluation.objects.get_or_create(
+            uid = request.user.pk
+            new_objs = [
+                m.Evaluation(
                     company=company,
-                    employee=emp,
+                    employee_id=emp_id,
                     date_start=date_start,
                     date_end=date_end,
-                    defaults={
-                        "evaluation_type": evaluation_type,
-                        "template": template,
-                        # state يبقى default = draft
-                    },
+                    evaluation_type=evaluation_type,
+                    template=template,
+                    # state يبقى default = draft
+                    created_by_id=uid,
+                    updated_by_id=uid,
                 )
-                if created:
-                    created_count += 1
-                else:
-                    skipped_count += 1
+                for emp_id in emp_ids
+                if emp_id not in existing_ids
+            ]
+
+            with transaction.atomic():
+                # ON CONFLICT DO NOTHING RETURNING: إدراج متزامن لنفس (employee, period) لا يفشل الدفعة،
+                # و created = ما أدرجه هذا الطلب فقط (لا صفوف طلب آخر لنفس المستخدم)
+                created_ids = svc.EvaluationCycleEngine.insert_new(new_objs)
+                created = list(m.Evaluation.all_objects.filter(pk__in=created_ids).order_by("pk"))
+                svc.EvaluationCycleEngine.recompute(created)
+                # bulk insert لا يطلق post_save → المتابعة التلقائية (chatter.evaluation_auto_follow) بعد commit
+                transaction.on_commit(lambda: follow_many(created, "employee", "evaluator"))
+
+            created_count = len(created)
+            skipped_count = len(emp_ids) - created_count
 
             if created_count:
                 messages.success(
@@ -896,6 +951,115 @@ def evaluation_bulk_create_view(request):
     )
 
 
+# ------------------------------------------------------------
+# Bulk Daily Rating View
+# ------------------------------------------------------------
+@login_required
+def daily_rating_bulk_view(request):
+    """
+    تقييم يومي لفريق مدير كامل في شاشة واحدة.
+    - GET: اختيار المدير/التاريخ وعرض الدرجات الحالية
+    - POST: upsert لكل التقييمات والعناصر في معاملة واحدة (DailyRatingService.bulk_rate)
+    """
+    data = request.POST if request.method == "POST" else (request.GET or None)
+    form = DailyRatingBulkForm(data, request=request)
+
+    manager = None
+    rating_date = None
+    team, factors, grid = [], [], []
+
+    if form.is_bound and form.is_valid():
+        manager = form.cleaned_data["rated_by"]
+        rating_date = form.cleaned_data["date"]
+
+        # الحقل مقيّد بـ rateable_managers؛ الكتابة تعيد الفحص صراحةً
+        if request.method == "POST" and not access.can_rate_team(request.user, manager):
+            raise PermissionDenied
+
+        team = list(
+            Employee.objects.filter(manager=manager, active=True)
+            .only("id", "name")
+            .order_by("name")
+        )
+        factors = list(
+            m.DailyRatingFactor.objects.filter(company_id=manager.company_id, active=True)
+            .order_by("name")
+        )
+
+        if request.method == "POST":
+            ratings = {}
+            for emp in team:
+                scores = {}
+                for factor in factors:
+                    raw = request.POST.get(f"score_{emp.pk}_{factor.pk}", "").strip()
+                    if raw == "":
+                        continue
+                    try:
+                        scores[factor.pk] = int(raw)
+                    except ValueError:
+                        form.add_error(None, f"Invalid score for {emp.name} / {factor.name}.")
+                if scores:
+                    ratings[emp.pk] = scores
+
+            if not form.errors and ratings:
+                try:
+                    result = svc.DailyRatingService.bulk_rate(
+                        manager.company_id, rating_date, ratings, rated_by=manager,
+                    )
+                except ValidationError as exc:
+                    form.add_error(None, exc)
+                else:
+                    messages.success(
+                        request,
+                        f"Saved {result['items']} rating item(s) for {result['ratings']} employee(s).",
+                    )
+                    return redirect(
+                        f"{request.path}?rated_by={manager.pk}&date={rating_date.isoformat()}"
+                    )
+            elif not form.errors:
+                messages.info(request, "No scores were entered.")
+
+        # الدرجات الحالية لليوم (استعلام واحد)
+        existing = {
+            (emp_id, factor_id): score
+            for emp_id, factor_id, score in m.DailyRatingItem.objects.filter(
+                daily_rating__employee__in=team,
+                daily_rating__date=rating_date,
+            ).values_list("daily_rating__employee_id", "factor_id", "score_pct")
+        }
+        overall = dict(
+            m.DailyRating.objects.filter(employee__in=team, date=rating_date)
+            .values_list("employee_id", "overall_score_pct")
+        )
+        grid = [
+            {
+                "employee": emp,
+                "overall": overall.get(emp.pk),
+                "cells": [
+                    {
+                        "name": f"score_{emp.pk}_{factor.pk}",
+                        "value": request.POST.get(f"score_{emp.pk}_{factor.pk}")
+                        if request.method == "POST" else existing.get((emp.pk, factor.pk), ""),
+                    }
+                    for factor in factors
+                ],
+            }
+            for emp in team
+        ]
+
+    return render(
+        request,
+        "performance/daily_rating_bulk.html",
+        {
+            "form": form,
+            "manager": manager,
+            "rating_date": rating_date,
+            "factors": factors,
+            "grid": grid,
+        },
+    )
+
+
 # ============================================================
 # Objectives
 # ============================================================
@@ -24,6 +24,7 @@ from __future__ import annotations
 from django.contrib.auth.models import Group
 from django.apps import apps
 
+from base.access import get_employee, user_is_hr_manager
 from hr.access import can_view_employee, can_edit_employee
 
 # Lazy model loading (no hard dependency at import time)
@@ -40,12 +41,13 @@ def _get_employee_by_user(user):
     """Return Employee linked to the given user, if any."""
     if not user or not user.is_authenticated:
         return None
-    return Employee.objects.filter(user=user).first()
+    # يقرأ من AccessContext داخل الطلب
+    return get_employee(user)
 
 
 def _user_is_hr(user):
     """Check whether the user belongs to HR Managers group."""
     if not user or not user.is_authenticated:
         return False
-    return user.groups.filter(name="HR Managers").exists()
+    return user_is_hr_manager(user)
 
@@ -22,6 +22,7 @@ from django.views import View
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
 from base.models import Company
+from base.search import matching_ids
 from hr.models import Job
 from .forms import (
     EmployeeSkillForm,
@@ -518,14 +519,10 @@ class SkillListView(LoginRequiredMixin, SavedFiltersListMixin, ListView):
         # --------------------------------------------------
         # Search
         # --------------------------------------------------
-        qs = self._apply_search(
-            qs,
-            params,
-            fields=[
-                "name",
-                "skill_type__name",
-            ],
-        )
+        # فهرس البحث الموحّد (base.search) بدل OR من icontains على name / skill_type__name
+        q = (params.get(self.search_param) or "").strip()
+        if q:
+            qs = qs.filter(pk__in=matching_ids("skill", q))
 
         # --------------------------------------------------
         # Ordering